@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Benchmarks for combining many masks or arrays at flight length.
+
+    python benchmarks/array_operations_benchmark.py
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+import timeit
+
+from flightdatautilities.array_operations import reduce_masks, reduce_sum
+from flightdatautilities.print_table import indent
+
+
+##############################################################################
+# Constants
+
+
+# A four hour flight recorded at 8 Hz.
+FLIGHT_LENGTH = 4 * 60 * 60 * 8
+INPUT_COUNTS = (2, 8, 64)
+REPEAT = 5
+NUMBER = 10
+
+
+##############################################################################
+# Functions
+
+
+def best_time(function, *args, **kwargs):
+    '''
+    Best time in milliseconds of a single call.
+    '''
+    timer = timeit.Timer(lambda: function(*args, **kwargs))
+    return min(timer.repeat(REPEAT, NUMBER)) / NUMBER * 1000
+
+
+def mask_or_loop(masks):
+    '''
+    Previous implementation of merge_masks.
+    '''
+    merged_mask = np.ma.make_mask(masks[0])
+    for mask in masks[1:]:
+        merged_mask = np.ma.mask_or(merged_mask, mask)
+    return merged_mask
+
+
+def sum_loop(arrays):
+    '''
+    Previous implementation of sum_arrays, which added to the first array in
+    place. A copy is made so that repeated calls sum the same values.
+    '''
+    summed_array = arrays[0].copy()
+    for array in arrays[1:]:
+        summed_array += array
+    return summed_array
+
+
+def main():
+    rows = [('Function', 'Inputs', 'List (ms)', 'Stacked (ms)')]
+    for count in INPUT_COUNTS:
+        masks = np.random.random((count, FLIGHT_LENGTH)) > 0.99
+        arrays = np.ma.array(np.random.random((count, FLIGHT_LENGTH)),
+                             mask=masks)
+        mask_list = list(masks)
+        array_list = list(arrays)
+        mask_out = np.empty(FLIGHT_LENGTH, dtype=np.bool_)
+        array_out = np.ma.zeros(FLIGHT_LENGTH)
+        array_out.mask = np.zeros(FLIGHT_LENGTH, dtype=np.bool_)
+        rows.extend([
+            ('mask_or loop', count,
+             best_time(mask_or_loop, mask_list), None),
+            ('reduce_masks', count,
+             best_time(reduce_masks, mask_list),
+             best_time(reduce_masks, masks)),
+            ('reduce_masks(out=)', count,
+             best_time(reduce_masks, mask_list, out=mask_out),
+             best_time(reduce_masks, masks, out=mask_out)),
+            ('+= loop', count,
+             best_time(sum_loop, array_list), None),
+            ('reduce_sum', count,
+             best_time(reduce_sum, array_list),
+             best_time(reduce_sum, arrays)),
+            ('reduce_sum(out=)', count,
+             best_time(reduce_sum, array_list, out=array_out),
+             best_time(reduce_sum, arrays, out=array_out)),
+        ])
+    rows = [rows[0]] + [
+        (name, str(count), '%.3f' % list_time,
+         '-' if stacked_time is None else '%.3f' % stacked_time)
+        for name, count, list_time, stacked_time in rows[1:]]
+    print('Flight length: %d samples' % FLIGHT_LENGTH)
+    print(indent(rows, hasHeader=True, justify='right'))
+
+
+if __name__ == '__main__':
+    main()
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
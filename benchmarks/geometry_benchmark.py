@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Benchmarks for the scalar geometry functions called per sample against their
+array counterparts over a flight's track.
+
+    python benchmarks/geometry_benchmark.py
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+import timeit
+
+from flightdatautilities import geometry
+from flightdatautilities.print_table import indent
+
+
+##############################################################################
+# Constants
+
+
+# A one hour flight recorded at 1 Hz.
+FLIGHT_LENGTH = 60 * 60
+REPEAT = 3
+NUMBER = 3
+
+# Path of the track, from London Heathrow to Edinburgh.
+START = (51.47, -0.4613)
+END = (55.95, -3.3725)
+
+
+##############################################################################
+# Functions
+
+
+def best_time(function, *args, **kwargs):
+    '''
+    Best time in milliseconds of a single call.
+    '''
+    timer = timeit.Timer(lambda: function(*args, **kwargs))
+    return min(timer.repeat(REPEAT, NUMBER)) / NUMBER * 1000
+
+
+def per_sample(function, *arrays):
+    '''
+    Call a scalar function for each sample of the arrays.
+    '''
+    return [function(*values) for values in zip(*arrays)]
+
+
+def main():
+    lat = np.linspace(START[0], END[0], FLIGHT_LENGTH) + \
+        np.random.normal(0, 0.01, FLIGHT_LENGTH)
+    lon = np.linspace(START[1], END[1], FLIGHT_LENGTH) + \
+        np.random.normal(0, 0.01, FLIGHT_LENGTH)
+    start_lat = np.full(FLIGHT_LENGTH, START[0])
+    start_lon = np.full(FLIGHT_LENGTH, START[1])
+    end_lat = np.full(FLIGHT_LENGTH, END[0])
+    end_lon = np.full(FLIGHT_LENGTH, END[1])
+    lists = [a.tolist() for a in (start_lat, start_lon, end_lat, end_lon,
+                                  lat, lon)]
+    benchmarks = [
+        ('midpoint', lists[:2] + lists[4:], (START[0], START[1], lat, lon)),
+        ('cross_track_distance', lists, START + END + (lat, lon)),
+        ('along_track_distance', lists, START + END + (lat, lon)),
+        ('great_circle_distance__haversine', lists[:2] + lists[4:],
+         (START[0], START[1], lat, lon)),
+        ('initial_bearing', lists[:2] + lists[4:],
+         (START[0], START[1], lat, lon)),
+    ]
+    rows = [('Function', 'Scalar (ms)', 'Array (ms)', 'Speed up')]
+    for name, scalar_args, array_args in benchmarks:
+        scalar_time = best_time(per_sample, getattr(geometry, name),
+                                *scalar_args)
+        array_time = best_time(getattr(geometry, name + '_array'),
+                               *array_args)
+        rows.append((name, '%.3f' % scalar_time, '%.3f' % array_time,
+                     '%.0fx' % (scalar_time / array_time)))
+    print('Flight length: %d samples' % FLIGHT_LENGTH)
+    print(indent(rows, hasHeader=True, justify='right'))
+
+
+if __name__ == '__main__':
+    main()
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
@@ -1,5 +1,8 @@
 import numpy as np
-import scipy
+
+from functools import reduce
+
+from flightdatautilities.mask_statistics import masked_count
 
 
 def extrap1d(interpolator):
@@ -9,30 +12,171 @@ def extrap1d(interpolator):
     http://stackoverflow.com/questions/2745329
         /how-to-make-scipy-interpolate-give-a-an-extrapolated-result-beyond
         -the-input-ran
-    TODO: Optimise, this is very slow since the extrapolation algorithm works
-    on values individually.
+
+    For linear interpolation interp_extrap is faster and supports masked
+    arrays.
     '''
     xs = interpolator.x
     ys = interpolator.y
 
-    def pointwise(x):
-        if x < xs[0]:
-            return ys[0] + (x - xs[0]) * (ys[1] - ys[0]) / (xs[1] - xs[0])
-        elif x > xs[-1]:
-            return (ys[-1] + (x - xs[-1]) * (ys[-1] - ys[-2])
-                    / (xs[-1] - xs[-2]))
-        else:
-            return interpolator(x)
-
-    def ufunclike(xs):
-        return scipy.array(map(pointwise, scipy.array(xs)))
+    def ufunclike(x):
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        result = np.empty(x.shape, dtype=np.float64)
+        lower = x < xs[0]
+        upper = x > xs[-1]
+        inside = ~(lower | upper)
+        result[lower] = (ys[0] + (x[lower] - xs[0]) * (ys[1] - ys[0])
+                         / (xs[1] - xs[0]))
+        result[upper] = (ys[-1] + (x[upper] - xs[-1]) * (ys[-1] - ys[-2])
+                         / (xs[-1] - xs[-2]))
+        result[inside] = interpolator(x[inside])
+        return result
 
     return ufunclike
 
 
+def interp_extrap(x, xp, fp):
+    '''
+    Linear interpolation as np.interp, but values outside of the
+    interpolation points are extrapolated from the first or last two points
+    rather than held constant. Equivalent to extrap1d for a linear
+    scipy.interp1d, for whole arrays at once.
+
+    Masked elements of x are masked in the result and masked interpolation
+    points are ignored.
+
+    :param x: The x-coordinates at which to evaluate.
+    :type x: np.ma.masked_array or np.array or float
+    :param xp: The x-coordinates of the interpolation points, increasing.
+    :type xp: np.ma.masked_array or np.array
+    :param fp: The y-coordinates of the interpolation points.
+    :type fp: np.ma.masked_array or np.array
+    :raises ValueError: If there are fewer than two valid points.
+    :returns: The interpolated and extrapolated values.
+    :rtype: np.ma.masked_array or np.array or float
+    '''
+    valid = ~(np.ma.getmaskarray(xp) | np.ma.getmaskarray(fp))
+    xp = np.ma.getdata(xp)[valid].astype(np.float64)
+    fp = np.ma.getdata(fp)[valid].astype(np.float64)
+    if len(xp) < 2:
+        raise ValueError('At least two valid interpolation points required.')
+
+    x_data = np.ma.getdata(x)
+    result = np.atleast_1d(np.interp(x_data, xp, fp))
+    x_data = np.atleast_1d(x_data)
+    lower = x_data < xp[0]
+    if lower.any():
+        result[lower] = (fp[0] + (x_data[lower] - xp[0]) * (fp[1] - fp[0])
+                         / (xp[1] - xp[0]))
+    upper = x_data > xp[-1]
+    if upper.any():
+        result[upper] = (fp[-1] + (x_data[upper] - xp[-1]) * (fp[-1] - fp[-2])
+                         / (xp[-1] - xp[-2]))
+
+    if np.ma.isMaskedArray(x):
+        return np.ma.array(result.reshape(np.shape(x)),
+                           mask=np.ma.getmaskarray(x).copy())
+    if np.ndim(x) == 0:
+        return result[0]
+    return result
+
+
+def _is_stacked(arrays):
+    '''
+    Whether arrays is a single array with one row per input, which can be
+    reduced along the first axis in one pass.
+    '''
+    return isinstance(arrays, np.ndarray) and arrays.ndim > 1
+
+
+def reduce_masks(masks, out=None):
+    '''
+    ORs multiple masks together without modifying any of them. A 2-D array of
+    masks is reduced in a single pass, otherwise masks are ORed into the
+    output in place so that no intermediate arrays are allocated.
+
+    :param masks: Masks to OR together.
+    :type masks: iterable of np.ma.masked_array.mask or 2-D np.array
+    :param out: Boolean array to store the result in.
+    :type out: np.array or None
+    :raises IndexError: If masks is empty.
+    :returns: Single mask, the result of ORing masks.
+    :rtype: np.array
+    '''
+    if _is_stacked(masks):
+        if not len(masks):
+            raise IndexError('No masks to reduce.')
+        return np.logical_or.reduce(masks, axis=0, out=out)
+
+    masks = list(masks)
+    if not masks:
+        raise IndexError('No masks to reduce.')
+    shape = max((np.shape(m) for m in masks), key=len)
+    if out is None:
+        out = np.empty(shape, dtype=np.bool_)
+    out[...] = masks[0]
+    for mask in masks[1:]:
+        if mask is not np.ma.nomask:
+            np.logical_or(out, mask, out=out)
+    return out
+
+
+def reduce_sum(arrays, out=None):
+    '''
+    Sums multiple arrays together without modifying any of them. A 2-D array
+    is reduced in a single pass, otherwise arrays are added to the output in
+    place so that no intermediate arrays are allocated. The result is masked
+    wherever any of the arrays are masked.
+
+    :param arrays: Arrays to sum.
+    :type arrays: iterable of np.ma.masked_array or 2-D np.ma.masked_array
+    :param out: Array to store the result in.
+    :type out: np.ma.masked_array or np.array or None
+    :raises IndexError: If arrays is empty.
+    :returns: The result of summing arrays.
+    :rtype: np.ma.masked_array or np.array
+    '''
+    if not _is_stacked(arrays):
+        arrays = list(arrays)
+    if not len(arrays):
+        raise IndexError('No arrays to sum.')
+
+    out_data = None if out is None else np.ma.getdata(out)
+    if _is_stacked(arrays):
+        masked = np.ma.isMaskedArray(arrays)
+        data = np.add.reduce(np.ma.getdata(arrays), axis=0, out=out_data)
+        masks = np.ma.getmask(arrays)
+        masks = [] if masks is np.ma.nomask else masks
+    else:
+        masked = any(np.ma.isMaskedArray(a) for a in arrays)
+        datas = [np.ma.getdata(a) for a in arrays]
+        if out_data is None:
+            dtype = reduce(np.promote_types, (d.dtype for d in datas))
+            shape = max((d.shape for d in datas), key=len)
+            out_data = np.empty(shape, dtype=dtype)
+        out_data[...] = datas[0]
+        for array in datas[1:]:
+            np.add(out_data, array, out=out_data)
+        data = out_data
+        masks = [np.ma.getmask(a) for a in arrays
+                 if np.ma.getmask(a) is not np.ma.nomask]
+
+    if not masked:
+        return data
+    if not np.ma.isMaskedArray(out):
+        out = np.ma.array(data, copy=False)
+    if not len(masks):
+        out.mask = np.ma.nomask
+    elif out.mask is np.ma.nomask:
+        out.mask = reduce_masks(masks)
+    else:
+        reduce_masks(masks, out=out.mask)
+    return out
+
+
 def merge_masks(masks):
     '''
-    ORs multiple masks together. Could this be done in one step with numpy?
+    ORs multiple masks together.
 
     :param masks: Masks to OR together.
     :type masks: iterable of np.ma.masked_array.mask
@@ -40,22 +184,21 @@ def merge_masks(masks):
     :returns: Single mask, the result of ORing masks.
     :rtype: np.ma.masked_array.mask
     '''
-    merged_mask = np.ma.make_mask(masks[0])
-    for mask in masks[1:]:
-        merged_mask = np.ma.mask_or(merged_mask, mask)
-    return merged_mask
+    return np.ma.make_mask(reduce_masks(masks))
 
 
 def mask_ratio(mask):
     '''
     Ratio of masked data (1 == all masked).
     '''
-    # Handle scalars.
-    if np.all(mask):
+    # Counted in a single pass; scalars and nomask have a size of 1.
+    masked = masked_count(mask)
+    size = np.size(mask)
+    if masked == size:
         return 1
-    elif not np.any(mask):
+    elif not masked:
         return 0
-    return mask.sum() / float(len(mask))
+    return masked / float(size)
 
 
 def percent_unmasked(mask):
@@ -67,7 +210,7 @@ def percent_unmasked(mask):
 
 def sum_arrays(arrays):
     '''
-    Sums multiple numpy arrays together.
+    Sums multiple numpy arrays together. The arrays are not modified.
 
     :param arrays: Arrays to sum.
     :type arrays: iterable of np.ma.masked_array
@@ -75,15 +218,13 @@ def sum_arrays(arrays):
     :returns: The result of summing arrays.
     :rtype: np.ma.masked_array
     '''
-    summed_array = arrays[0]
-    for array in arrays[1:]:
-        summed_array += array
-    return summed_array
+    return reduce_sum(arrays)
 
 
 def downsample_arrays(arrays):
     '''
-    Return arrays downsampled to the size of the smallest.
+    Return arrays downsampled to the size of the smallest. Lengths must be
+    integer multiples, see flightdatautilities.resample for other rates.
 
     :param arrays: Arrays to downsample.
     :type arrays: iterable of np.ma.masked_array
@@ -102,7 +243,7 @@ def downsample_arrays(arrays):
                 % lengths)
     downsampled_arrays = []
     for array in arrays:
-        step = len(array) / shortest
+        step = len(array) // shortest
         if step > 1:
             array = array[::step]
         downsampled_arrays.append(array)
@@ -111,7 +252,8 @@ def downsample_arrays(arrays):
 
 def upsample_arrays(arrays):
     '''
-    Return arrays upsampled to the size of the largest.
+    Return arrays upsampled to the size of the largest. Lengths must be
+    integer multiples, see flightdatautilities.resample for other rates.
 
     :param arrays: Arrays to upsample.
     :type arrays: iterable of np.ma.masked_array
@@ -139,7 +281,7 @@ def upsample_arrays(arrays):
     
     upsampled_arrays = []
     for array, length in zip(arrays, lengths):
-        repeat = largest / length
+        repeat = largest // length
         if repeat > 1:
             array = array.repeat(repeat)
         upsampled_arrays.append(array)
@@ -149,7 +291,9 @@ def upsample_arrays(arrays):
 def align_arrays(slave_array, master_array):
     '''
     Very basic aligning using repeat to upsample and skipping over samples to
-    downsample the slave array to the master frequency
+    downsample the slave array to the master frequency. Frequencies must be
+    integer multiples of each other and offsets are ignored, see
+    flightdatautilities.resample for a complete implementation.
 
     >>> align(np.arange(10), np.arange(20,30))  # equal length
     array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9])
@@ -168,8 +312,8 @@ def align_arrays(slave_array, master_array):
     if ratio > 1:
         # repeat slave to upsample
         # Q: Upsample using repeat good enough, or interpolate?
-        return slave_array.repeat(ratio)
+        return slave_array.repeat(int(round(ratio)))
     else:
         # take every other sample to downsample
-        return slave_array[0::1/ratio]
+        return slave_array[0::int(round(1 / ratio))]
 
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Flight Data Utilities: Array Streams
+
+Chunked counterparts of the functions within array_operations and resample
+for recordings which are too long to hold whole parameters in memory. Each
+function consumes iterables of aligned chunks, i.e. the nth chunk of every
+input covers the same samples, and produces chunks lazily.
+
+    masks = [iter_chunks(np.ma.getmaskarray(a), 65536) for a in arrays]
+    for mask in iter_merge_masks(masks):
+        ...
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+
+try:
+    from itertools import izip as zip
+except ImportError:
+    pass
+
+from flightdatautilities.array_operations import reduce_masks, reduce_sum
+from flightdatautilities.mask_statistics import masked_count
+from flightdatautilities.resample import (
+    EPSILON,
+    LINEAR,
+    METHODS,
+    NEAREST,
+    interpolate,
+    resample_length,
+)
+
+
+##############################################################################
+# Exports
+
+
+__all__ = ['chunked_mask_ratio', 'iter_chunks', 'iter_merge_masks',
+           'iter_resample', 'iter_sum_arrays']
+
+
+##############################################################################
+# Functions
+
+
+def iter_chunks(array, chunk_size):
+    '''
+    Split an array into consecutive views of at most chunk_size samples.
+
+    :param array: The array to split.
+    :type array: np.array or np.ma.masked_array
+    :param chunk_size: Number of samples per chunk.
+    :type chunk_size: int
+    :returns: Generator of chunks.
+    :rtype: generator of np.array or np.ma.masked_array
+    '''
+    for start in range(0, len(array), chunk_size):
+        yield array[start:start + chunk_size]
+
+
+def iter_merge_masks(mask_streams):
+    '''
+    Streaming merge_masks: ORs the aligned chunks of multiple masks.
+
+    :param mask_streams: Iterables of mask chunks, one per mask.
+    :type mask_streams: iterable of iterables of np.array
+    :returns: Generator of merged mask chunks.
+    :rtype: generator of np.array
+    '''
+    for chunks in zip(*mask_streams):
+        yield np.ma.make_mask(reduce_masks(chunks), shrink=False)
+
+
+def iter_sum_arrays(array_streams):
+    '''
+    Streaming sum_arrays: sums the aligned chunks of multiple arrays.
+
+    :param array_streams: Iterables of array chunks, one per array.
+    :type array_streams: iterable of iterables of np.ma.masked_array
+    :returns: Generator of summed chunks.
+    :rtype: generator of np.ma.masked_array
+    '''
+    for chunks in zip(*array_streams):
+        yield reduce_sum(chunks)
+
+
+def chunked_mask_ratio(masks):
+    '''
+    Streaming mask_ratio: ratio of masked data (1 == all masked) over all of
+    the chunks of a mask.
+
+    :param masks: Chunks of the mask.
+    :type masks: iterable of np.array
+    :rtype: int or float
+    '''
+    masked = size = 0
+    for mask in masks:
+        masked += masked_count(mask)
+        size += np.size(mask)
+    if masked == size:
+        return 1
+    elif not masked:
+        return 0
+    return masked / float(size)
+
+
+def iter_resample(chunks, frequency, output_frequency, offset=0,
+                  output_offset=0, method=LINEAR):
+    '''
+    Streaming resample: resamples consecutive chunks of an array, producing
+    the same samples as resampling the whole array at once.
+
+    Output samples are produced as soon as the input samples they depend on
+    have been consumed. The input samples which pending output samples depend
+    upon, at least the last sample of each chunk, are carried over so that
+    output samples between chunks are interpolated correctly.
+
+    :param chunks: Consecutive chunks of the array to resample.
+    :type chunks: iterable of np.ma.masked_array or np.array
+    :param frequency: Frequency of the array in Hz.
+    :type frequency: int or float
+    :param output_frequency: Frequency to resample to in Hz.
+    :type output_frequency: int or float
+    :param offset: Time of the first sample of the array in seconds.
+    :type offset: int or float
+    :param output_offset: Time of the first output sample in seconds.
+    :type output_offset: int or float
+    :param method: 'linear' or 'nearest', see resample.
+    :type method: str
+    :raises ValueError: If the method is not known.
+    :returns: Generator of resampled chunks, some of which may be empty.
+    :rtype: generator of np.ma.masked_array
+    '''
+    if method not in METHODS:
+        raise ValueError("Unknown resampling method '%s'." % method)
+    step = frequency / float(output_frequency)
+    first = (output_offset - offset) * frequency
+    carry = None  # Input samples carried over from the previous chunk.
+    carry_offset = 0  # Index of the first carried input sample.
+    consumed = 0  # Number of input samples consumed.
+    produced = 0  # Number of output samples produced.
+    dtype = None
+
+    def produce(window, window_start, stop):
+        data = np.ma.getdata(window)
+        mask = np.ma.getmask(window)
+        length = max(stop - produced, 0)
+        out = np.ma.array(np.empty(length, dtype=dtype),
+                          mask=np.empty(length, dtype=np.bool_))
+        positions = first + np.arange(produced, produced + length) * step
+        positions -= window_start
+        interpolate(data, None if mask is np.ma.nomask else mask,
+                    positions, method, out.data, out.mask)
+        return out
+
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if dtype is None:
+            dtype = np.ma.getdata(chunk).dtype
+            if method != NEAREST:
+                dtype = np.promote_types(dtype, np.float64)
+        if carry is None:
+            window, window_start = chunk, consumed
+        else:
+            window = np.ma.concatenate((carry, chunk))
+            window_start = carry_offset
+        consumed += len(chunk)
+        # Output samples up to the last consumed input sample are complete.
+        ready = int(np.floor((consumed - 1 + EPSILON - first) / step)) + 1
+        stop = min(ready, resample_length(consumed, frequency,
+                                          output_frequency))
+        out = produce(window, window_start, stop)
+        produced += len(out)
+        # Carry the input samples the next output sample depends upon, at
+        # least the last one.
+        carry_start = int(np.floor(first + produced * step + EPSILON))
+        carry_start = max(min(carry_start, consumed - 1), window_start)
+        carry = window[carry_start - window_start:]
+        carry_offset = carry_start
+        yield out
+
+    if carry is None:
+        return
+    # Remaining output samples fall after the last input sample.
+    stop = resample_length(consumed, frequency, output_frequency)
+    if stop > produced:
+        yield produce(carry, carry_offset, stop)
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
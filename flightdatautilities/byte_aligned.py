@@ -1,3 +1,5 @@
+from __future__ import print_function
+
 
 try:
     # bz2file provides support for multiple streams and a compatible interface.
@@ -12,9 +14,7 @@ import numpy as np
 import os
 
 
-logging.basicConfig(format='%(message)s')
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = logging.getLogger(name=__name__)
 
 
 SYNC_PATTERNS = {'Standard': (0x0247, 0x05B8, 0x0A47, 0x0DB8),
@@ -167,10 +167,10 @@ def inspect(file_obj_or_str, words_to_read):
 
 
 def main():
-    print 'FlightDataInspector (c) Copyright 2013 Flight Data Services, Ltd.'
-    print '  - Powered by POLARIS'
-    print '  - http://www.flightdatacommunity.com'
-    print ''
+    print('FlightDataInspector (c) Copyright 2013 Flight Data Services, Ltd.')
+    print('  - Powered by POLARIS')
+    print('  - http://www.flightdatacommunity.com')
+    print('')
 
     parser = argparse.ArgumentParser()
 
@@ -184,8 +184,8 @@ def main():
 
     args = parser.parse_args()
 
-    if args.debug:
-        logger.setLevel(logging.DEBUG)
+    logging.basicConfig(format='%(message)s')
+    logger.setLevel(logging.DEBUG if args.debug else logging.INFO)
 
     if os.path.splitext(args.file_path)[1].lower() == '.bz2':
         file_obj = bz2.BZ2File(args.file_path)
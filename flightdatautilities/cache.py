@@ -3,12 +3,56 @@
 
 '''
 Flight Data Utilities: Cache
+
+Memoization of function results in a bounded, thread-safe store. Entries
+expire a timeout after they were cached and the least recently used entries
+are evicted once the store is full.
+
+    @memoize(timeout=60, maxsize=256)
+    def lookup(model, series):
+        ...
+
+    lookup.cache.hits, lookup.cache.misses
+
+Values may be shared between processes on one node, and survive restarts,
+using the SharedMemoryCache or DiskCache backends:
+
+    @memoize(backend=DiskCache)
+    def lookup(model, series):
+        ...
+
+NumPy array arguments are keyed by a digest of their contents rather than
+being pickled. Functions called repeatedly with the same large arrays may
+instead key them by identity, in which case touch() must be called after
+modifying an array in place:
+
+    @memoize(arrays=IDENTITY)
+    def derive(array):
+        ...
+
+    array[10:20] = np.ma.masked
+    touch(array)
 '''
 
 ###############################################################################
 # Imports
 
 
+import errno
+import hashlib
+import itertools
+import logging
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
+import numpy as np
+
 try:
     import django.db.models
 except ImportError:
@@ -19,7 +63,7 @@ try:
 except ImportError:
     import pickle
 
-from datetime import datetime, timedelta
+from collections import OrderedDict, namedtuple
 from decorator import decorator
 
 
@@ -27,15 +71,256 @@ from decorator import decorator
 # Exports
 
 
-__all__ = ['memoize']
+__all__ = ['BaseCache', 'Cache', 'CacheInfo', 'DiskCache', 'PickleSerializer',
+           'SharedMemoryCache', 'StatsLogger', 'array_key', 'cache_stats',
+           'log_cache_stats', 'make_key', 'memoize', 'touch']
+
+
+###############################################################################
+# Constants
+
+
+TIMEOUT = 300  # seconds
+MAXSIZE = 1024  # entries
+
+SHARED_MEMORY_PATH = '/dev/shm'
+
+# Expiry time at the start of entries stored in files:
+EXPIRY = struct.Struct('<d')
+
+# Reasons for evicting entries:
+EXPIRED = 'expired'    # The entry had expired.
+CAPACITY = 'capacity'  # The cache was full.
+
+STATS_INTERVAL = 60  # seconds
+
+# SharedMemoryCache evicts entries once every maxsize / EVICTION_DIVISOR sets
+# as eviction lists the entries, so it may briefly hold that many extra:
+EVICTION_DIVISOR = 8
+
+# Returned by Cache.get() when a key is missing or has expired:
+MISSING = object()
+
+# Clock used for expiry, monotonic where available:
+_now = getattr(time, 'monotonic', time.time)
+
+# Moves an entry to the end of an OrderedDict in O(1), None before Python 3.2:
+_move_to_end = getattr(OrderedDict, 'move_to_end', None)
+
+# Strategies for keying NumPy array arguments:
+DIGEST = 'digest'      # Digest of the contents of the array.
+IDENTITY = 'identity'  # Identity of the array and its version, see touch().
+ARRAY_KEYS = (DIGEST, IDENTITY)
+
+
+###############################################################################
+# Globals
+
+
+logger = logging.getLogger(name=__name__)
+
+# All live caches, see cache_stats():
+_caches = weakref.WeakSet()
+_caches_lock = threading.Lock()
+
+# id(array) -> (weak reference, serial number, version) for arrays keyed by
+# identity. Serial numbers are never reused, unlike ids.
+_identities = {}
+_identities_lock = threading.RLock()
+_serials = itertools.count()
 
 
 ###############################################################################
 # Functions
 
 
+def _identity(array):
+    '''
+    :returns: Serial number and version of an array, registering it if new.
+    :rtype: (int, int)
+    '''
+    array_id = id(array)
+    with _identities_lock:
+        entry = _identities.get(array_id)
+        if entry is None or entry[0]() is not array:
+            def forget(ref, array_id=array_id):
+                with _identities_lock:
+                    if array_id in _identities and \
+                            _identities[array_id][0] is ref:
+                        del _identities[array_id]
+            entry = (weakref.ref(array, forget), next(_serials), 0)
+            _identities[array_id] = entry
+        return entry[1:]
+
+
+def touch(array):
+    '''
+    Invalidate values cached for an array keyed by identity after it has
+    been modified in place.
+
+    :param array: The modified array.
+    :type array: np.ndarray
+    '''
+    _identity(array)
+    with _identities_lock:
+        ref, serial, version = _identities[id(array)]
+        _identities[id(array)] = (ref, serial, version + 1)
+
+
+def array_key(array, strategy=DIGEST):
+    '''
+    Create a hashable key for a NumPy array without pickling it.
+
+    The digest strategy hashes the raw buffer and mask of the array along
+    with its type, dtype and shape, copying only non-contiguous arrays. The
+    identity strategy does not read the array at all but relies upon touch()
+    being called whenever the array is modified in place.
+
+    :param array: The array.
+    :type array: np.ndarray or np.ma.MaskedArray
+    :param strategy: DIGEST or IDENTITY.
+    :type strategy: str
+    :raises ValueError: If the strategy is not known or an object array is
+        digested.
+    :rtype: tuple
+    '''
+    if strategy == IDENTITY:
+        return (IDENTITY,) + _identity(array)
+    if strategy != DIGEST:
+        raise ValueError("Unknown array key strategy '%s'." % strategy)
+    if array.dtype.hasobject:
+        raise ValueError('Cannot digest arrays of objects.')
+    digest = hashlib.sha1(np.ascontiguousarray(np.ma.getdata(array)))
+    mask = np.ma.getmask(array)
+    if mask is not np.ma.nomask:
+        digest.update(np.ascontiguousarray(mask))
+    return (DIGEST, type(array).__name__, array.dtype.str, array.shape,
+            mask is not np.ma.nomask, digest.hexdigest())
+
+
+def make_key(args, kwargs=None, arrays=DIGEST):
+    '''
+    Create a cache key from the arguments of a call.
+
+    Arguments which are all hashable are used directly and NumPy arrays are
+    replaced by array keys, only other unhashable arguments are pickled. The
+    type of each argument is included so that arguments which compare equal,
+    e.g. 1, 1.0 and True, are cached separately as with
+    functools.lru_cache(typed=True).
+
+    :param args: Positional arguments.
+    :type args: tuple
+    :param kwargs: Keyword arguments.
+    :type kwargs: dict or None
+    :param arrays: Strategy for keying NumPy arrays, see array_key, or None
+        to pickle them.
+    :type arrays: str or None
+    :returns: Hashable cache key.
+    :rtype: tuple or str
+    '''
+    key = tuple(args)
+
+    # Improve caching support for Django models:
+    try:
+        if key and isinstance(key[0], django.db.models.Model):
+            key = (key[0].pk,) + key[1:]
+    except NameError:
+        pass  # Skip if we didn't have Django :)
+
+    types = tuple(type(arg) for arg in args)
+    if kwargs:
+        items = sorted(kwargs.items())
+        key += (KWARGS_MARK,) + tuple(items)
+        types += tuple(type(value) for _, value in items)
+
+    if arrays is not None:
+        key = tuple(_array_arg(a, arrays) for a in key)
+    key += types
+
+    try:
+        hash(key)
+    except TypeError:
+        # Handle any unhashable arguments by pickling:
+        key = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+    return key
+
+
+def _array_arg(arg, strategy):
+    if isinstance(arg, tuple) and len(arg) == 2 and \
+            isinstance(arg[1], np.ndarray):
+        return arg[0], _array_arg(arg[1], strategy)  # Keyword argument.
+    if isinstance(arg, np.ndarray) and not arg.dtype.hasobject:
+        return array_key(arg, strategy)
+    return arg
+
+
+def cache_stats():
+    '''
+    Statistics of all live caches, e.g. those of memoized functions.
+
+    :rtype: list of CacheInfo
+    '''
+    with _caches_lock:
+        caches = list(_caches)
+    return sorted((c.info() for c in caches), key=lambda i: i.namespace)
+
+
+def log_cache_stats(level=logging.INFO):
+    '''
+    Log the statistics of all live caches.
+
+    :param level: Logging level.
+    :type level: int
+    '''
+    for info in cache_stats():
+        logger.log(level, 'Cache `%s`: %d entries (%s bytes), %d hits, '
+                   '%d misses (%.1f%% hit rate), evicted %s.',
+                   info.namespace, info.size,
+                   'unknown' if info.memory is None else info.memory,
+                   info.hits, info.misses, info.hit_rate * 100,
+                   ', '.join('%d %s' % (v, k) for k, v in
+                             sorted(info.evictions.items())))
+
+
 def memoize(*args, **kwargs):
     '''
+    Decorator caching the results of a function by its arguments.
+
+    May be used directly or invoked with options:
+
+        @memoize
+        def f(x): ...
+
+        @memoize(timeout=60, maxsize=None)
+        def g(x): ...
+
+    The cache of a decorated function is available as its cache attribute,
+    with its cache_info() and cache_clear() methods also available on the
+    function.
+    Values are computed outside of the cache lock so concurrent misses of
+    the same key may each call the function.
+
+    :param timeout: Seconds until cached values expire, None to never expire.
+    :type timeout: int or float or None
+    :param maxsize: Maximum number of cached values, None for no limit.
+    :type maxsize: int or None
+    :param arrays: Strategy for keying NumPy array arguments, DIGEST or
+        IDENTITY, see array_key.
+    :type arrays: str or None
+    :param backend: Cache class, or a callable accepting the same arguments,
+        called with the timeout, maxsize and namespace, e.g. DiskCache to
+        share values between processes. A cache instance may also be
+        provided.
+    :type backend: type or callable or BaseCache
+    :param namespace: Separates the values of the function from those of
+        other functions in a shared backend. Defaults to the module and
+        qualified name of the function. Functions made by the same factory
+        share a qualified name, as do functions of the same name within a
+        module on Python 2 which has no __qualname__, so they must be given
+        distinct namespaces to share a backend.
+    :type namespace: str or None
+    :raises ValueError: If arrays are keyed by identity within a backend
+        shared between processes.
     '''
     # Check whether the decorator has been invoked:
     invoked = bool(not args or kwargs)
@@ -43,52 +328,548 @@ def memoize(*args, **kwargs):
         obj = args[0]
 
     # Lookup options provided to the decorator:
-    timeout = kwargs.get('timeout', 300)
+    timeout = kwargs.get('timeout', TIMEOUT)
+    maxsize = kwargs.get('maxsize', MAXSIZE)
+    arrays = kwargs.get('arrays', DIGEST)
+    backend = kwargs.get('backend', Cache)
+    namespace = kwargs.get('namespace')
+    if arrays is not None and arrays not in ARRAY_KEYS:
+        raise ValueError("Unknown array key strategy '%s'." % arrays)
 
     def memoizer(obj):
+        if isinstance(backend, BaseCache):
+            cache = backend
+        else:
+            cache = backend(timeout=timeout, maxsize=maxsize,
+                            namespace=namespace or '%s.%s' % (
+                                obj.__module__,
+                                getattr(obj, '__qualname__', obj.__name__)))
+        if cache.shared and arrays == IDENTITY:
+            raise ValueError('Arrays cannot be keyed by identity within a '
+                             'cache shared between processes.')
+
+        def wrapper(obj, *args, **kwargs):
+            key = make_key(args, kwargs, arrays=arrays)
+            value = cache.get(key)
+            if value is MISSING:
+                value = obj(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        memoized = decorator(wrapper)(obj)
+        # Make the cache accessible to the outside world:
+        memoized.cache = cache
+        memoized.cache_info = cache.info
+        memoized.cache_clear = cache.clear
+        return memoized
+
+    # Return the decorated function (invoking if required):
+    return memoizer if invoked else memoizer(obj)
+
+
+###############################################################################
+# Classes
+
+
+class _KwargsMark(object):
+    '''
+    Separates positional from keyword arguments within keys, see make_key().
+    '''
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        # Pickle by reference so that keys are stable across processes.
+        return 'KWARGS_MARK'
+
+
+KWARGS_MARK = _KwargsMark()
+
+
+CacheInfo = namedtuple('CacheInfo', (
+    'namespace',  # Namespace of the cache, e.g. the memoized function.
+    'hits',       # Number of lookups which found a value.
+    'misses',     # Number of lookups which did not find a value.
+    'hit_rate',   # Ratio of hits to lookups.
+    'size',       # Number of entries.
+    'maxsize',    # Maximum number of entries or None.
+    'timeout',    # Seconds until entries expire or None.
+    'memory',     # Approximate bytes used by entries or None if unknown.
+    'evictions',  # Number of entries evicted by reason.
+))
+
+
+class PickleSerializer(object):
+    '''
+    Serializes cached values for backends which store them outside of the
+    process. Other serializers must provide the same dumps() and loads().
+    '''
+
+    def __init__(self, protocol=pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def dumps(self, value):
+        return pickle.dumps(value, self.protocol)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+class BaseCache(object):
+    '''
+    Interface shared by cache backends.
+
+    Subclasses implement _load(), set(), delete(), clear() and __len__().
+    Backends which are shared between processes set shared to True and
+    convert keys to digests with _digest() so that they are stable across
+    processes.
+    '''
+
+    shared = False
+
+    def __init__(self, timeout=TIMEOUT, maxsize=MAXSIZE, namespace=''):
         '''
+        :param timeout: Seconds until entries expire, None to never expire.
+        :type timeout: int or float or None
+        :param maxsize: Maximum number of entries, None for no limit.
+        :type maxsize: int or None
+        :param namespace: Separates the entries of different functions
+            within backends shared between them.
+        :type namespace: str
         '''
-        # Make the cache accessible to the outside world:
-        obj.__cache = {}
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {EXPIRED: 0, CAPACITY: 0}
+        self._lock = threading.RLock()
+        with _caches_lock:
+            _caches.add(self)
 
-        def wrapper(obj, *args, **kwargs):
-            '''
-            '''
-            now = datetime.now()
-            key = args
+    def __contains__(self, key):
+        return self.peek(key) is not MISSING
+
+    def _digest(self, key):
+        key = pickle.dumps(key, 2)
+        return hashlib.sha1(self.namespace.encode('utf-8') + b'\0' +
+                            key).hexdigest()
+
+    def _load(self, key, touch):
+        raise NotImplementedError
+
+    def _evicted(self, reason, count=1):
+        with self._lock:
+            self.evictions[reason] += count
+
+    def _reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+            self.evictions = dict.fromkeys(self.evictions, 0)
+
+    def memory(self):
+        '''
+        :returns: Approximate bytes used by entries or None if unknown.
+        :rtype: int or None
+        '''
+        return None
+
+    def info(self):
+        '''
+        :returns: Statistics of the cache.
+        :rtype: CacheInfo
+        '''
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            evictions = dict(self.evictions)
+        lookups = hits + misses
+        return CacheInfo(self.namespace, hits, misses,
+                         hits / float(lookups) if lookups else 0.0,
+                         len(self), self.maxsize, self.timeout,
+                         self.memory(), evictions)
+
+    def peek(self, key):
+        '''
+        Look up a value without counting a hit or miss or updating its use.
+
+        :returns: The cached value or MISSING.
+        '''
+        return self._load(key, touch=False)
+
+    def get(self, key):
+        '''
+        :param key: Hashable key, see make_key.
+        :returns: The cached value or MISSING if missing or expired.
+        '''
+        value = self._load(key, touch=True)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class Cache(BaseCache):
+    '''
+    Thread-safe in-process store with a time to live and least recently used
+    eviction.
+
+    Entries are kept in an ordered dictionary from least to most recently
+    used so that lookups, insertions and evictions are all O(1). Expired
+    entries are removed lazily when they are looked up or evicted.
+    '''
+
+    def __init__(self, timeout=TIMEOUT, maxsize=MAXSIZE, namespace=''):
+        super(Cache, self).__init__(timeout=timeout, maxsize=maxsize,
+                                    namespace=namespace)
+        self._data = OrderedDict()  # key -> (expiry time, value)
+
+    def __len__(self):
+        return len(self._data)
+
+    def _touch(self, key, entry):
+        # Move the entry to the most recently used end:
+        if _move_to_end is not None:
+            _move_to_end(self._data, key)
+        else:
+            del self._data[key]
+            self._data[key] = entry
+
+    def _load(self, key, touch):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expiry, value = entry
+            if expiry is not None and expiry < _now():
+                if touch:
+                    del self._data[key]
+                    self._evicted(EXPIRED)
+                return MISSING
+            if touch:
+                self._touch(key, entry)
+            return value
+
+    def set(self, key, value):
+        '''
+        Cache a value, evicting the least recently used entry if full.
+
+        :param key: Hashable key, see make_key.
+        :param value: Value to cache, which may be falsy.
+        '''
+        expiry = None if self.timeout is None else _now() + self.timeout
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expiry, value)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    _, (expiry, _) = self._data.popitem(last=False)
+                    expired = expiry is not None and expiry < _now()
+                    self._evicted(EXPIRED if expired else CAPACITY)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
 
-            # Improve caching support for Django models:
+    def clear(self):
+        '''
+        Remove all entries and reset the statistics.
+        '''
+        with self._lock:
+            self._data.clear()
+            self._reset_stats()
+
+    def memory(self):
+        '''
+        :returns: Approximate bytes used by cached values, counting the data
+            of arrays and the shallow size of other values.
+        :rtype: int
+        '''
+        with self._lock:
+            values = [v for _, v in self._data.values()]
+        return sum(getattr(v, 'nbytes', None) or sys.getsizeof(v)
+                   for v in values)
+
+
+class SharedMemoryCache(BaseCache):
+    '''
+    Store shared between processes on one node, keeping each entry in a file
+    within a memory-backed filesystem (/dev/shm) so that it survives process
+    restarts until the node is rebooted.
+
+    Entries are written to a temporary file which is then renamed over the
+    entry so that readers never see a partially written entry. When full the
+    oldest entries are evicted, which requires listing the entries, so this
+    is only checked once every maxsize / EVICTION_DIVISOR sets. Entries which
+    cannot be read, e.g. pickled from a class which has since changed, are
+    removed and treated as missing.
+    '''
+
+    shared = True
+
+    def __init__(self, timeout=TIMEOUT, maxsize=None, namespace='',
+                 path=None, serializer=None):
+        '''
+        :param path: Directory to store entries in, by default within
+            /dev/shm if available.
+        :type path: str or None
+        :param serializer: Serializer for values, by default pickle.
+        :type serializer: PickleSerializer or None
+        '''
+        super(SharedMemoryCache, self).__init__(
+            timeout=timeout, maxsize=maxsize, namespace=namespace)
+        if path is None:
+            path = os.path.join(SHARED_MEMORY_PATH if
+                                os.path.isdir(SHARED_MEMORY_PATH) else
+                                tempfile.gettempdir(),
+                                'flightdatautilities-cache')
+        self.path = os.path.join(path, self._digest(None))
+        self.serializer = serializer or PickleSerializer()
+        self._sets = itertools.count(1)
+
+    def __len__(self):
+        return len(self._entries())
+
+    def _entries(self):
+        try:
+            return [n for n in os.listdir(self.path) if not n.startswith('.')]
+        except OSError:
+            return []
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, self._digest(key))
+
+    def _load(self, key, touch):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as file_obj:
+                data = file_obj.read()
+        except (IOError, OSError):
+            return MISSING
+        try:
+            expiry, = EXPIRY.unpack_from(data)
+        except struct.error:
+            return self._unreadable(entry_path, 'truncated')
+        if expiry < time.time():
+            if touch and self._remove(entry_path):
+                self._evicted(EXPIRED)
+            return MISSING
+        try:
+            return self.serializer.loads(data[EXPIRY.size:])
+        except Exception as err:
+            return self._unreadable(entry_path, err)
+
+    def _unreadable(self, entry_path, reason):
+        logger.warning('Removing unreadable cache entry `%s`: %s', entry_path,
+                       reason)
+        self._remove(entry_path)
+        return MISSING
+
+    def _remove(self, entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            return False
+        return True
+
+    def set(self, key, value):
+        expiry = float('inf') if self.timeout is None \
+            else time.time() + self.timeout
+        data = EXPIRY.pack(expiry) + self.serializer.dumps(value)
+        try:
+            os.makedirs(self.path)
+        except OSError as err:
+            if err.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix='.')
+        try:
+            with os.fdopen(fd, 'wb') as file_obj:
+                file_obj.write(data)
+            os.rename(temp_path, self._entry_path(key))
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        if self.maxsize is not None and not next(self._sets) % max(
+                self.maxsize // EVICTION_DIVISOR, 1):
+            self._evict()
+
+    def _evict(self):
+        entries = self._entries()
+        if len(entries) <= self.maxsize:
+            return
+        modified = []
+        for name in entries:
+            entry_path = os.path.join(self.path, name)
             try:
-                if isinstance(key[0], django.db.models.Model):
-                    key = (key[0].pk,) + key[1:]
-            except NameError:
-                pass  # Skip if we didn't have Django :)
+                modified.append((os.path.getmtime(entry_path), entry_path))
+            except OSError:
+                pass
+        modified.sort()
+        for _, entry_path in modified[:len(modified) - self.maxsize]:
+            if self._remove(entry_path):
+                self._evicted(CAPACITY)
 
-            # Clear any stale items from the cache:
-            obj.__cache = {k: v
-                           for k, v in obj.__cache.iteritems()
-                           if v['timeout'] >= now}
+    def delete(self, key):
+        self._remove(self._entry_path(key))
 
-            # Handle any unhashable arguments by pickling:
-            key = pickle.dumps(key)
+    def clear(self):
+        for name in self._entries():
+            self._remove(os.path.join(self.path, name))
+        self._reset_stats()
 
-            item = obj.__cache.get(key)
+    def memory(self):
+        total = 0
+        for name in self._entries():
+            try:
+                total += os.path.getsize(os.path.join(self.path, name))
+            except OSError:
+                pass
+        return total
 
-            # Fetch the value for the cache if it is missing from the cache or
-            # the entry in the cache has expired:
-            if not item:
-                obj.__cache[key] = {
-                    'timeout': now + timedelta(seconds=timeout),
-                    'value': obj(*args, **kwargs),
-                }
 
-            # Return the value from the cache:
-            return obj.__cache[key]['value']
+class DiskCache(BaseCache):
+    '''
+    Store shared between processes on one node within an SQLite database,
+    surviving restarts of both the processes and the node.
 
-        return decorator(wrapper)(obj)
+    Each thread of each process uses its own connection. When full the
+    entries stored earliest are evicted.
+    '''
 
-    # Return the decorated function (invoking if required):
-    return memoizer if invoked else memoizer(obj)
+    shared = True
+
+    def __init__(self, timeout=TIMEOUT, maxsize=None, namespace='',
+                 path=None, serializer=None):
+        '''
+        :param path: Path of the database, by default within the temporary
+            directory.
+        :type path: str or None
+        :param serializer: Serializer for values, by default pickle.
+        :type serializer: PickleSerializer or None
+        '''
+        super(DiskCache, self).__init__(timeout=timeout, maxsize=maxsize,
+                                        namespace=namespace)
+        self.path = path or os.path.join(tempfile.gettempdir(),
+                                         'flightdatautilities-cache.sqlite')
+        self.serializer = serializer or PickleSerializer()
+        self._local = threading.local()
+
+    def _connection(self):
+        # Connections must not be shared between threads or forked processes.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, '
+                'expiry REAL, stored REAL, value BLOB, '
+                'PRIMARY KEY (namespace, key))')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expiry ON '
+                               'cache (namespace, expiry)')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_stored ON '
+                               'cache (namespace, stored)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM cache WHERE namespace = ? AND expiry >= ?',
+            (self.namespace, time.time())).fetchone()[0]
+
+    def _load(self, key, touch):
+        row = self._connection().execute(
+            'SELECT expiry, value FROM cache WHERE namespace = ? AND key = ?',
+            (self.namespace, self._digest(key))).fetchone()
+        if row is None or row[0] < time.time():
+            return MISSING
+        try:
+            return self.serializer.loads(bytes(row[1]))
+        except Exception as err:
+            logger.warning('Removing unreadable cache entry in `%s`: %s',
+                           self.path, err)
+            self.delete(key)
+            return MISSING
+
+    def set(self, key, value):
+        now = time.time()
+        expiry = float('inf') if self.timeout is None else now + self.timeout
+        data = sqlite3.Binary(self.serializer.dumps(value))
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+            (self.namespace, self._digest(key), expiry, now, data))
+        cursor = connection.execute(
+            'DELETE FROM cache WHERE namespace = ? AND expiry < ?',
+            (self.namespace, now))
+        if cursor.rowcount > 0:
+            self._evicted(EXPIRED, cursor.rowcount)
+        if self.maxsize is not None:
+            cursor = connection.execute(
+                'DELETE FROM cache WHERE namespace = ? AND key IN ('
+                'SELECT key FROM cache WHERE namespace = ? '
+                'ORDER BY stored DESC LIMIT -1 OFFSET ?)',
+                (self.namespace, self.namespace, self.maxsize))
+            if cursor.rowcount > 0:
+                self._evicted(CAPACITY, cursor.rowcount)
+
+    def delete(self, key):
+        self._connection().execute(
+            'DELETE FROM cache WHERE namespace = ? AND key = ?',
+            (self.namespace, self._digest(key)))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache WHERE namespace = ?',
+                                   (self.namespace,))
+        self._reset_stats()
+
+    def memory(self):
+        return self._connection().execute(
+            'SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache '
+            'WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+
+
+class StatsLogger(threading.Thread):
+    '''
+    Daemon thread periodically logging the statistics of all live caches.
+
+        stats_logger = StatsLogger(interval=300)
+        stats_logger.start()
+        ...
+        stats_logger.stop()
+    '''
+
+    def __init__(self, interval=STATS_INTERVAL, level=logging.INFO):
+        '''
+        :param interval: Seconds between logging statistics.
+        :type interval: int or float
+        :param level: Logging level.
+        :type level: int
+        '''
+        super(StatsLogger, self).__init__(name='CacheStatsLogger')
+        self.daemon = True
+        self.interval = interval
+        self.level = level
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            log_cache_stats(self.level)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
 
 
 ###############################################################################
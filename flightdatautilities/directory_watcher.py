@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Flight Data Utilities: Directory Watcher
+
+Watches source directories for files matching any of a list of regexps using
+Linux inotify, rather than repeatedly rescanning the directories. A file is
+reported once it has been left alone for a settle time (by default 10
+seconds) and is then recorded in a persistent store of known files so that it
+is never reported twice, even across restarts.
+
+    known_files = KnownFiles('/var/lib/watcher/known_files.txt')
+    watcher = DirectoryWatcher(['/data/incoming'], [r'.*\\.SAC$'],
+                               known_files=known_files)
+    for file_path in watcher.watch():
+        copy_file(file_path, '/data/processing', postfix='')
+'''
+
+##############################################################################
+# Imports
+
+
+import codecs
+import ctypes
+import ctypes.util
+import errno
+import io
+import logging
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+
+from flightdatautilities.filesystem_tools import scan_files, scan_subdirs
+
+
+##############################################################################
+# Exports
+
+
+__all__ = ['DirectoryWatcher', 'Inotify', 'KnownFiles']
+
+
+##############################################################################
+# Globals
+
+
+logger = logging.getLogger(name=__name__)
+
+
+##############################################################################
+# Constants
+
+
+# Event masks from <sys/inotify.h>:
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o0004000
+
+# Events which mean a file has been written to since it was last seen:
+FILE_CHANGED = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# Events which mean a file is no longer in a watched directory:
+FILE_REMOVED = IN_DELETE | IN_MOVED_FROM
+WATCH_MASK = (FILE_CHANGED | FILE_REMOVED | IN_DELETE_SELF | IN_MOVE_SELF |
+              IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+SETTLE_TIME = 10  # seconds
+
+
+##############################################################################
+# Functions
+
+
+if bytes is str:
+    def _native_path(path):
+        '''
+        :returns: The path as a native string, encoded as the filesystem
+            expects if provided as unicode. Linux file names are UTF-8 by
+            convention, which is used when the locale only allows ASCII.
+        :rtype: str
+        '''
+        if isinstance(path, unicode):
+            encoding = codecs.lookup(sys.getfilesystemencoding() or
+                                     'ascii').name
+            return path.encode('utf-8' if encoding == 'ascii' else encoding)
+        return path
+
+    _path_bytes = _native_path
+else:
+    # Names which are not valid in the filesystem encoding are decoded with
+    # surrogate escapes and round trip back to the same bytes.
+    _native_path = os.fsdecode
+    _path_bytes = os.fsencode
+
+
+##############################################################################
+# Classes
+
+
+class Inotify(object):
+    '''
+    Minimal ctypes wrapper around the Linux inotify API.
+    '''
+
+    _libc = None
+
+    def __init__(self):
+        if Inotify._libc is None:
+            Inotify._libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                        use_errno=True)
+        self.fd = self._check(self._libc.inotify_init1(IN_CLOEXEC |
+                                                       IN_NONBLOCK))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _check(self, result):
+        if result < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return result
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        '''
+        :param path: Path of the directory to watch.
+        :type path: str
+        :param mask: Events to watch for.
+        :type mask: int
+        :returns: The watch descriptor.
+        :rtype: int
+        '''
+        return self._check(self._libc.inotify_add_watch(self.fd,
+                                                        _path_bytes(path),
+                                                        mask))
+
+    def rm_watch(self, wd):
+        self._check(self._libc.inotify_rm_watch(self.fd, wd))
+
+    def read_events(self, timeout=None):
+        '''
+        Wait for and read the queued events.
+
+        :param timeout: Seconds to wait for events, None waits indefinitely.
+        :type timeout: float or None
+        :returns: Events as (wd, mask, cookie, name) tuples, empty on timeout.
+            Names are native strings, see _native_path.
+        :rtype: list of tuple
+        '''
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as err:
+            if err.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, cookie, _native_path(name)))
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class KnownFiles(object):
+    '''
+    Persistent set of file paths which have already been reported.
+
+    Paths are normalised before being compared so that the same file cannot
+    be known twice under different spellings of its path. Each new path is
+    appended to the store file immediately, as the bytes of the path in the
+    filesystem so that any file name can be stored.
+    '''
+
+    def __init__(self, file_path=None):
+        '''
+        :param file_path: File to persist known paths in, None to keep them in
+            memory only.
+        :type file_path: str or None
+        '''
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._paths = set()
+        if file_path and os.path.exists(file_path):
+            with io.open(file_path, 'rb') as file_obj:
+                self._paths.update(_native_path(line.rstrip(b'\n'))
+                                   for line in file_obj if line.strip())
+
+    def __contains__(self, path):
+        return self._normalise(path) in self._paths
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(sorted(self._paths))
+
+    def _normalise(self, path):
+        return os.path.normcase(os.path.realpath(_native_path(path)))
+
+    def add(self, path):
+        '''
+        :param path: Path of the file to add.
+        :type path: str
+        :returns: Whether the path was added, False if it was already known.
+        :rtype: bool
+        '''
+        path = self._normalise(path)
+        with self._lock:
+            if path in self._paths:
+                return False
+            if self.file_path:
+                with io.open(self.file_path, 'ab') as file_obj:
+                    file_obj.write(_path_bytes(path) + b'\n')
+            self._paths.add(path)
+            return True
+
+
+class DirectoryWatcher(object):
+    '''
+    Reports new files within source directories and their subdirectories
+    which match any of the provided regexps once they have settled.
+    '''
+
+    def __init__(self, paths, regexes=None, settle_time=SETTLE_TIME,
+                 known_files=None):
+        '''
+        :param paths: Source directories to watch.
+        :type paths: iterable of str
+        :param regexes: Only report files with a name matching any regex.
+        :type regexes: iterable of str or compiled regexes
+        :param settle_time: Seconds a file must be left alone before it is
+            reported.
+        :type settle_time: int or float
+        :param known_files: Store of files which have already been reported.
+        :type known_files: KnownFiles or None
+        '''
+        self.paths = [os.path.abspath(_native_path(p)) for p in paths]
+        self.regexes = [re.compile(r) for r in regexes or ()]
+        self.settle_time = settle_time
+        self.known_files = known_files if known_files is not None \
+            else KnownFiles()
+        self._inotify = None
+        self._watches = {}  # wd -> directory path.
+        self._pending = {}  # file path -> time of last event.
+
+    def _matches(self, name):
+        return not self.regexes or any(r.match(name) for r in self.regexes)
+
+    def _add_tree(self, path):
+        '''
+        Watch a directory and its subdirectories, queueing any files already
+        within them. Watches are added before scanning so that files created
+        meanwhile are not missed.
+        '''
+        for dir_path in [path] + [e.path for e in scan_subdirs(path)]:
+            try:
+                wd = self._inotify.add_watch(dir_path)
+            except OSError as err:
+                logger.warning('Cannot watch directory `%s`: %s', dir_path,
+                               err)
+                continue
+            self._watches[wd] = dir_path
+        for entry in scan_files(path, regexes=self.regexes):
+            if entry.path in self.known_files:
+                continue
+            try:
+                modified = entry.stat().st_mtime
+            except OSError:
+                continue
+            self._pending.setdefault(entry.path, modified)
+
+    def _handle_event(self, wd, mask, name, now):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning('Inotify event queue overflowed, rescanning.')
+            for path in self.paths:
+                self._add_tree(path)
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        dir_path = self._watches.get(wd)
+        if dir_path is None or not name:
+            return
+        path = os.path.join(dir_path, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path)
+        elif mask & FILE_REMOVED:
+            self._pending.pop(path, None)
+        elif mask & FILE_CHANGED and self._matches(name):
+            self._pending[path] = now
+
+    def _settled(self, now):
+        '''
+        Pop the pending files which have been left alone for the settle time.
+        '''
+        settled = []
+        for path, last_event in list(self._pending.items()):
+            if now - last_event < self.settle_time:
+                continue
+            del self._pending[path]
+            if os.path.isfile(path) and self.known_files.add(path):
+                settled.append(path)
+        return sorted(settled)
+
+    def watch(self, timeout=None):
+        '''
+        Generator yielding paths of new files once they have settled. Files
+        already within the source directories are reported too unless known.
+
+        :param timeout: Stop once no file has been reported for this many
+            seconds, None to watch indefinitely.
+        :type timeout: float or None
+        :returns: Generator of file paths.
+        :rtype: generator of str
+        '''
+        self._inotify = Inotify()
+        try:
+            for path in self.paths:
+                self._add_tree(path)
+            last_reported = time.time()
+            while True:
+                now = time.time()
+                for path in self._settled(now):
+                    last_reported = now
+                    yield path
+                wait = None
+                if self._pending:
+                    wait = max(min(self._pending.values()) +
+                               self.settle_time - now, 0)
+                if timeout is not None:
+                    remaining = last_reported + timeout - now
+                    if remaining <= 0:
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+                events = self._inotify.read_events(wait)
+                now = time.time()
+                for wd, mask, cookie, name in events:
+                    self._handle_event(wd, mask, name, now)
+        finally:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
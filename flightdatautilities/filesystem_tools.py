@@ -10,17 +10,212 @@
     TODO: Looks like some files are being found twice dispite being added
     to the known files. Perhaps they should be deleted instead of added to a
     list?
+
+    See directory_watcher for an inotify based watcher which avoids polling
+    and keeps a persistent, de-duplicated store of known files.
 """
 
 import bz2
+import ctypes
+import errno
 import hashlib
 import mimetypes
 import os
 import platform
+import re
 import shutil
+import struct
 import subprocess
+import tempfile
+import threading
+import time
 import unittest
 import zipfile
+import zlib
+
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows.
+    fcntl = None
+
+try:
+    from os import scandir
+except ImportError:
+    # Backport of os.scandir for Python < 3.5.
+    from scandir import scandir
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+# Number of bytes read from the start of a file when sniffing its type. This
+# is enough to find sync in byte-aligned data recorded at up to 2048 wps.
+MAGIC_READ_SIZE = 32768
+
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+# HDF5 user blocks move the signature to a power of two offset from 512 bytes.
+HDF5_SIGNATURE_OFFSETS = (512, 1024, 2048, 4096, 8192, 16384)
+
+# Signatures found at the start of files, checked in order.
+MAGIC_SIGNATURES = (
+    (b'BZh', 'application/x-bzip2'),
+    (b'\x1f\x8b', 'application/x-gzip'),
+    (b'PK\x03\x04', 'application/zip'),  # Also used for SAC files.
+    (b'PK\x05\x06', 'application/zip'),  # Empty archive.
+    (HDF5_SIGNATURE, 'application/x-hdf'),
+)
+
+BLOSC_MIME_TYPE = 'application/x-blosc'
+BYTE_ALIGNED_MIME_TYPE = 'application/octet-stream'
+
+# ioctl request to clone a file's extents on copy-on-write filesystems
+# (btrfs, xfs) from <linux/fs.h>.
+FICLONE = 0x40049409
+
+# Errors meaning a copy method is not supported for a pair of files.
+UNSUPPORTED_COPY_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                           errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF,
+                           errno.EPERM)
+
+# Bytes per copy_file_range or sendfile call, below the 2GB limit of both.
+COPY_CHUNK_SIZE = 1024 ** 3
+
+# Mime types of files which gain little from being compressed again.
+COMPRESSED_MIME_TYPES = ('application/x-bzip2', 'application/x-gzip',
+                         'application/zip', BLOSC_MIME_TYPE)
+
+# Compressed members larger than this are spooled to disk until written.
+ZIP_SPOOL_SIZE = 8 * 1024 * 1024
+# Members deflated ahead of the one being written, per worker, bounding the
+# memory held by spooled members to about this many times ZIP_SPOOL_SIZE.
+ZIP_DEFLATE_AHEAD = 2
+
+# Private parts of ZipFile used to write members deflated by threads, see
+# _write_deflated_member. Members are deflated serially without them.
+ZIPFILE_INTERNALS = ('_writecheck', '_didModify', 'NameToInfo', 'filelist')
+
+
+_LIBC_FUNCTIONS = {}
+
+
+def _libc_function(name, *argtypes):
+    '''
+    Look up a system call wrapper in the C library for Python versions which
+    do not provide it in the os module.
+    '''
+    if name not in _LIBC_FUNCTIONS:
+        try:
+            function = getattr(ctypes.CDLL(None, use_errno=True), name)
+            function.argtypes = argtypes
+            function.restype = ctypes.c_ssize_t
+        except (AttributeError, OSError):
+            function = None
+        _LIBC_FUNCTIONS[name] = function
+    function = _LIBC_FUNCTIONS[name]
+    if function is None:
+        raise OSError(errno.ENOSYS, '%s is not available' % name)
+    return function
+
+
+def _copy_file_range(src_fd, dst_fd, count):
+    if hasattr(os, 'copy_file_range'):
+        return os.copy_file_range(src_fd, dst_fd, count)
+    function = _libc_function(
+        'copy_file_range', ctypes.c_int, ctypes.c_void_p, ctypes.c_int,
+        ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint)
+    result = function(src_fd, None, dst_fd, None, count, 0)
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+def _sendfile(src_fd, dst_fd, count):
+    if hasattr(os, 'sendfile'):
+        return os.sendfile(dst_fd, src_fd, None, count)
+    function = _libc_function('sendfile', ctypes.c_int, ctypes.c_int,
+                              ctypes.c_void_p, ctypes.c_size_t)
+    result = function(dst_fd, src_fd, None, count)
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+def _copy_file_contents(src_file, dst_file):
+    '''
+    Copy the contents of one open file to another avoiding user space where
+    possible: first try to clone the file (reflink), then copy_file_range,
+    then sendfile and finally fall back to reading and writing. Both files are
+    read and written from their current positions, so each method continues
+    from wherever the previous one stopped.
+
+    :returns: Name of the last method used.
+    :rtype: str
+    '''
+    src_fd = src_file.fileno()
+    dst_fd = dst_file.fileno()
+    if fcntl:
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return 'reflink'
+        except (IOError, OSError):
+            pass
+
+    for method, function in (('copy_file_range', _copy_file_range),
+                             ('sendfile', _sendfile)):
+        try:
+            while function(src_fd, dst_fd, COPY_CHUNK_SIZE):
+                pass
+            return method
+        except (IOError, OSError) as err:
+            if err.errno not in UNSUPPORTED_COPY_ERRORS:
+                raise
+
+    # Resynchronise the file objects with any progress made above.
+    src_file.seek(os.lseek(src_fd, 0, os.SEEK_CUR))
+    dst_file.seek(os.lseek(dst_fd, 0, os.SEEK_CUR))
+    shutil.copyfileobj(src_file, dst_file, 1048576)
+    return 'copy'
+
+
+def _copy_file_atomic(orig_path, copy_path):
+    '''
+    Copy into a temporary file next to copy_path and rename it into place
+    so that copy_path is either missing (or its previous version) or
+    complete. Permission bits are copied as with shutil.copy.
+    '''
+    dest_dir, filename = os.path.split(os.path.abspath(copy_path))
+    fd, temp_path = tempfile.mkstemp(prefix='.%s.' % filename, dir=dest_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst_file:
+            with open(orig_path, 'rb') as src_file:
+                _copy_file_contents(src_file, dst_file)
+        shutil.copymode(orig_path, temp_path)
+        if platform.system() == 'Windows' and os.path.isfile(copy_path):
+            # Renaming does not replace files on Windows.
+            os.remove(copy_path)
+        os.rename(temp_path, copy_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _copy_path(orig_path, dest_dir=None, postfix='_copy'):
+    assert dest_dir or postfix, "Must define either dest_dir or postfix"
+    path_minus_ext, ext = os.path.splitext(orig_path)
+    if dest_dir:
+        filename = os.path.basename(path_minus_ext)
+        path_minus_ext = os.path.join(dest_dir, filename)
+        if not os.path.isdir(dest_dir):
+            os.makedirs(dest_dir)
+    return path_minus_ext + postfix + ext
 
 
 def copy_file(orig_path, dest_dir=None, postfix='_copy'):
@@ -28,7 +223,11 @@ def copy_file(orig_path, dest_dir=None, postfix='_copy'):
     Creates a copy of the file with the postfix inserted between the filename
     and the extension. Can create copy into a different path (will create
     folders as required)
-    
+
+    The data is cloned (reflink) on filesystems which support it, otherwise
+    copied within the kernel where possible. The copy is written to a
+    temporary file and renamed into place, replacing any existing copy.
+
     :param orig_path: Path to original file
     :type orig_path: path
     :param dest_dir: Put copy of file into a different directory, e.g. 'temp/'
@@ -36,20 +235,39 @@ def copy_file(orig_path, dest_dir=None, postfix='_copy'):
     :param postfix: Rename copy of file with postfix before file extension
     :type postfix: string
     '''
-    assert dest_dir or postfix, "Must define either dest_dir or postfix"
-    path_minus_ext, ext = os.path.splitext(orig_path)
-    if dest_dir:
-        filename = os.path.basename(path_minus_ext)
-        path_minus_ext = os.path.join(dest_dir, filename)
-        if not os.path.isdir(dest_dir):
-            os.makedirs(dest_dir)
-    copy_path = path_minus_ext + postfix + ext
-    if os.path.isfile(copy_path):
-        os.remove(copy_path)
-    shutil.copy(orig_path, copy_path)
+    copy_path = _copy_path(orig_path, dest_dir=dest_dir, postfix=postfix)
+    _copy_file_atomic(orig_path, copy_path)
     return copy_path
 
 
+def copy_files(orig_paths, dest_dir=None, postfix='_copy', workers=4):
+    '''
+    Copies many files as copy_file does, using a pool of threads.
+    
+    :param orig_paths: Paths to original files
+    :type orig_paths: iterable of path
+    :param dest_dir: Put copies of files into a different directory
+    :type dest_dir: path
+    :param postfix: Rename copies of files with postfix before file extension
+    :type postfix: string
+    :param workers: Number of files to copy concurrently
+    :type workers: int
+    :returns: Paths of the copies in the order of orig_paths
+    :rtype: list of path
+    '''
+    orig_paths = list(orig_paths)
+    copy_paths = [_copy_path(p, dest_dir=dest_dir, postfix=postfix)
+                  for p in orig_paths]
+    pool = ThreadPool(workers)
+    try:
+        pool.map(lambda paths: _copy_file_atomic(*paths),
+                 zip(orig_paths, copy_paths))
+    finally:
+        pool.close()
+        pool.join()
+    return copy_paths
+
+
 def split_path(path):
     '''
     Split a path string into a list of path elements.
@@ -78,30 +296,156 @@ def join_path(path_list):
     return path
 
 
+def _scan_directory(dir_path, files, regexes, modified_before):
+    '''
+    Scan a single directory returning the subdirectories to descend into and
+    the entries which pass the filters. Unreadable directories are skipped, as
+    with os.walk.
+    '''
+    subdirs = []
+    entries = []
+    try:
+        dir_entries = scandir(dir_path)
+        for entry in dir_entries:
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and not entry.is_symlink():
+                    subdirs.append(entry.path)
+                if files == is_dir:
+                    continue
+                if regexes and not any(r.match(entry.name) for r in regexes):
+                    continue
+                if (modified_before is not None and
+                        entry.stat().st_mtime > modified_before):
+                    continue
+            except OSError:
+                # Removed while scanning.
+                continue
+            entries.append(entry)
+    except OSError:
+        pass
+    return subdirs, entries
+
+
+def _scan_tree(path, files=True, regexes=None, min_age=None, workers=4):
+    '''
+    Generator yielding the entries found by _scan_directory in every
+    directory below path. Subtrees are scanned by a pool of worker threads so
+    entries are yielded in no particular order. Unexpected errors within the
+    workers are raised by the generator.
+    '''
+    regexes = [re.compile(r) for r in regexes or ()]
+    modified_before = time.time() - min_age if min_age is not None else None
+
+    if workers <= 1:
+        dir_paths = [path]
+        while dir_paths:
+            subdirs, entries = _scan_directory(dir_paths.pop(), files,
+                                               regexes, modified_before)
+            dir_paths.extend(subdirs)
+            for entry in entries:
+                yield entry
+        return
+
+    pending = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        while True:
+            dir_path = pending.get()
+            if dir_path is None:
+                break
+            subdirs, entries, error = [], [], None
+            if not stop.is_set():
+                try:
+                    subdirs, entries = _scan_directory(dir_path, files,
+                                                       regexes,
+                                                       modified_before)
+                except Exception as err:
+                    error = err
+            # Report before queueing subdirectories so that their results
+            # cannot be counted ahead of this directory's.
+            results.put((len(subdirs), entries, error))
+            for subdir in subdirs:
+                pending.put(subdir)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    pending.put(path)
+    outstanding = 1
+    try:
+        while outstanding:
+            subdir_count, entries, error = results.get()
+            if error is not None:
+                raise error
+            outstanding += subdir_count - 1
+            for entry in entries:
+                yield entry
+    finally:
+        # Also reached when the consumer stops early, in which case any queued
+        # directories are passed over without being scanned.
+        stop.set()
+        for thread in threads:
+            pending.put(None)
+
+
+def scan_files(path, regexes=None, min_age=None, workers=4):
+    '''
+    Lazily find files recursively within path using os.scandir, scanning
+    subtrees in parallel. Files are filtered in the same pass, with a stat
+    only required for the min_age check.
+
+    :param path: Path to folder.
+    :type path: str
+    :param regexes: Only include files with a name matching any regex.
+    :type regexes: iterable of str or compiled regexes
+    :param min_age: Only include files not modified for this many seconds.
+    :type min_age: int or float
+    :param workers: Number of threads scanning directories.
+    :type workers: int
+    :returns: Generator of directory entries in no particular order.
+    :rtype: generator of os.DirEntry
+    '''
+    return _scan_tree(path, files=True, regexes=regexes, min_age=min_age,
+                      workers=workers)
+
+
+def scan_subdirs(path, workers=4):
+    '''
+    Lazily find subdirectories recursively within path using os.scandir,
+    scanning subtrees in parallel. Symbolic links to directories are included
+    but not followed.
+
+    :param path: Path to folder.
+    :type path: str
+    :param workers: Number of threads scanning directories.
+    :type workers: int
+    :returns: Generator of directory entries in no particular order.
+    :rtype: generator of os.DirEntry
+    '''
+    return _scan_tree(path, files=False, workers=workers)
+
+
 def dir_path(path):
     """
     List all files recursively in path.
     :param path: Path to folder.
     :type: str
-    :return: List of all files - full paths.
+    :return: List of all files - full paths, sorted.
     :rtype: list(str)
     """
-    file_list = []
-    for (path, dirs, files) in os.walk(os.path.abspath(path)):
-        for _file in files:
-            file_path = os.path.join(path, _file)
-            file_list.append(file_path)
-    return file_list
+    return sorted(e.path for e in scan_files(os.path.abspath(path)))
 
 
 def subdir_paths(path):
     '''
-    List all subdirectory paths.
+    List all subdirectory paths, sorted.
     '''
-    dir_paths = []
-    for (path, dirs, files) in os.walk(os.path.abspath(path)):
-        dir_paths.extend(os.path.join(path, d) for d in dirs)
-    return dir_paths
+    return sorted(e.path for e in scan_subdirs(os.path.abspath(path)))
 
 
 def is_in_subdir(path, _file):
@@ -216,14 +560,167 @@ def zip_compress(file_path_in):
     return archive
 
 
-def mime_type(file_path):
+def _zip_info(file_path, arcname, compress_type):
+    st = os.stat(file_path)
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.compress_type = compress_type
+    zinfo.file_size = st.st_size
+    return zinfo
+
+
+def _deflate_member(file_path):
+    '''
+    Deflate a file as ZipFile.write would into a spooled temporary file. zlib
+    releases the GIL so many members can be compressed by threads at once.
+
+    :returns: The compressed data, its CRC and size.
+    :rtype: (SpooledTemporaryFile, int, int)
+    '''
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                                  -15)
+    data_file = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE)
+    crc = 0
+    with open(file_path, 'rb') as file_obj:
+        for piece in read_in_chunks(file_obj):
+            crc = zlib.crc32(piece, crc)
+            data_file.write(compressor.compress(piece))
+    data_file.write(compressor.flush())
+    compress_size = data_file.tell()
+    data_file.seek(0)
+    return data_file, crc & 0xFFFFFFFF, compress_size
+
+
+def _write_deflated_member(archive, zinfo, deflated):
+    '''
+    Write a member which has already been deflated into the archive. ZipFile
+    has no public interface for this so the steps of ZipFile.write are
+    followed.
+    '''
+    data_file, zinfo.CRC, zinfo.compress_size = deflated
+    zinfo.header_offset = archive.fp.tell()
+    archive._writecheck(zinfo)
+    archive._didModify = True
+    archive.fp.write(zinfo.FileHeader(None))
+    shutil.copyfileobj(data_file, archive.fp, 1048576)
+    data_file.close()
+    archive.filelist.append(zinfo)
+    archive.NameToInfo[zinfo.filename] = zinfo
+    if hasattr(archive, 'start_dir'):
+        # Python 3 writes the central directory from start_dir on close.
+        archive.start_dir = archive.fp.tell()
+
+
+def _parallel_deflate_supported(archive):
+    '''
+    :returns: Whether _write_deflated_member can write to the archive.
+    :rtype: bool
+    '''
+    return all(hasattr(archive, name) for name in ZIPFILE_INTERNALS) and \
+        hasattr(zipfile.ZipInfo, 'FileHeader')
+
+
+def _is_compressed(file_path):
     '''
-    Uses the 'file' command on Linux which examines files more
-    rigorously than the mimetypes module in the standard library used by other
-    platforms.
+    Check the header of a file for the compressed formats in
+    COMPRESSED_MIME_TYPES without examining the rest of its content.
+    '''
+    with open(file_path, 'rb') as file_obj:
+        header = file_obj.read(16)
+    for signature, file_mime_type in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return file_mime_type in COMPRESSED_MIME_TYPES
+    return _is_blosc(header, os.path.getsize(file_path))
+
+
+def zip_compress_files(file_paths, archive_path, arcnames=None,
+                       compression=zipfile.ZIP_DEFLATED, workers=1,
+                       store_compressed=True):
+    '''
+    Zip compress many files into a single archive, streaming each file from
+    disk. Files are stored with only their filename unless arcnames are
+    provided.
+
+    With more than one worker, members are deflated in parallel and then
+    written to the archive in order. At most ZIP_DEFLATE_AHEAD members per
+    worker are deflated ahead of the member being written.
+
+    :param file_paths: Paths of the files to add to the archive.
+    :type file_paths: iterable of str
+    :param archive_path: Path of the archive to create.
+    :type archive_path: str
+    :param arcnames: Names of the files within the archive.
+    :type arcnames: iterable of str or None
+    :param compression: zipfile.ZIP_DEFLATED or zipfile.ZIP_STORED.
+    :type compression: int
+    :param workers: Number of threads deflating members.
+    :type workers: int
+    :param store_compressed: Store files which are already compressed (see
+        COMPRESSED_MIME_TYPES) without deflating them again.
+    :type store_compressed: bool
+    :returns: Path of the archive.
+    :rtype: str
+    '''
+    file_paths = list(file_paths)
+    if arcnames is None:
+        arcnames = [os.path.basename(p) for p in file_paths]
+    compress_types = []
+    for file_path in file_paths:
+        if store_compressed and compression != zipfile.ZIP_STORED and \
+                _is_compressed(file_path):
+            compress_types.append(zipfile.ZIP_STORED)
+        else:
+            compress_types.append(compression)
+
+    archive = zipfile.ZipFile(archive_path, 'w', compression,
+                              allowZip64=True)
+    pool = None
+    # Indices of members to deflate in parallel, in order:
+    deflate = deque()
+    # (index, result) of members being deflated, in order:
+    pending = deque()
+    try:
+        if workers > 1 and zipfile.ZIP_DEFLATED in compress_types and \
+                _parallel_deflate_supported(archive):
+            pool = ThreadPool(workers)
+            deflate.extend(i for i, t in enumerate(compress_types)
+                           if t == zipfile.ZIP_DEFLATED)
+        for index, (file_path, arcname, compress_type) in enumerate(
+                zip(file_paths, arcnames, compress_types)):
+            while deflate and len(pending) < workers * ZIP_DEFLATE_AHEAD:
+                ahead = deflate.popleft()
+                pending.append((ahead, pool.apply_async(
+                    _deflate_member, (file_paths[ahead],))))
+            if pending and pending[0][0] == index:
+                member = pending.popleft()[1].get()
+                zinfo = _zip_info(file_path, arcname, compress_type)
+                _write_deflated_member(archive, zinfo, member)
+            else:
+                archive.write(file_path, arcname, compress_type)
+    finally:
+        archive.close()
+        if pool:
+            pool.terminate()
+            pool.join()
+    return archive_path
+
+
+def mime_type(file_path, sniff=False):
+    '''
+    Uses the 'file' command on Linux which examines files more rigorously
+    than the mimetypes module in the standard library used by other
+    platforms. With sniff, the content of the file is first examined
+    in-process for known formats (see sniff_mime_type).
     
     TODO: Use a python project which wraps libmagic. May be cross-platform.
     '''
+    if sniff:
+        try:
+            file_mime_type = sniff_mime_type(file_path)
+        except (IOError, OSError):
+            file_mime_type = None
+        if file_mime_type:
+            return file_mime_type
     if platform.system() == 'Linux':
         # -b (brief/do not include filename)
         process = subprocess.Popen(['file', '-b', '--mime-type', file_path],
@@ -238,6 +735,100 @@ def mime_type(file_path):
     return file_mime_type
 
 
+def _is_blosc(header, file_size):
+    '''
+    Blosc has no magic number, instead check that the header describes a single
+    compressed buffer which fills the file, as written by BloscFile.
+    '''
+    if len(header) < 16:
+        return False
+    version, version_lz, flags, type_size = struct.unpack('<4B', header[:4])
+    nbytes, block_size, cbytes = struct.unpack('<3I', header[4:16])
+    return (version in (1, 2) and type_size > 0 and cbytes == file_size and
+            (nbytes == 0 or block_size > 0))
+
+
+def _is_byte_aligned(header):
+    '''
+    Check for a frame of four sync words one second apart at any of the
+    supported words per second, as byte_aligned.inspect would find. Each
+    comparison covers every possible start of a frame at once.
+    '''
+    import numpy as np
+    from flightdatautilities.byte_aligned import SUPPORTED_WPS, SYNC_PATTERNS
+    words = np.frombuffer(header[:len(header) // 2 * 2], dtype=np.short)
+    words = words & 0xFFF
+    starts = len(words) - 3 * max(SUPPORTED_WPS)
+    if starts <= 0:
+        return False
+    for pattern in SYNC_PATTERNS.values():
+        first = words[:starts] == pattern[0]
+        if not first.any():
+            continue
+        for wps in SUPPORTED_WPS:
+            frame = first.copy()
+            for second in range(1, 4):
+                offset = second * wps
+                frame &= words[offset:offset + starts] == pattern[second]
+            if frame.any():
+                return True
+    return False
+
+
+def sniff_mime_type(file_path, read_size=MAGIC_READ_SIZE):
+    '''
+    Determine the mime type of a file from its content without spawning
+    a process. Only the first read_size bytes of the file are read.
+
+    Recognises bz2, gzip, zip (including SAC), blosc, HDF5 and byte-aligned
+    raw flight data.
+
+    :param file_path: Path to the file to examine.
+    :type file_path: str
+    :param read_size: Number of bytes to read from the start of the file.
+    :type read_size: int
+    :returns: The mime type or None if the content was not recognised.
+    :rtype: str or None
+    '''
+    with open(file_path, 'rb') as file_obj:
+        header = file_obj.read(read_size)
+    for signature, file_mime_type in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return file_mime_type
+    for offset in HDF5_SIGNATURE_OFFSETS:
+        if header[offset:offset + len(HDF5_SIGNATURE)] == HDF5_SIGNATURE:
+            return 'application/x-hdf'
+    if _is_blosc(header, os.path.getsize(file_path)):
+        return BLOSC_MIME_TYPE
+    if _is_byte_aligned(header):
+        return BYTE_ALIGNED_MIME_TYPE
+    return None
+
+
+def mime_types(file_paths, fallback=True):
+    '''
+    Determine the mime types of many files, examining content in-process.
+
+    :param file_paths: Paths of the files to examine.
+    :type file_paths: iterable of str
+    :param fallback: Use mime_type() for files which were not recognised or
+        could not be read.
+    :type fallback: bool
+    :returns: Mime type for each file path (None if not recognised).
+    :rtype: dict
+    '''
+    file_mime_types = {}
+    for file_path in file_paths:
+        try:
+            file_mime_type = sniff_mime_type(file_path)
+        except (IOError, OSError):
+            file_mime_type = None
+        if file_mime_type is None and fallback:
+            file_mime_type = mime_type(file_path, sniff=False)
+        file_mime_types[file_path] = file_mime_type
+    return file_mime_types
+
+
 def find_patterns_in_file(file_path, search_strings, find_missing=False,
                           ignore_errors=True):
     """
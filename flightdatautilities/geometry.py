@@ -2,13 +2,38 @@
 ##############################################################################
 
 '''
+Flight Data Utilities: Geometry
+
+Spherical earth geometry of latitudes and longitudes in degrees, with
+distances in kilometres.
+
+Each function has an array counterpart with an _array suffix which accepts
+NumPy arrays, masked arrays or scalars, broadcasting them against each
+other. The result of an array function is masked wherever any of its inputs
+are masked.
+
+SpatialIndex finds the points, e.g. airports or runways, nearest to others:
+
+    index = SpatialIndex(airport_lats, airport_lons)
+    distances, indices = index.nearest(touchdown_lat, touchdown_lon, k=3)
+
+Distances and bearings on the WGS-84 ellipsoid, accurate to within a
+millimetre, are provided by the vincenty_ functions and VincentyReference.
+
+Polygon and Circle geofences test whole tracks for containment:
+
+    inside = Polygon(corridor_lats, corridor_lons).contains(lat, lon)
+    entries, exits = fence_crossings(inside)
 '''
 
 ##############################################################################
 # Imports
 
 
+import numpy as np
+
 from math import acos, asin, atan2, cos, degrees, pi, radians, sin, sqrt
+from scipy.spatial import cKDTree
 
 
 ##############################################################################
@@ -17,6 +42,14 @@ from math import acos, asin, atan2, cos, degrees, pi, radians, sin, sqrt
 
 EARTH_RADIUS = 6378.1  # km
 
+# WGS-84 ellipsoid:
+WGS84_A = 6378.137  # km, semi-major axis
+WGS84_F = 1 / 298.257223563  # flattening
+WGS84_B = WGS84_A * (1 - WGS84_F)  # km, semi-minor axis
+
+VINCENTY_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12  # radians, about 0.006 mm
+
 
 ##############################################################################
 # Functions
@@ -164,5 +197,938 @@ def initial_bearing(p1_lat, p1_lon, p2_lat, p2_lon):
     return degrees(atan2(y, x)) % 360
 
 
+def _prepare(*values):
+    '''
+    Split values into float arrays of data and their combined mask.
+
+    :returns: Data arrays and the combined mask, None if nothing is masked.
+    :rtype: (list of np.array, np.array or None)
+    '''
+    data = [np.asarray(np.ma.getdata(v), dtype=np.float64) for v in values]
+    masks = [np.ma.getmaskarray(v) for v in values if np.ma.isMaskedArray(v)]
+    mask = None
+    if masks:
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = mask | other
+    return data, mask
+
+
+def _result(result, mask):
+    '''
+    Apply the combined mask of the inputs to a result.
+    '''
+    if mask is None:
+        return result
+    return np.ma.array(result, mask=np.broadcast_to(mask, np.shape(result))
+                       .copy())
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    a = np.sin(dlat / 2) ** 2 + np.sin(dlon / 2) ** 2 * np.cos(lat1) * \
+        np.cos(lat2)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS * c
+
+
+def _initial_bearing(lat1, lon1, lat2, lon2):
+    dlon = np.radians(lon2 - lon1)
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * \
+        np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def _cross_track(lat1, lon1, lat2, lon2, lat3, lon3):
+    '''
+    :returns: The distance from the start point to the third point and the
+        cross-track distance.
+    '''
+    d13 = _haversine(lat1, lon1, lat3, lon3)
+    b12 = np.radians(_initial_bearing(lat1, lon1, lat2, lon2))
+    b13 = np.radians(_initial_bearing(lat1, lon1, lat3, lon3))
+    R = EARTH_RADIUS
+    # Clip arguments pushed beyond [-1, 1] by rounding, math.asin would
+    # raise a ValueError for these.
+    return d13, np.arcsin(np.clip(np.sin(d13 / R) * np.sin(b13 - b12),
+                                  -1, 1)) * R
+
+
+def _along_track(d13, dxt):
+    R = EARTH_RADIUS
+    return np.arccos(np.clip(np.cos(d13 / R) / np.cos(dxt / R), -1, 1)) * R
+
+
+def midpoint_array(p1_lat, p1_lon, p2_lat, p2_lon):
+    '''
+    Array counterpart of midpoint.
+
+    :param p1_lat: The start latitudes of the great-circle paths.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes of the great-circle paths.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end latitudes of the great-circle paths.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end longitudes of the great-circle paths.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :returns: The midpoints of the great-circle paths as (lat, lon).
+    :rtype: (np.array, np.array) or (np.ma.masked_array, np.ma.masked_array)
+    '''
+    (p1_lat, p1_lon, p2_lat, p2_lon), mask = _prepare(p1_lat, p1_lon,
+                                                      p2_lat, p2_lon)
+    dlon = np.radians(p2_lon - p1_lon)
+    lat1 = np.radians(p1_lat)
+    lat2 = np.radians(p2_lat)
+    lon1 = np.radians(p1_lon)
+
+    Bx = np.cos(lat2) * np.cos(dlon)
+    By = np.cos(lat2) * np.sin(dlon)
+    lat3 = np.arctan2(np.sin(lat1) + np.sin(lat2),
+                      np.sqrt((np.cos(lat1) + Bx) ** 2 + By ** 2))
+    lon3 = lon1 + np.arctan2(By, np.cos(lat1) + Bx)
+    lon3 = (lon3 + 3 * pi) % (2 * pi) - pi  # Normalise to -180°..+180°
+
+    return (_result(np.degrees(lat3), mask),
+            _result(np.degrees(lon3), mask))
+
+
+def cross_track_distance_array(p1_lat, p1_lon, p2_lat, p2_lon, p3_lat,
+                               p3_lon):
+    '''
+    Array counterpart of cross_track_distance.
+
+    :param p1_lat: The start latitudes of the great-circle paths.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes of the great-circle paths.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end latitudes of the great-circle paths.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end longitudes of the great-circle paths.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :param p3_lat: The latitudes to calculate cross-track error from.
+    :type p3_lat: np.array or np.ma.masked_array or float
+    :param p3_lon: The longitudes to calculate cross-track error from.
+    :type p3_lon: np.array or np.ma.masked_array or float
+    :returns: The cross-track distances.
+    :rtype: np.array or np.ma.masked_array
+    '''
+    data, mask = _prepare(p1_lat, p1_lon, p2_lat, p2_lon, p3_lat, p3_lon)
+    return _result(_cross_track(*data)[1], mask)
+
+
+def along_track_distance_array(p1_lat, p1_lon, p2_lat, p2_lon, p3_lat,
+                               p3_lon):
+    '''
+    Array counterpart of along_track_distance.
+
+    :param p1_lat: The start latitudes of the great-circle paths.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes of the great-circle paths.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end latitudes of the great-circle paths.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end longitudes of the great-circle paths.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :param p3_lat: The latitudes to calculate along-track distance of.
+    :type p3_lat: np.array or np.ma.masked_array or float
+    :param p3_lon: The longitudes to calculate along-track distance of.
+    :type p3_lon: np.array or np.ma.masked_array or float
+    :returns: The along-track distances.
+    :rtype: np.array or np.ma.masked_array
+    '''
+    data, mask = _prepare(p1_lat, p1_lon, p2_lat, p2_lon, p3_lat, p3_lon)
+    return _result(_along_track(*_cross_track(*data)), mask)
+
+
+def great_circle_distance__haversine_array(p1_lat, p1_lon, p2_lat, p2_lon):
+    '''
+    Array counterpart of great_circle_distance__haversine.
+
+    :param p1_lat: The start latitudes of the great-circle paths.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes of the great-circle paths.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end latitudes of the great-circle paths.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end longitudes of the great-circle paths.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :returns: The great-circle distances.
+    :rtype: np.array or np.ma.masked_array
+    '''
+    data, mask = _prepare(p1_lat, p1_lon, p2_lat, p2_lon)
+    return _result(_haversine(*data), mask)
+
+
+def initial_bearing_array(p1_lat, p1_lon, p2_lat, p2_lon):
+    '''
+    Array counterpart of initial_bearing.
+
+    :param p1_lat: The start latitudes of the great-circle paths.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes of the great-circle paths.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end point latitudes of the great-circle paths.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end point longitudes of the great-circle paths.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :returns: The initial bearings.
+    :rtype: np.array or np.ma.masked_array
+    '''
+    data, mask = _prepare(p1_lat, p1_lon, p2_lat, p2_lon)
+    return _result(_initial_bearing(*data), mask)
+
+
+def _valid_indices(lat, lon):
+    '''
+    :returns: Data of the track and indices of samples where neither the
+        latitude nor longitude is masked.
+    :rtype: (np.array, np.array, np.array)
+    '''
+    (lat, lon), mask = _prepare(lat, lon)
+    lat, lon = np.broadcast_arrays(lat, lon)
+    if mask is None:
+        return lat, lon, np.arange(len(lat))
+    return lat, lon, np.flatnonzero(~np.broadcast_to(mask, lat.shape))
+
+
+def track_distance(lat, lon):
+    '''
+    Cumulative great-circle distance flown along a track from its first
+    valid sample.
+
+    Masked samples are skipped, so distance across a gap is measured
+    directly between the valid samples either side of it, and are masked
+    in the result.
+
+    :param lat: Latitudes of the track.
+    :type lat: np.array or np.ma.masked_array
+    :param lon: Longitudes of the track.
+    :type lon: np.array or np.ma.masked_array
+    :returns: Cumulative distances in km.
+    :rtype: np.ma.masked_array
+    '''
+    lat, lon, valid = _valid_indices(lat, lon)
+    result = np.ma.masked_all(len(lat), dtype=np.float64)
+    if not len(valid):
+        return result
+    lat, lon = lat[valid], lon[valid]
+    distances = np.empty(len(valid), dtype=np.float64)
+    distances[0] = 0
+    np.cumsum(_haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]),
+              out=distances[1:])
+    result[valid] = distances
+    return result
+
+
+def segment_bearings(lat, lon):
+    '''
+    Initial bearing of each segment of a track, from each valid sample to
+    the next valid sample.
+
+    :param lat: Latitudes of the track.
+    :type lat: np.array or np.ma.masked_array
+    :param lon: Longitudes of the track.
+    :type lon: np.array or np.ma.masked_array
+    :returns: Bearings in degrees, masked for masked samples and the last
+        valid sample.
+    :rtype: np.ma.masked_array
+    '''
+    lat, lon, valid = _valid_indices(lat, lon)
+    result = np.ma.masked_all(len(lat), dtype=np.float64)
+    if len(valid) < 2:
+        return result
+    lat, lon = lat[valid], lon[valid]
+    result[valid[:-1]] = _initial_bearing(lat[:-1], lon[:-1], lat[1:],
+                                          lon[1:])
+    return result
+
+
+def track_profile(lat, lon, p1_lat, p1_lon, p2_lat, p2_lon):
+    '''
+    Along-track and cross-track distances of a track relative to a reference
+    great-circle path, e.g. a runway centreline, in a single pass.
+
+    Unlike along_track_distance, along-track distances are signed, being
+    negative for samples behind the start of the path. Cross-track distances
+    are positive to the right of the path.
+
+    :param lat: Latitudes of the track.
+    :type lat: np.array or np.ma.masked_array
+    :param lon: Longitudes of the track.
+    :type lon: np.array or np.ma.masked_array
+    :param p1_lat: The start latitude of the reference path.
+    :type p1_lat: float
+    :param p1_lon: The start longitude of the reference path.
+    :type p1_lon: float
+    :param p2_lat: The end latitude of the reference path.
+    :type p2_lat: float
+    :param p2_lon: The end longitude of the reference path.
+    :type p2_lon: float
+    :returns: Along-track and cross-track distances in km, masked where the
+        track is masked.
+    :rtype: (np.array, np.array) or (np.ma.masked_array, np.ma.masked_array)
+    '''
+    (lat, lon), mask = _prepare(lat, lon)
+    R = EARTH_RADIUS
+    b12 = radians(initial_bearing(p1_lat, p1_lon, p2_lat, p2_lon))
+    d13 = _haversine(p1_lat, p1_lon, lat, lon) / R
+    angle = np.radians(_initial_bearing(p1_lat, p1_lon, lat, lon)) - b12
+    dxt = np.arcsin(np.clip(np.sin(d13) * np.sin(angle), -1, 1))
+    dat = np.arccos(np.clip(np.cos(d13) / np.cos(dxt), -1, 1))
+    dat = np.copysign(dat, np.cos(angle))
+    return _result(dat * R, mask), _result(dxt * R, mask)
+
+
+def _vincenty_inverse(sin_u1, cos_u1, lon1, lat2, lon2, max_iterations,
+                      tolerance):
+    '''
+    Vincenty's inverse solution from points with reduced latitude terms
+    sin_u1 and cos_u1 and longitude lon1 (radians) to lat2, lon2 (degrees).
+
+    Products of the reduced latitude terms of both points are computed once.
+    Once most samples have converged, each iteration only solves those which
+    have not. The terms of each sample's last iteration are kept for the
+    distance and bearings rather than being solved again.
+
+    :returns: Distances in km, initial and final bearings in degrees and
+        whether the solution converged.
+    '''
+    f = WGS84_F
+    sin_u2, cos_u2 = _reduced_latitude(lat2)
+    L = np.radians(lon2) - lon1
+    shape = np.broadcast(sin_u1, cos_u1, sin_u2, L).shape
+    size = int(np.prod(shape))
+    cos_u1, cos_u2, L = [np.broadcast_to(v, shape).ravel()
+                         for v in (cos_u1, cos_u2, L)]
+    # Terms of both points which do not depend on lambda:
+    sin_u1_sin_u2 = np.ravel(sin_u1 * sin_u2 + np.zeros(shape))
+    sin_u1_cos_u2 = np.ravel(sin_u1 * cos_u2 + np.zeros(shape))
+    cos_u1_sin_u2 = np.ravel(cos_u1 * np.broadcast_to(sin_u2, shape).ravel())
+    cos_u1_cos_u2 = cos_u1 * cos_u2
+
+    # Terms of the latest iteration of each sample:
+    names = ('sin_lam', 'cos_lam', 'y', 'x', 'sin_sigma', 'cos_sigma',
+             'sigma', 'cos2_alpha', 'cos_2sigma_m')
+    terms = {}
+    lam = L
+    index = None  # All samples are solved until most have converged.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iterations):
+            if index is None:
+                current = lam
+                cu2, cu1su2, su1cu2, su1su2, cu1cu2, dlon = (
+                    cos_u2, cos_u1_sin_u2, sin_u1_cos_u2, sin_u1_sin_u2,
+                    cos_u1_cos_u2, L)
+            else:
+                current = lam[index]
+                cu2, cu1su2, su1cu2, su1su2, cu1cu2, dlon = [
+                    t[index] for t in (cos_u2, cos_u1_sin_u2, sin_u1_cos_u2,
+                                       sin_u1_sin_u2, cos_u1_cos_u2, L)]
+            # Evaluated in place to avoid allocating temporary arrays:
+            sin_lam, cos_lam = np.sin(current), np.cos(current)
+            y = cu2 * sin_lam
+            x = su1cu2 * cos_lam
+            np.subtract(cu1su2, x, out=x)
+            sin_sigma = y * y
+            sin_sigma += x * x
+            np.sqrt(sin_sigma, out=sin_sigma)
+            cos_sigma = cu1cu2 * cos_lam
+            cos_sigma += su1su2
+            # As sin_sigma >= 0, sigma is within 0 to pi and is found more
+            # cheaply than with np.arctan2:
+            sigma = sin_sigma / cos_sigma
+            np.arctan(sigma, out=sigma)
+            sigma[cos_sigma < 0] += pi
+            # Coincident points have no azimuth:
+            sin_alpha = cu1cu2 * sin_lam
+            sin_alpha /= sin_sigma
+            sin_alpha[sin_sigma == 0] = 0
+            cos2_alpha = sin_alpha * sin_alpha
+            np.subtract(1, cos2_alpha, out=cos2_alpha)
+            # Equatorial lines have no midpoint latitude:
+            cos_2sigma_m = su1su2 * -2
+            cos_2sigma_m /= cos2_alpha
+            cos_2sigma_m += cos_sigma
+            cos_2sigma_m[cos2_alpha == 0] = 0
+            # C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            C = cos2_alpha * (-3 * f * f / 16)
+            C += f * (4 + 4 * f) / 16
+            C *= cos2_alpha
+            # lambda = L + (1 - C) * f * sin_alpha * (sigma + C *
+            #     sin_sigma * (cos_2sigma_m + C * cos_sigma *
+            #     (-1 + 2 * cos_2sigma_m ** 2)))
+            updated = cos_2sigma_m * cos_2sigma_m
+            updated *= 2
+            updated -= 1
+            updated *= cos_sigma
+            updated *= C
+            updated += cos_2sigma_m
+            updated *= sin_sigma
+            updated *= C
+            updated += sigma
+            updated *= sin_alpha
+            np.subtract(1, C, out=C)
+            C *= f
+            updated *= C
+            updated += dlon
+            difference = updated - current
+            np.abs(difference, out=difference)
+            unconverged = ~(difference <= tolerance)
+            values = (sin_lam, cos_lam, y, x, sin_sigma, cos_sigma, sigma,
+                      cos2_alpha, cos_2sigma_m)
+            if index is None:
+                lam = updated
+                terms = dict(zip(names, values))
+                remaining = np.count_nonzero(unconverged)
+                if remaining * 4 < size:
+                    index = np.flatnonzero(unconverged)
+            else:
+                lam[index] = updated
+                for name, value in zip(names, values):
+                    terms[name][index] = value
+                index = index[unconverged]
+                remaining = len(index)
+            if not remaining:
+                break
+        converged = np.ones(size, dtype=np.bool_)
+        converged[unconverged.nonzero()[0] if index is None else index] = \
+            False
+
+        sin_sigma, cos_sigma = terms['sin_sigma'], terms['cos_sigma']
+        cos_2sigma_m = terms['cos_2sigma_m']
+        u_sq = terms['cos2_alpha'] * (WGS84_A ** 2 - WGS84_B ** 2) / \
+            WGS84_B ** 2
+        A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (
+            320 - 175 * u_sq)))
+        B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) - B / 6 *
+            cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) *
+            (-3 + 4 * cos_2sigma_m ** 2)))
+        distance = WGS84_B * A * (terms['sigma'] - delta_sigma)
+        initial = np.arctan2(terms['y'], terms['x'])
+        final = np.arctan2(cos_u1 * terms['sin_lam'],
+                           cos_u1_sin_u2 * terms['cos_lam'] - sin_u1_cos_u2)
+    converged &= np.isfinite(distance)
+    return tuple(r.reshape(shape) for r in (
+        distance, _bearing_degrees(initial), _bearing_degrees(final),
+        converged))
+
+
+def _bearing_degrees(angle):
+    '''
+    Convert angles from arctan2 in radians to bearings from 0 to 360 degrees,
+    avoiding the cost of a floating point modulo.
+    '''
+    bearing = np.degrees(angle)
+    np.add(bearing, 360, out=bearing, where=bearing < 0)
+    # Tiny negative angles round to 360:
+    bearing[bearing >= 360] = 0
+    return bearing
+
+
+def _vincenty_direct(sin_u1, cos_u1, lat1, lon1, bearing, distance,
+                     max_iterations, tolerance):
+    '''
+    Vincenty's direct solution from points with reduced latitude terms
+    sin_u1 and cos_u1 and position lat1, lon1 (radians) along bearings
+    (degrees) for distances (km).
+
+    :returns: Latitudes and longitudes in degrees, final bearings in degrees
+        and whether the solution converged.
+    '''
+    f = WGS84_F
+    alpha1 = np.radians(bearing)
+    sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
+    sigma1 = np.arctan2(sin_u1 / cos_u1, cos_alpha1)
+    sin_alpha = cos_u1 * sin_alpha1
+    cos2_alpha = 1 - sin_alpha ** 2
+    u_sq = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    sigma_0 = distance / (WGS84_B * A)
+    sigma = sigma_0
+    converged = np.zeros(np.broadcast(sigma, sigma1).shape, dtype=np.bool_)
+    for _ in range(max_iterations):
+        cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) - B / 6 *
+            cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) *
+            (-3 + 4 * cos_2sigma_m ** 2)))
+        previous = sigma
+        sigma = sigma_0 + delta_sigma
+        converged = np.abs(sigma - previous) <= tolerance
+        if converged.all():
+            break
+
+    cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+    x = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+    lat2 = np.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+                      (1 - f) * np.hypot(sin_alpha, x))
+    lam = np.arctan2(sin_sigma * sin_alpha1,
+                     cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+    C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+    L = lam - (1 - C) * f * sin_alpha * (sigma + C * sin_sigma * (
+        cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+    lon2 = (lon1 + L + 3 * pi) % (2 * pi) - pi  # Normalise to -180°..+180°
+    final = np.arctan2(sin_alpha, -x)
+    return (np.degrees(lat2), np.degrees(lon2), np.degrees(final) % 360,
+            converged)
+
+
+def _reduced_latitude(lat):
+    '''
+    :returns: Sine and cosine of the reduced latitude of latitudes in degrees.
+    '''
+    tan_u = (1 - WGS84_F) * np.tan(np.radians(lat))
+    cos_u = 1 / np.sqrt(1 + tan_u ** 2)
+    return tan_u * cos_u, cos_u
+
+
+def _masked_result(result, mask, converged):
+    '''
+    Mask results where inputs are masked or the solution did not converge.
+    '''
+    mask = ~converged if mask is None else mask | ~converged
+    return np.ma.array(result, mask=np.broadcast_to(mask, np.shape(result))
+                       .copy())
+
+
+def vincenty_inverse_array(p1_lat, p1_lon, p2_lat, p2_lon,
+                           max_iterations=VINCENTY_ITERATIONS):
+    '''
+    Distances and bearings between points on the WGS-84 ellipsoid using
+    Vincenty's inverse formula, solved for whole arrays at once.
+
+    Iteration stops once every solution has converged or after
+    max_iterations, with later iterations only solving the samples which
+    have not converged. Solutions which did not converge, which only happens
+    for nearly antipodal points, are masked.
+
+    :param p1_lat: The start latitudes.
+    :type p1_lat: np.array or np.ma.masked_array or float
+    :param p1_lon: The start longitudes.
+    :type p1_lon: np.array or np.ma.masked_array or float
+    :param p2_lat: The end latitudes.
+    :type p2_lat: np.array or np.ma.masked_array or float
+    :param p2_lon: The end longitudes.
+    :type p2_lon: np.array or np.ma.masked_array or float
+    :param max_iterations: Maximum number of iterations.
+    :type max_iterations: int
+    :returns: Distances in km, initial bearings and final bearings.
+    :rtype: (np.ma.masked_array, np.ma.masked_array, np.ma.masked_array)
+    '''
+    (p1_lat, p1_lon, p2_lat, p2_lon), mask = _prepare(p1_lat, p1_lon,
+                                                      p2_lat, p2_lon)
+    sin_u1, cos_u1 = _reduced_latitude(p1_lat)
+    results = _vincenty_inverse(sin_u1, cos_u1, np.radians(p1_lon), p2_lat,
+                                p2_lon, max_iterations, VINCENTY_TOLERANCE)
+    return tuple(_masked_result(r, mask, results[-1]) for r in results[:-1])
+
+
+def vincenty_direct_array(lat, lon, bearing, distance,
+                          max_iterations=VINCENTY_ITERATIONS):
+    '''
+    Destination points on the WGS-84 ellipsoid travelling along initial
+    bearings for distances using Vincenty's direct formula, solved for whole
+    arrays at once.
+
+    :param lat: The start latitudes.
+    :type lat: np.array or np.ma.masked_array or float
+    :param lon: The start longitudes.
+    :type lon: np.array or np.ma.masked_array or float
+    :param bearing: The initial bearings in degrees.
+    :type bearing: np.array or np.ma.masked_array or float
+    :param distance: The distances in km.
+    :type distance: np.array or np.ma.masked_array or float
+    :param max_iterations: Maximum number of iterations.
+    :type max_iterations: int
+    :returns: Destination latitudes, longitudes and final bearings.
+    :rtype: (np.ma.masked_array, np.ma.masked_array, np.ma.masked_array)
+    '''
+    (lat, lon, bearing, distance), mask = _prepare(lat, lon, bearing,
+                                                   distance)
+    sin_u1, cos_u1 = _reduced_latitude(lat)
+    results = _vincenty_direct(sin_u1, cos_u1, np.radians(lat),
+                               np.radians(lon), bearing, distance,
+                               max_iterations, VINCENTY_TOLERANCE)
+    return tuple(_masked_result(r, mask, results[-1]) for r in results[:-1])
+
+
+def fence_crossings(inside):
+    '''
+    Indices at which a track enters and exits a geofence.
+
+    A track which starts inside the geofence enters it at index 0. Exits are
+    the indices of the first sample outside the geofence, so a track which
+    ends inside the geofence has one more entry than exits.
+
+    Masked samples are gaps in the track rather than samples outside of the
+    geofence. A track which crosses the geofence during a gap enters or exits
+    it at the first sample after the gap, and a track which starts with a
+    gap is treated as starting at its first unmasked sample.
+
+    :param inside: Whether each sample is inside the geofence.
+    :type inside: np.array of bool or np.ma.masked_array of bool
+    :returns: Indices of entries and exits.
+    :rtype: (np.array, np.array)
+    '''
+    mask = np.ma.getmaskarray(inside)
+    inside = np.asarray(np.ma.getdata(inside), dtype=np.bool_)
+    valid = np.flatnonzero(~mask)
+    if not len(valid):
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    start = valid[0]
+    if mask.any():
+        # Fill each gap with the last unmasked sample before it:
+        index = np.where(mask, start, np.arange(len(inside)))
+        inside = inside[np.maximum.accumulate(index)]
+    inside = inside[start:]
+    changes = np.flatnonzero(inside[1:] != inside[:-1]) + 1
+    entries = changes[inside[changes]]
+    exits = changes[~inside[changes]]
+    if inside[0]:
+        entries = np.concatenate(([0], entries))
+    return entries + start, exits + start
+
+
+def _unit_vectors(lat, lon):
+    '''
+    Cartesian coordinates of points on a sphere of radius 1.
+
+    :returns: Array with a final axis of x, y and z.
+    :rtype: np.array
+    '''
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack(np.broadcast_arrays(cos_lat * np.cos(lon),
+                                        cos_lat * np.sin(lon),
+                                        np.sin(lat)), axis=-1)
+
+
+def _chord_to_distance(chord):
+    return 2 * np.arcsin(np.clip(chord / 2, 0, 1)) * EARTH_RADIUS
+
+
+def _distance_to_chord(distance):
+    return 2 * np.sin(np.clip(distance / (2 * EARTH_RADIUS), 0, pi / 2))
+
+
+##############################################################################
+# Classes
+
+
+class SpatialIndex(object):
+    '''
+    Index of points for nearest neighbour and radius queries.
+
+    Points are stored as unit vectors in a k-d tree, so the straight line
+    (chord) distance between two vectors increases monotonically with the
+    great-circle distance between the points. Queries take logarithmic time
+    in the number of points.
+
+    Queries accept a single point or arrays of points. Indices refer to the
+    order of the points the index was built from.
+    '''
+
+    def __init__(self, lats, lons):
+        '''
+        :param lats: Latitudes of the points to index.
+        :type lats: np.array or list of float
+        :param lons: Longitudes of the points to index.
+        :type lons: np.array or list of float
+        :raises ValueError: If the latitudes and longitudes differ in length.
+        '''
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lons = np.asarray(lons, dtype=np.float64).ravel()
+        if len(lats) != len(lons):
+            raise ValueError('Got %d latitudes but %d longitudes.' %
+                             (len(lats), len(lons)))
+        self.lats = lats
+        self.lons = lons
+        self._tree = cKDTree(_unit_vectors(lats, lons).reshape(-1, 3))
+
+    def __len__(self):
+        return len(self.lats)
+
+    def nearest(self, lat, lon, k=1):
+        '''
+        Find the k nearest indexed points to each point.
+
+        :param lat: Latitude of the point or points to search from.
+        :type lat: float or np.array
+        :param lon: Longitude of the point or points to search from.
+        :type lon: float or np.array
+        :param k: Number of nearest points to find, limited to the number of
+            indexed points.
+        :type k: int
+        :returns: Great-circle distances in km and indices of the nearest
+            points, ordered by distance. Arrays of shape (k,) for a single
+            point, otherwise with an additional final axis of length k.
+        :rtype: (np.array, np.array)
+        '''
+        k = min(k, len(self))
+        vectors = _unit_vectors(lat, lon)
+        if not k:
+            shape = vectors.shape[:-1] + (0,)
+            return np.zeros(shape), np.zeros(shape, dtype=np.intp)
+        chords, indices = self._tree.query(vectors, k=k)
+        if k == 1:
+            chords = np.asarray(chords)[..., np.newaxis]
+            indices = np.asarray(indices)[..., np.newaxis]
+        return _chord_to_distance(chords), indices
+
+    def within(self, lat, lon, radius):
+        '''
+        Find the indexed points within a radius of each point.
+
+        :param lat: Latitude of the point or points to search from.
+        :type lat: float or np.array
+        :param lon: Longitude of the point or points to search from.
+        :type lon: float or np.array
+        :param radius: Great-circle radius in km.
+        :type radius: float
+        :returns: Indices of the points within the radius ordered by
+            distance, for a single point or as a list for each point.
+        :rtype: np.array or list of np.array
+        '''
+        vectors = _unit_vectors(lat, lon)
+        # Widen the chord slightly so points at the radius are not lost to
+        # rounding, then filter on the exact distance.
+        chord = _distance_to_chord(radius) * (1 + 1e-12)
+        if vectors.ndim == 1:
+            return self._within(vectors, chord, radius)
+        flat = vectors.reshape(-1, 3)
+        return [self._within(v, chord, radius) for v in flat]
+
+    def _within(self, vector, chord, radius):
+        indices = np.array(self._tree.query_ball_point(vector, chord),
+                           dtype=np.intp)
+        points = self._tree.data[indices]
+        chords = np.sqrt(((points - vector) ** 2).sum(axis=-1))
+        distances = _chord_to_distance(chords)
+        order = np.argsort(distances, kind='mergesort')
+        indices, distances = indices[order], distances[order]
+        return indices[distances <= radius]
+
+
+class VincentyReference(object):
+    '''
+    Fixed reference point, e.g. a runway threshold, for solving Vincenty's
+    formulae against many other points. Trigonometric terms of the reference
+    point are computed once rather than for every sample.
+
+    Each iteration costs about as much as the haversine formula and most
+    solutions need four, so solving the inverse formula for a track costs
+    about five times great_circle_distance__haversine_array.
+    '''
+
+    def __init__(self, lat, lon, max_iterations=VINCENTY_ITERATIONS):
+        '''
+        :param lat: Latitude of the reference point.
+        :type lat: float
+        :param lon: Longitude of the reference point.
+        :type lon: float
+        :param max_iterations: Maximum number of iterations.
+        :type max_iterations: int
+        '''
+        self.lat = lat
+        self.lon = lon
+        self.max_iterations = max_iterations
+        self._sin_u, self._cos_u = _reduced_latitude(lat)
+        self._lat = radians(lat)
+        self._lon = radians(lon)
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.lat, self.lon)
+
+    def inverse(self, lat, lon):
+        '''
+        Distances and bearings from the reference point to other points, see
+        vincenty_inverse_array.
+
+        :returns: Distances in km, initial bearings and final bearings.
+        :rtype: (np.ma.masked_array, np.ma.masked_array, np.ma.masked_array)
+        '''
+        (lat, lon), mask = _prepare(lat, lon)
+        results = _vincenty_inverse(self._sin_u, self._cos_u, self._lon, lat,
+                                    lon, self.max_iterations,
+                                    VINCENTY_TOLERANCE)
+        return tuple(_masked_result(r, mask, results[-1])
+                     for r in results[:-1])
+
+    def direct(self, bearing, distance):
+        '''
+        Destination points from the reference point, see
+        vincenty_direct_array.
+
+        :returns: Destination latitudes, longitudes and final bearings.
+        :rtype: (np.ma.masked_array, np.ma.masked_array, np.ma.masked_array)
+        '''
+        (bearing, distance), mask = _prepare(bearing, distance)
+        results = _vincenty_direct(self._sin_u, self._cos_u, self._lat,
+                                   self._lon, bearing, distance,
+                                   self.max_iterations, VINCENTY_TOLERANCE)
+        return tuple(_masked_result(r, mask, results[-1])
+                     for r in results[:-1])
+
+
+class Geofence(object):
+    '''
+    Area which tracks are tested for containment within.
+
+    Subclasses implement _contains() for the data of samples within the
+    bounding box of the area.
+    '''
+
+    def _bounding_box(self, lat, lon):
+        '''
+        :returns: Whether each sample is within the bounding box.
+        :rtype: np.array of bool
+        '''
+        raise NotImplementedError
+
+    def _contains(self, lat, lon):
+        raise NotImplementedError
+
+    def contains(self, lat, lon):
+        '''
+        Test whether samples are inside the geofence. Only samples within the
+        bounding box of the geofence are tested precisely.
+
+        :param lat: Latitudes of the track.
+        :type lat: np.array or np.ma.masked_array or float
+        :param lon: Longitudes of the track.
+        :type lon: np.array or np.ma.masked_array or float
+        :returns: Whether each sample is inside, masked where the inputs are
+            masked, or whether a single point is inside.
+        :rtype: np.array of bool or np.ma.masked_array of bool or bool
+        '''
+        scalar = not np.ndim(lat) and not np.ndim(lon)
+        (lat, lon), mask = _prepare(lat, lon)
+        lat, lon = np.broadcast_arrays(np.atleast_1d(lat), np.atleast_1d(lon))
+        inside = self._bounding_box(lat, lon)
+        if mask is not None:
+            inside &= ~mask
+        candidates = np.nonzero(inside)
+        inside[candidates] = self._contains(lat[candidates],
+                                            lon[candidates])
+        if scalar:
+            return bool(inside[0])
+        return _result(inside, mask)
+
+    def crossings(self, lat, lon):
+        '''
+        Test whether samples are inside the geofence and find where the track
+        enters and exits it, see fence_crossings. Masked samples are gaps in
+        the track which do not create crossings.
+
+        :returns: Whether each sample is inside and indices of entries and
+            exits.
+        :rtype: (np.array, np.array, np.array)
+        '''
+        inside = self.contains(lat, lon)
+        return (inside,) + fence_crossings(inside)
+
+
+class Polygon(Geofence):
+    '''
+    Geofence bounded by straight lines between vertices on a local
+    equirectangular projection centred on the polygon, which is accurate for
+    areas such as airspace and approach corridors but not for areas spanning
+    large distances or the poles. Polygons may cross the antimeridian.
+    '''
+
+    def __init__(self, lats, lons):
+        '''
+        :param lats: Latitudes of the vertices.
+        :type lats: np.array or list of float
+        :param lons: Longitudes of the vertices.
+        :type lons: np.array or list of float
+        :raises ValueError: If there are fewer than three vertices.
+        '''
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if len(lats) != len(lons) or len(lats) < 3:
+            raise ValueError('A polygon requires at least three vertices.')
+        self.lats = lats
+        self.lons = lons
+        offsets = (lons - lons[0] + 180) % 360 - 180
+        self._lon0 = lons[0] + (offsets.min() + offsets.max()) / 2
+        self._scale = cos(radians((lats.min() + lats.max()) / 2))
+        self._x, self._y = self._project(lats, lons)
+        self._x_range = (self._x.min(), self._x.max())
+        self._y_range = (self._y.min(), self._y.max())
+
+    def _project(self, lat, lon):
+        # Longitudes relative to the centre, within -180°..+180°:
+        x = (lon - self._lon0 + 180) % 360 - 180
+        return x * self._scale, lat
+
+    def _bounding_box(self, lat, lon):
+        x, y = self._project(lat, lon)
+        return ((x >= self._x_range[0]) & (x <= self._x_range[1]) &
+                (y >= self._y_range[0]) & (y <= self._y_range[1]))
+
+    def _contains(self, lat, lon):
+        # Crossing number test, vectorised over the samples:
+        x, y = self._project(lat, lon)
+        inside = np.zeros(len(x), dtype=np.bool_)
+        x1, y1 = self._x, self._y
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            if ay == by:
+                continue
+            crosses = (ay > y) != (by > y)
+            crosses &= x < (bx - ax) * (y - ay) / (by - ay) + ax
+            inside ^= crosses
+        return inside
+
+
+class Circle(Geofence):
+    '''
+    Geofence containing the points within a great-circle radius of a centre.
+    '''
+
+    def __init__(self, lat, lon, radius):
+        '''
+        :param lat: Latitude of the centre.
+        :type lat: float
+        :param lon: Longitude of the centre.
+        :type lon: float
+        :param radius: Radius in km.
+        :type radius: float
+        '''
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        # Latitude covered by the radius and, away from the poles, the
+        # longitude covered at the latitude furthest from the equator:
+        self._dlat = degrees(radius / EARTH_RADIUS)
+        extreme = abs(lat) + self._dlat
+        self._dlon = None if extreme >= 90 else \
+            min(self._dlat / cos(radians(extreme)), 180)
+
+    def _bounding_box(self, lat, lon):
+        inside = np.abs(lat - self.lat) <= self._dlat
+        if self._dlon is not None:
+            dlon = np.abs((lon - self.lon + 180) % 360 - 180)
+            inside &= dlon <= self._dlon
+        return inside
+
+    def _contains(self, lat, lon):
+        return _haversine(self.lat, self.lon, lat, lon) <= self.radius
+
+
 ##############################################################################
 # vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
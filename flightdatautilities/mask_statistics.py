@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Flight Data Utilities: Mask Statistics
+
+Statistics describing the masked data within a parameter, used to judge data
+quality. Masks may be boolean arrays, ``np.ma.nomask`` or scalar booleans.
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+
+from collections import namedtuple
+
+
+##############################################################################
+# Exports
+
+
+__all__ = ['MaskStatistics', 'mask_runs', 'mask_statistics', 'masked_count']
+
+
+##############################################################################
+# Classes
+
+
+MaskStatistics = namedtuple('MaskStatistics', (
+    'size',           # Number of samples.
+    'masked',         # Number of masked samples.
+    'ratio',          # Ratio of masked samples (1 == all masked).
+    'masked_runs',    # Lengths of consecutive runs of masked samples.
+    'unmasked_runs',  # Lengths of consecutive runs of unmasked samples.
+))
+
+
+##############################################################################
+# Functions
+
+
+def _as_mask(mask, size=None):
+    '''
+    Expand nomask and scalar masks to arrays only when a size is requested.
+    '''
+    if np.ndim(mask):
+        return np.asarray(mask, dtype=np.bool_)
+    return np.bool_(mask) if size is None else \
+        np.full(size, bool(mask), dtype=np.bool_)
+
+
+def masked_count(mask):
+    '''
+    Number of masked samples, counted in a single pass.
+
+    :param mask: The mask.
+    :type mask: np.array or np.ma.nomask or bool
+    :rtype: int
+    '''
+    return int(np.count_nonzero(mask))
+
+
+def mask_runs(mask):
+    '''
+    Lengths of consecutive runs of masked and unmasked samples, found from
+    the edges of the mask in a single pass.
+
+    :param mask: The mask.
+    :type mask: np.array or np.ma.nomask or bool
+    :returns: Lengths of the masked runs and of the unmasked runs in order.
+    :rtype: (np.array, np.array)
+    '''
+    mask = _as_mask(mask)
+    if not mask.ndim:
+        lengths = np.ones(1, dtype=np.intp)
+        empty = np.zeros(0, dtype=np.intp)
+        return (lengths, empty) if mask else (empty, lengths)
+    mask = mask.ravel()
+    if not len(mask):
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    boundaries = np.concatenate(([0], edges, [len(mask)]))
+    lengths = np.diff(boundaries)
+    if mask[0]:
+        return lengths[0::2], lengths[1::2]
+    return lengths[1::2], lengths[0::2]
+
+
+def mask_statistics(mask, size=None):
+    '''
+    Counts, ratio and run lengths of masked data.
+
+    :param mask: The mask.
+    :type mask: np.array or np.ma.nomask or bool
+    :param size: Number of samples the mask applies to if it is a scalar
+        (including nomask), by default a single sample.
+    :type size: int or None
+    :rtype: MaskStatistics
+    '''
+    if not np.ndim(mask) and size is not None:
+        mask = _as_mask(mask, size)
+    masked_runs, unmasked_runs = mask_runs(mask)
+    masked = int(masked_runs.sum())
+    size = masked + int(unmasked_runs.sum())
+    ratio = masked / float(size) if size else 1.0
+    return MaskStatistics(size, masked, ratio, masked_runs, unmasked_runs)
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
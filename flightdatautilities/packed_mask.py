@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Flight Data Utilities: Packed Mask
+
+Compact storage for the masks of long parameters. A boolean mask costs one
+byte per sample whereas a packed mask stores eight samples per byte.
+
+    packed = PackedMask.from_mask(np.ma.getmask(array))
+    merged = packed | PackedMask.from_mask(np.ma.getmask(other))
+    array.mask = merged.to_mask()
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+
+
+##############################################################################
+# Exports
+
+
+__all__ = ['PackedMask']
+
+
+##############################################################################
+# Constants
+
+
+# Number of set bits in each possible byte value.
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+##############################################################################
+# Classes
+
+
+class PackedMask(object):
+    '''
+    Mask stored with one bit per sample using np.packbits.
+
+    Bits beyond the size of the mask within the last byte are always clear,
+    so that counts and comparisons can operate on whole bytes.
+    '''
+
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits, size):
+        '''
+        :param bits: Packed bits as returned by np.packbits.
+        :type bits: np.array of np.uint8
+        :param size: Number of samples in the mask.
+        :type size: int
+        :raises ValueError: If the number of bytes does not match the size.
+        '''
+        bits = np.asarray(bits, dtype=np.uint8)
+        if len(bits) != (size + 7) // 8:
+            raise ValueError('%d bytes cannot store a mask of %d samples.' %
+                             (len(bits), size))
+        self.bits = bits
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask, size=None):
+        '''
+        :param mask: Boolean mask, nomask or a scalar.
+        :type mask: np.array or np.ma.nomask or bool
+        :param size: Number of samples, required for nomask and scalar masks.
+        :type size: int or None
+        :raises ValueError: If a scalar mask is provided without a size.
+        :rtype: PackedMask
+        '''
+        if np.ndim(mask):
+            mask = np.asarray(mask, dtype=np.bool_).ravel()
+            return cls(np.packbits(mask), len(mask))
+        if size is None:
+            raise ValueError('The size of a scalar mask must be provided.')
+        return cls.filled(size, bool(mask))
+
+    @classmethod
+    def filled(cls, size, value=False):
+        '''
+        :param size: Number of samples.
+        :type size: int
+        :param value: Whether all samples are masked.
+        :type value: bool
+        :rtype: PackedMask
+        '''
+        bits = np.full((size + 7) // 8, 0xFF if value else 0, dtype=np.uint8)
+        packed = cls(bits, size)
+        packed._clear_padding()
+        return packed
+
+    def _clear_padding(self):
+        remainder = self.size % 8
+        if remainder:
+            self.bits[-1] &= (0xFF << (8 - remainder)) & 0xFF
+
+    def _check(self, other):
+        if not isinstance(other, PackedMask):
+            return NotImplemented
+        if other.size != self.size:
+            raise ValueError('Mask sizes differ: %d != %d.' %
+                             (self.size, other.size))
+
+    def __repr__(self):
+        return '%s(size=%d, masked=%d)' % (self.__class__.__name__,
+                                           self.size, self.count())
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedMask):
+            return NotImplemented
+        return self.size == other.size and np.array_equal(self.bits,
+                                                          other.bits)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __or__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return PackedMask(self.bits | other.bits, self.size)
+
+    def __and__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return PackedMask(self.bits & other.bits, self.size)
+
+    def __xor__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return PackedMask(self.bits ^ other.bits, self.size)
+
+    def __ior__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        self.bits |= other.bits
+        return self
+
+    def __iand__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        self.bits &= other.bits
+        return self
+
+    def __invert__(self):
+        packed = PackedMask(~self.bits, self.size)
+        packed._clear_padding()
+        return packed
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def copy(self):
+        return PackedMask(self.bits.copy(), self.size)
+
+    def count(self):
+        '''
+        :returns: Number of masked samples.
+        :rtype: int
+        '''
+        return int(POPCOUNT[self.bits].sum())
+
+    def any(self):
+        return bool(self.bits.any())
+
+    def all(self):
+        return self.count() == self.size
+
+    def to_mask(self):
+        '''
+        :returns: Boolean mask suitable for np.ma masked arrays.
+        :rtype: np.array of bool
+        '''
+        return np.unpackbits(self.bits)[:self.size].view(np.bool_)
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+Flight Data Utilities: Resample
+
+Resampling of masked arrays between any two sample rates, taking into account
+the offset of the first sample of each array from the start of the data.
+
+A sample at index ``i`` of an array recorded at ``frequency`` Hz with
+``offset`` seconds was taken at ``offset + i / frequency`` seconds. Resampling
+evaluates the array at the times of the output samples, either interpolating
+linearly between the two neighbouring samples or taking the nearest one.
+Output samples which fall outside of the recorded samples, or which depend on
+masked samples, are masked.
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+
+
+##############################################################################
+# Exports
+
+
+__all__ = ['AlignedFrame', 'align_frame', 'interpolate', 'resample',
+           'resample_length', 'sample_positions']
+
+
+##############################################################################
+# Constants
+
+
+LINEAR = 'linear'
+NEAREST = 'nearest'
+METHODS = (LINEAR, NEAREST)
+
+# Tolerance when rounding positions and lengths to whole samples, so that
+# rates such as 1/3 Hz do not lose samples to floating point error.
+EPSILON = 1e-9
+
+
+##############################################################################
+# Functions
+
+
+def resample_length(length, frequency, output_frequency):
+    '''
+    Number of samples of an array of length samples at frequency once
+    resampled to output_frequency.
+
+    :param length: Number of samples in the array.
+    :type length: int
+    :param frequency: Frequency of the array in Hz.
+    :type frequency: int or float
+    :param output_frequency: Frequency to resample to in Hz.
+    :type output_frequency: int or float
+    :rtype: int
+    '''
+    return int(np.floor(length * output_frequency / float(frequency) +
+                        EPSILON))
+
+
+def sample_positions(length, frequency, offset, output_frequency,
+                     output_offset=0, start=0):
+    '''
+    Fractional indices into an array at frequency with offset of output
+    samples start to start + length at output_frequency with output_offset.
+
+    :rtype: np.array
+    '''
+    step = frequency / float(output_frequency)
+    first = (output_offset - offset) * frequency + start * step
+    return first + np.arange(length) * step
+
+
+def interpolate(data, mask, positions, method, out_data, out_mask):
+    '''
+    Evaluate data at fractional positions, writing into the output buffers.
+    Positions outside of data are masked. This is the kernel shared by
+    resample(), align_frame() and array_streams.iter_resample(), see
+    sample_positions().
+
+    :param data: The data to resample.
+    :type data: np.array
+    :param mask: The mask of the data or None if there are no masked values.
+    :type mask: np.array or None
+    :param positions: Fractional indices into data.
+    :type positions: np.array
+    :param method: 'linear' or 'nearest'.
+    :type method: str
+    :param out_data: Output data buffer, the same length as positions.
+    :type out_data: np.array
+    :param out_mask: Output mask buffer, the same length as positions.
+    :type out_mask: np.array
+    '''
+    last = len(data) - 1
+    if last < 0:
+        out_mask[...] = True
+        return
+
+    if method == NEAREST:
+        index = np.floor(positions + 0.5 + EPSILON).astype(np.intp)
+        np.logical_or(index < 0, index > last, out=out_mask)
+        np.clip(index, 0, last, out=index)
+        if out_data.dtype == data.dtype:
+            np.take(data, index, out=out_data)
+        else:
+            out_data[...] = data[index]
+        if mask is not None:
+            out_mask |= mask[index]
+        return
+
+    if method != LINEAR:
+        raise ValueError("Unknown resampling method '%s'." % method)
+
+    # Snap positions within EPSILON of a sample onto it.
+    rounded = np.round(positions)
+    positions = np.where(np.abs(positions - rounded) < EPSILON, rounded,
+                         positions)
+    np.logical_or(positions < 0, positions > last, out=out_mask)
+    lower = np.floor(positions).astype(np.intp)
+    np.clip(lower, 0, max(last - 1, 0), out=lower)
+    upper = np.minimum(lower + 1, last)
+    fraction = positions - lower
+    np.clip(fraction, 0, 1, out=fraction)
+    lower_data = data[lower]
+    # lower + (upper - lower) * fraction, reusing the gathered arrays.
+    difference = np.subtract(data[upper], lower_data, dtype=np.float64)
+    difference *= fraction
+    np.add(lower_data, difference, out=out_data, casting='unsafe')
+    if mask is not None:
+        out_mask |= mask[lower] & (fraction < 1)
+        out_mask |= mask[upper] & (fraction > 0)
+
+
+def resample(array, frequency, output_frequency, offset=0, output_offset=0,
+             method=LINEAR, out=None):
+    '''
+    Resample an array to another frequency and offset.
+
+    Any rates are supported, not only integer multiples. The number of output
+    samples is the duration of the array at output_frequency, unless an out
+    buffer is provided in which case its length is used.
+
+    :param array: The array to resample.
+    :type array: np.ma.masked_array or np.array
+    :param frequency: Frequency of the array in Hz.
+    :type frequency: int or float
+    :param output_frequency: Frequency to resample to in Hz.
+    :type output_frequency: int or float
+    :param offset: Time of the first sample of the array in seconds.
+    :type offset: int or float
+    :param output_offset: Time of the first output sample in seconds.
+    :type output_offset: int or float
+    :param method: 'linear' to interpolate between neighbouring samples or
+        'nearest' to take the nearest sample.
+    :type method: str
+    :param out: Array to store the result in.
+    :type out: np.ma.masked_array or np.array or None
+    :raises ValueError: If the method is not known.
+    :returns: The resampled array.
+    :rtype: np.ma.masked_array
+    '''
+    if method not in METHODS:
+        raise ValueError("Unknown resampling method '%s'." % method)
+    data = np.ma.getdata(array)
+    mask = np.ma.getmask(array)
+    mask = None if mask is np.ma.nomask else mask
+
+    if out is None:
+        length = resample_length(len(data), frequency, output_frequency)
+        dtype = data.dtype if method == NEAREST else \
+            np.promote_types(data.dtype, np.float64)
+        out = np.ma.array(np.empty(length, dtype=dtype),
+                          mask=np.empty(length, dtype=np.bool_))
+    elif not np.ma.isMaskedArray(out):
+        out = np.ma.array(out, mask=np.empty(len(out), dtype=np.bool_),
+                          copy=False)
+    elif out.mask is np.ma.nomask:
+        out.mask = np.zeros(len(out), dtype=np.bool_)
+
+    positions = sample_positions(len(out), frequency, offset,
+                                 output_frequency, output_offset)
+    interpolate(data, mask, positions, method, out.data, out.mask)
+    return out
+
+
+def align_frame(parameters, frequency, offset=0, method=LINEAR, methods=None,
+                length=None, dtype=np.float64):
+    '''
+    Resample many parameters to a master frequency and offset in one call,
+    writing straight into the columns of an AlignedFrame.
+
+    :param parameters: Parameters to align, a mapping of name to a tuple of
+        array, frequency and offset. The order of an ordered mapping is kept.
+    :type parameters: dict
+    :param frequency: Frequency to align to in Hz.
+    :type frequency: int or float
+    :param offset: Offset to align to in seconds.
+    :type offset: int or float
+    :param method: Resampling method for all parameters, see resample.
+    :type method: str
+    :param methods: Resampling methods for individual parameters by name,
+        e.g. 'nearest' for discrete parameters.
+    :type methods: dict or None
+    :param length: Number of samples in the frame, by default that of the
+        longest parameter once aligned.
+    :type length: int or None
+    :param dtype: Data type of the frame.
+    :type dtype: np.dtype
+    :returns: The aligned parameters.
+    :rtype: AlignedFrame
+    '''
+    methods = methods or {}
+    if length is None:
+        length = max([resample_length(len(array), array_frequency, frequency)
+                      for array, array_frequency, _ in parameters.values()] or
+                     [0])
+    frame = AlignedFrame(parameters.keys(), length, frequency, offset=offset,
+                         dtype=dtype)
+    for index, (name, (array, array_frequency, array_offset)) in \
+            enumerate(parameters.items()):
+        parameter_method = methods.get(name, method)
+        if parameter_method not in METHODS:
+            raise ValueError("Unknown resampling method '%s'." %
+                             parameter_method)
+        mask = np.ma.getmask(array)
+        positions = sample_positions(length, array_frequency, array_offset,
+                                     frequency, offset)
+        interpolate(np.ma.getdata(array),
+                    None if mask is np.ma.nomask else mask,
+                    positions, parameter_method, frame.data[:, index],
+                    frame.mask[:, index])
+    return frame
+
+
+##############################################################################
+# Classes
+
+
+class AlignedFrame(object):
+    '''
+    Parameters aligned to a common frequency and offset, stored in one 2-D
+    data block and one 2-D mask block with a column per parameter.
+
+    The blocks are Fortran ordered so that each column is contiguous.
+    Indexing the frame by parameter name returns a masked array whose data
+    and mask are views of the column.
+    '''
+
+    def __init__(self, names, length, frequency, offset=0, dtype=np.float64):
+        '''
+        :param names: Names of the parameters, one per column.
+        :type names: iterable of str
+        :param length: Number of samples in the frame.
+        :type length: int
+        :param frequency: Frequency of the frame in Hz.
+        :type frequency: int or float
+        :param offset: Offset of the frame in seconds.
+        :type offset: int or float
+        :param dtype: Data type of the frame.
+        :type dtype: np.dtype
+        '''
+        self.names = list(names)
+        self.frequency = frequency
+        self.offset = offset
+        self.data = np.zeros((length, len(self.names)), dtype=dtype,
+                             order='F')
+        self.mask = np.ones((length, len(self.names)), dtype=np.bool_,
+                            order='F')
+        self._columns = dict((name, i) for i, name in enumerate(self.names))
+
+    def __repr__(self):
+        return '%s(%s, %d, %s, offset=%s, dtype=%s)' % (
+            self.__class__.__name__, self.names, len(self), self.frequency,
+            self.offset, self.data.dtype)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, name):
+        index = self._columns[name]
+        return np.ma.array(self.data[:, index], mask=self.mask[:, index],
+                           copy=False)
+
+    def column(self, name):
+        '''
+        :returns: Views of the data and mask of the named parameter.
+        :rtype: (np.array, np.array)
+        '''
+        index = self._columns[name]
+        return self.data[:, index], self.mask[:, index]
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
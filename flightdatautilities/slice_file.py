@@ -1,4 +1,5 @@
 import argparse
+import logging
 import os
 
 from flightdatautilities.byte_aligned import inspect
@@ -64,6 +65,7 @@ def parse_args():
 
 def main():
     args = parse_args()
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
     slice_file(
         args.source_file_path,
         args.dest_file_path,
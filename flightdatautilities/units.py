@@ -15,6 +15,9 @@ The following links are useful resources:
 
 
 import math
+import numpy as np
+
+from collections import deque, namedtuple
 
 
 ##############################################################################
@@ -280,10 +283,10 @@ CONVERSION_MULTIPLIERS = {
     FPM: {
         KT: 0.009874739,
         MPH: 0.011363636,
-        FPS: 60.0,
+        FPS: 1 / 60.0,
     },
     FPS: {
-        FPM: 1 / 60.0,
+        FPM: 60.0,
     },
     # Time:
     HOUR: {
@@ -849,10 +852,244 @@ UNIT_DESCRIPTIONS = {
 }
 
 
+# Categories whose units are not all measures of the same quantity, so
+# conversions between them cannot be derived from one another:
+UNDERIVED_CATEGORIES = ('Other',)
+
+# Relative difference allowed between a direct conversion and the same
+# conversion via another unit, within the precision of the tables above:
+CONVERSION_TOLERANCE = 1e-4
+
+# Number of samples converted at a time by convert_array(), keeping each
+# block within the processor's cache between the scale and offset passes.
+CONVERT_BLOCK_SIZE = 65536
+
+# Number of units and pairs of units as provided whose normalised form or
+# compiled conversion is kept, see normalise() and conversion(). Each cache is
+# emptied once full, bounding the memory used by unknown strings in imports.
+NORMALISE_CACHE_SIZE = 4096
+CONVERSION_CACHE_SIZE = 4096
+
+
+##############################################################################
+# Globals
+
+
+# Compiled conversions by pair of units as provided, see conversion():
+_conversions = {}
+
+# Direct and derived conversions between normalised units, built on first
+# use, see _conversion_table():
+_table = None
+
+# Normalised units by case and whitespace folded form, built on first use,
+# see _folded_units():
+_folded = None
+
+# Normalised units by well known unit or correction, see normalise():
+_exact = dict(zip(UNIT_DESCRIPTIONS, UNIT_DESCRIPTIONS))
+_exact.update(UNIT_CORRECTIONS)
+
+# Normalised units by other unit as provided, see normalise():
+_normalised = {}
+
+
+##############################################################################
+# Classes
+
+
+class Conversion(namedtuple('Conversion', ('scale', 'offset'))):
+    '''
+    Affine conversion between two units: ``value * scale + offset``.
+
+    As a tuple it unpacks to a scale and offset pair. Calling it converts a
+    value, scalar or array, without allocating a closure.
+    '''
+
+    __slots__ = ()
+
+    def __call__(self, value):
+        if self.offset:
+            return value * self.scale + self.offset
+        return value * self.scale
+
+
+# Conversion between a unit and itself, which leaves values untouched:
+_IDENTITY = Conversion(1, 0)
+
+
 ##############################################################################
 # Functions
 
 
+def _affine(function):
+    '''
+    Derive the scale and offset of a conversion function by probing it, or
+    None if the function is not affine.
+
+    :param function: the conversion function.
+    :type function: function
+    :returns: the equivalent affine conversion.
+    :rtype: Conversion or None
+    '''
+    offset = float(function(0.0))
+    scale = float(function(1.0)) - offset
+    probe = float(function(2.0))
+    if abs(probe - (2 * scale + offset)) > 1e-9 * max(abs(probe), 1):
+        return None
+    return Conversion(scale, offset)
+
+
+def _compose(first, second):
+    '''
+    Compose two affine conversions, applying first and then second.
+
+    :rtype: Conversion
+    '''
+    return Conversion(first.scale * second.scale,
+                      first.offset * second.scale + second.offset)
+
+
+def _invert(conversion):
+    '''
+    :returns: the inverse of an affine conversion.
+    :rtype: Conversion
+    '''
+    return Conversion(1.0 / conversion.scale,
+                      -conversion.offset / conversion.scale)
+
+
+def _conversion_table():
+    '''
+    Build the table of conversions between all pairs of units.
+
+    Units within each category form a graph with an edge for each affine
+    conversion in CONVERSION_MULTIPLIERS and CONVERSION_FUNCTIONS, plus the
+    inverse of each conversion without a direct reverse. Conversions between
+    units which are not directly convertible are composed along the shortest
+    path between them. Direct conversions always take precedence.
+
+    :returns: conversions by unit and output unit.
+    :rtype: dict
+    :raises: ValueError -- if a direct conversion disagrees with converting
+        via another unit in the same category.
+    '''
+    table = {}
+    for unit, outputs in CONVERSION_MULTIPLIERS.items():
+        for output, m in outputs.items():
+            table.setdefault(unit, {})[output] = Conversion(m, 0)
+    for unit, outputs in CONVERSION_FUNCTIONS.items():
+        for output, f in outputs.items():
+            table.setdefault(unit, {})[output] = _affine(f) or f
+
+    for category, units in UNIT_CATEGORIES.items():
+        if category in UNDERIVED_CATEGORIES:
+            continue
+        graph = dict((unit, {}) for unit in units)
+        for unit in units:
+            for output, c in table.get(unit, {}).items():
+                if output in graph and isinstance(c, Conversion):
+                    graph[unit][output] = c
+        for unit in units:
+            for output, c in list(graph[unit].items()):
+                if unit not in graph[output] and c.scale:
+                    graph[output][unit] = _invert(c)
+        # Breadth first search from each unit for the shortest paths:
+        for source in units:
+            paths = {source: _IDENTITY}
+            queue = deque([source])
+            while queue:
+                unit = queue.popleft()
+                for output in sorted(graph[unit]):
+                    if output not in paths:
+                        paths[output] = _compose(paths[unit],
+                                                 graph[unit][output])
+                        queue.append(output)
+            del paths[source]
+            if paths:
+                outputs = table.setdefault(source, {})
+                for output, c in paths.items():
+                    outputs.setdefault(output, c)
+        _check_conversions(table, graph)
+    return table
+
+
+def _check_conversions(table, graph):
+    '''
+    Check that each direct conversion in a category agrees with converting
+    via every other unit which both units convert to.
+
+    :raises: ValueError -- if the conversions disagree.
+    '''
+    def close(a, b, minimum=0):
+        return abs(a - b) <= CONVERSION_TOLERANCE * max(abs(a), abs(b),
+                                                        minimum)
+
+    for unit in graph:
+        for output, direct in graph[unit].items():
+            for via in graph:
+                if via in (unit, output) or via not in table.get(unit, {}) \
+                        or output not in table.get(via, {}):
+                    continue
+                c = _compose(table[unit][via], table[via][output])
+                if not (close(c.scale, direct.scale) and
+                        close(c.offset, direct.offset, minimum=1)):
+                    raise ValueError(
+                        'Conversion from %s to %s disagrees with conversion '
+                        'via %s.' % (unit, output, via))
+
+
+def _compile(unit, output):
+    '''
+    Compile the conversion between normalised units.
+
+    :raises: ValueError -- if any of the units are not known.
+    '''
+    global _table
+    if unit == output:
+        return _IDENTITY
+    if _table is None:
+        _table = _conversion_table()
+    try:
+        outputs = _table[unit]
+    except KeyError:
+        raise ValueError('Unknown unit: %s' % unit)
+    try:
+        return outputs[output]
+    except KeyError:
+        raise ValueError('Unknown output unit: %s' % output)
+
+
+def conversion(unit, output):
+    '''
+    Looks up the compiled conversion for the units provided.
+
+    Conversions are compiled once per pair of units, so repeated lookups
+    cost a single dictionary access. Affine conversions, including those in
+    CONVERSION_FUNCTIONS, are compiled to a scale and offset pair. Pairs of
+    units in the same category without a direct conversion are converted
+    via other units in the category, see _conversion_table().
+
+    :param unit: the unit to convert from.
+    :type unit: string
+    :param output: the unit to convert to.
+    :type output: string
+    :returns: the conversion, or a function for conversions which are not
+        affine.
+    :rtype: Conversion or function
+    :raises: ValueError -- if any of the units are not known.
+    '''
+    try:
+        return _conversions[unit, output]
+    except KeyError:
+        pass
+    compiled = _compile(normalise(unit), normalise(output))
+    if len(_conversions) >= CONVERSION_CACHE_SIZE:
+        _conversions.clear()
+    _conversions[unit, output] = compiled
+    return compiled
+
+
 def available(values=True):
     '''
     Returns a list of units available that are defined in this module.
@@ -876,16 +1113,87 @@ def available(values=True):
         return module, x
 
 
+def _fold(unit):
+    '''
+    :returns: the unit in lower case with all whitespace removed.
+    :rtype: string
+    '''
+    return ''.join(unit.lower().split())
+
+
+def _folded_units():
+    '''
+    Build the table of normalised units by folded form of each unit and of
+    each correction in UNIT_CORRECTIONS.
+
+    Folded forms shared by different units, e.g. 'm' for metres and 'M' for
+    Mach, are left out so that they are only normalised when matched exactly.
+
+    :returns: normalised units by folded form.
+    :rtype: dict
+    '''
+    folded = {}
+    ambiguous = set()
+    pairs = [(unit, unit) for unit in available()]
+    pairs.extend(UNIT_CORRECTIONS.items())
+    for unit, normalised in pairs:
+        key = _fold(unit)
+        if folded.setdefault(key, normalised) != normalised:
+            ambiguous.add(key)
+    for key in ambiguous:
+        del folded[key]
+    return folded
+
+
 def normalise(unit):
     '''
     Normalises the provided unit to a well known form.
 
+    Units and corrections in UNIT_CORRECTIONS are matched exactly first and
+    then regardless of case and whitespace, so variants such as '% N1' need
+    not be listed. Variants are cached as provided, up to
+    NORMALISE_CACHE_SIZE at a time. Unknown units are returned unchanged,
+    see unknown_units().
+
     :param unit: the unit to normalise.
     :type unit: string
     :returns: the normalised unit.
     :rtype: string
     '''
-    return UNIT_CORRECTIONS.get(unit, unit)
+    global _folded
+    try:
+        return _exact[unit]
+    except KeyError:
+        pass
+    except TypeError:
+        return unit  # Not hashable, so cannot be a unit.
+    try:
+        return _normalised[unit]
+    except KeyError:
+        pass
+    if not isinstance(unit, basestring):
+        return unit
+    if _folded is None:
+        _folded = _folded_units()
+    normalised = _folded.get(_fold(unit), unit)
+    if len(_normalised) >= NORMALISE_CACHE_SIZE:
+        _normalised.clear()
+    _normalised[unit] = normalised
+    return normalised
+
+
+def unknown_units(units):
+    '''
+    Finds the units which cannot be normalised to a well known form, e.g.
+    to report all unknown units of the parameters in a file at once.
+
+    :param units: the units to check.
+    :type units: iterable of string
+    :returns: the unknown units as provided.
+    :rtype: set
+    '''
+    known = set(available())
+    return set(unit for unit in units if normalise(unit) not in known)
 
 
 def function(unit, output):
@@ -899,19 +1207,10 @@ def function(unit, output):
     :returns: the conversion function
     :rtype: function
     '''
-    unit0, unit1 = normalise(unit), normalise(output)
-
     try:
-        return CONVERSION_FUNCTIONS[unit0][unit1]
-    except KeyError:
-        pass
-
-    try:
-        return lambda v: v * CONVERSION_MULTIPLIERS[unit0][unit1]
-    except KeyError:
-        pass
-
-    return None
+        return conversion(unit, output)
+    except ValueError:
+        return None
 
 
 def multiplier(unit, output):
@@ -942,18 +1241,72 @@ def convert(value, unit, output):
     :rtype: numeric
     :raises: ValueError -- if any of the units are not known.
     '''
-    unit = normalise(unit)
-    output = normalise(output)
-    if unit == output:
+    compiled = conversion(unit, output)
+    if compiled is _IDENTITY:
         return value
-    try:
-        if unit in CONVERSION_FUNCTIONS:
-            return function(unit, output)(value)
-        if unit in CONVERSION_MULTIPLIERS:
-            return value * multiplier(unit, output)
-        raise ValueError('Unknown unit: %s' % unit)
-    except KeyError:
-        raise ValueError('Unknown output unit: %s' % output)
+    return compiled(value)
+
+
+def convert_array(array, unit, output, out=None):
+    '''
+    Converts an array from one unit to another without temporary arrays.
+
+    Affine conversions are applied block by block, scaling and offsetting
+    each block while it is in the processor's cache. The mask of a masked
+    array is preserved. Pass the array itself as out to convert it in place.
+
+    :param array: the array to convert.
+    :type array: np.ndarray or np.ma.MaskedArray
+    :param unit: the unit to convert from.
+    :type unit: string
+    :param output: the unit to convert to.
+    :type output: string
+    :param out: the array to store the result in, by default a new array of
+        floating point values.
+    :type out: np.ndarray or np.ma.MaskedArray or None
+    :returns: the converted array.
+    :rtype: np.ndarray or np.ma.MaskedArray
+    :raises: ValueError -- if any of the units are not known.
+    :raises: TypeError -- if the result cannot be stored in out.
+    '''
+    compiled = conversion(unit, output)
+    data = np.ma.getdata(array)
+    mask = np.ma.getmask(array)
+
+    if out is None:
+        dtype = data.dtype if data.dtype.kind == 'f' else np.float64
+        out_data = np.empty(data.shape, dtype=dtype)
+        if np.ma.isMaskedArray(array):
+            out = np.ma.array(out_data, copy=False, mask=mask if
+                              mask is np.ma.nomask else mask.copy())
+        else:
+            out = out_data
+    else:
+        out_data = np.ma.getdata(out)
+        if out is not array and np.ma.isMaskedArray(out):
+            out.mask = mask
+
+    if compiled is _IDENTITY:
+        if out_data is not data:
+            np.copyto(out_data, data, casting='same_kind')
+        return out
+    if not isinstance(compiled, Conversion):
+        np.copyto(out_data, compiled(data), casting='same_kind')
+        return out
+
+    scale, offset = compiled
+    if data.flags.c_contiguous and out_data.flags.c_contiguous:
+        data, out_data = data.reshape(-1), out_data.reshape(-1)
+        blocks = [slice(i, i + CONVERT_BLOCK_SIZE)
+                  for i in range(0, len(data), CONVERT_BLOCK_SIZE)]
+    else:
+        blocks = [Ellipsis]
+    for block in blocks:
+        result = out_data[block]
+        np.multiply(data[block], scale, out=result)
+        if offset:
+            np.add(result, offset, out=result)
+    return out
 
 
 ##############################################################################
@@ -1,17 +1,59 @@
 import numpy as np
 import unittest
 
+from scipy.interpolate import interp1d
+
 from flightdatautilities import masked_array_testutils as ma_test
 from flightdatautilities.array_operations import (
+    align_arrays,
     downsample_arrays,
+    extrap1d,
+    interp_extrap,
     mask_ratio,
     merge_masks,
     percent_unmasked,
+    reduce_masks,
+    reduce_sum,
     sum_arrays,
     upsample_arrays,
 )
 
 
+class TestExtrap1d(unittest.TestCase):
+    def test_extrap1d(self):
+        interpolator = interp1d([0, 10, 20, 40], [0, 5, 20, 30])
+        extrapolator = extrap1d(interpolator)
+        self.assertEqual(extrapolator([-10, 0, 5, 15, 40, 60]).tolist(),
+                         [-5, 0, 2.5, 12.5, 30, 40])
+        self.assertEqual(extrapolator(-20).tolist(), [-10])
+
+
+class TestInterpExtrap(unittest.TestCase):
+    def test_interp_extrap(self):
+        xp = [0, 10, 20, 40]
+        fp = [0, 5, 20, 30]
+        x = np.array([-10, 0, 5, 15, 40, 60])
+        self.assertEqual(interp_extrap(x, xp, fp).tolist(),
+                         [-5, 0, 2.5, 12.5, 30, 40])
+        self.assertEqual(interp_extrap(-20, xp, fp), -10)
+        self.assertEqual(interp_extrap(30, xp, fp), 25)
+        x = np.linspace(-100, 100, 1001)
+        ma_test.assert_almost_equal(
+            interp_extrap(x, xp, fp),
+            extrap1d(interp1d(xp, fp))(x))
+
+    def test_interp_extrap_masked(self):
+        xp = np.ma.array([0, 10, 15, 20, 40], mask=[0, 0, 1, 0, 0])
+        fp = np.ma.array([0, 5, 1000, 20, 30])
+        x = np.ma.array([-10, 0, 5, 15, 40, 60], mask=[0, 0, 1, 0, 0, 0])
+        result = interp_extrap(x, xp, fp)
+        self.assertTrue(isinstance(result, np.ma.MaskedArray))
+        self.assertEqual(result.tolist(), [-5, 0, None, 12.5, 30, 40])
+        self.assertFalse(result.mask is x.mask)
+        self.assertRaises(ValueError, interp_extrap, x,
+                          np.ma.array([0, 1], mask=[0, 1]), [0, 1])
+
+
 class TestMaskRatio(unittest.TestCase):
     def test_mask_ratio(self):
         self.assertEqual(mask_ratio(True), 1)
@@ -80,6 +122,50 @@ class TestSumArrays(unittest.TestCase):
                                   [0,0,1]])).tolist(), [1,1,1])
 
 
+class TestReduceMasks(unittest.TestCase):
+    def test_reduce_masks(self):
+        self.assertRaises(IndexError, reduce_masks, [])
+        masks = [np.array([1, 0, 0], dtype=np.bool_),
+                 np.ma.nomask,
+                 np.array([0, 0, 1], dtype=np.bool_)]
+        self.assertEqual(reduce_masks(masks).tolist(), [1, 0, 1])
+        self.assertEqual(masks[0].tolist(), [1, 0, 0])
+        self.assertEqual(reduce_masks(np.array(masks[::2])).tolist(),
+                         [1, 0, 1])
+        out = np.ones(3, dtype=np.bool_)
+        self.assertTrue(reduce_masks(masks, out=out) is out)
+        self.assertEqual(out.tolist(), [1, 0, 1])
+
+
+class TestReduceSum(unittest.TestCase):
+    def test_reduce_sum(self):
+        self.assertRaises(IndexError, reduce_sum, [])
+        arrays = [np.arange(3), np.arange(3), np.ones(3)]
+        result = reduce_sum(arrays)
+        self.assertFalse(isinstance(result, np.ma.MaskedArray))
+        self.assertEqual(result.tolist(), [1, 3, 5])
+        self.assertEqual(result.dtype, np.float64)
+        # Inputs are not modified.
+        self.assertEqual(arrays[0].tolist(), [0, 1, 2])
+        self.assertEqual(reduce_sum(np.array(arrays)).tolist(), [1, 3, 5])
+        out = np.zeros(3)
+        self.assertTrue(reduce_sum(arrays, out=out) is out)
+        self.assertEqual(out.tolist(), [1, 3, 5])
+
+    def test_reduce_sum_masked(self):
+        arrays = [np.ma.array([0, 1, 2], mask=[1, 0, 0]),
+                  np.arange(3),
+                  np.ma.array([0, 1, 2], mask=[0, 0, 1])]
+        result = reduce_sum(arrays)
+        self.assertEqual(result.tolist(), [None, 3, None])
+        self.assertEqual(arrays[0].mask.tolist(), [1, 0, 0])
+        self.assertEqual(reduce_sum(np.ma.array(arrays)).tolist(),
+                         [None, 3, None])
+        out = np.ma.zeros(3, dtype=np.int64)
+        self.assertTrue(reduce_sum(arrays, out=out) is out)
+        self.assertEqual(out.tolist(), [None, 3, None])
+
+
 class TestDownsampleArrays(unittest.TestCase):
     def test_downsample_arrays(self):
         array1 = np.ma.arange(10)
@@ -99,6 +185,19 @@ class TestDownsampleArrays(unittest.TestCase):
         ma_test.assert_array_equal(downsampled_array2, array2)
 
 
+class TestAlignArrays(unittest.TestCase):
+    def test_align_arrays(self):
+        self.assertEqual(
+            align_arrays(np.arange(10), np.arange(20, 30)).tolist(),
+            range(10))
+        self.assertEqual(
+            align_arrays(np.arange(40, 80), np.arange(30, 40)).tolist(),
+            range(40, 80, 4))
+        self.assertEqual(
+            align_arrays(np.arange(10), np.arange(20, 40)).tolist(),
+            np.arange(10).repeat(2).tolist())
+
+
 class TestUpsampleArrays(unittest.TestCase):
     def test_upsample_arrays(self):
         array1 = np.bool_(True)
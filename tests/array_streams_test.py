@@ -0,0 +1,90 @@
+import numpy as np
+import unittest
+
+from flightdatautilities.array_operations import (
+    mask_ratio,
+    merge_masks,
+    sum_arrays,
+)
+from flightdatautilities.array_streams import (
+    chunked_mask_ratio,
+    iter_chunks,
+    iter_merge_masks,
+    iter_resample,
+    iter_sum_arrays,
+)
+from flightdatautilities.resample import resample
+
+
+class TestIterChunks(unittest.TestCase):
+    def test_iter_chunks(self):
+        chunks = list(iter_chunks(np.arange(7), 3))
+        self.assertEqual([c.tolist() for c in chunks],
+                         [[0, 1, 2], [3, 4, 5], [6]])
+
+
+class TestIterMergeMasks(unittest.TestCase):
+    def test_iter_merge_masks(self):
+        masks = [np.array([0, 1, 0, 0, 0], dtype=bool),
+                 np.array([0, 0, 0, 1, 0], dtype=bool)]
+        chunks = list(iter_merge_masks(iter_chunks(m, 2) for m in masks))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(np.concatenate(chunks).tolist(),
+                         merge_masks(masks).tolist())
+
+
+class TestIterSumArrays(unittest.TestCase):
+    def test_iter_sum_arrays(self):
+        arrays = [np.ma.array([1, 2, 3, 4], mask=[0, 1, 0, 0]),
+                  np.ma.array([5, 6, 7, 8], mask=[0, 0, 0, 1])]
+        chunks = list(iter_sum_arrays(iter_chunks(a, 3) for a in arrays))
+        result = np.ma.concatenate(chunks)
+        expected = sum_arrays(arrays)
+        self.assertEqual(result.tolist(), expected.tolist())
+
+
+class TestChunkedMaskRatio(unittest.TestCase):
+    def test_chunked_mask_ratio(self):
+        mask = np.zeros(10, dtype=bool)
+        self.assertEqual(chunked_mask_ratio(iter_chunks(mask, 3)), 0)
+        mask[2] = True
+        self.assertEqual(chunked_mask_ratio(iter_chunks(mask, 3)),
+                         mask_ratio(mask))
+        self.assertEqual(chunked_mask_ratio(iter_chunks(~mask | True, 3)), 1)
+
+
+class TestIterResample(unittest.TestCase):
+    def assert_resampled(self, array, chunk_size, *args, **kwargs):
+        expected = resample(array, *args, **kwargs)
+        chunks = list(iter_resample(iter_chunks(array, chunk_size), *args,
+                                    **kwargs))
+        result = np.ma.concatenate(chunks)
+        self.assertEqual(result.tolist(), expected.tolist())
+
+    def test_iter_resample_upsample(self):
+        array = np.ma.arange(10, dtype=np.float64)
+        array[4] = np.ma.masked
+        for chunk_size in (1, 3, 4, 10):
+            self.assert_resampled(array, chunk_size, 1, 4)
+            self.assert_resampled(array, chunk_size, 1, 4, offset=0.5)
+            self.assert_resampled(array, chunk_size, 1, 4, method='nearest')
+
+    def test_iter_resample_downsample(self):
+        array = np.ma.arange(24, dtype=np.float64)
+        for chunk_size in (1, 5, 8):
+            self.assert_resampled(array, chunk_size, 8, 1)
+            self.assert_resampled(array, chunk_size, 4, 3, offset=0.1,
+                                  output_offset=0.3)
+
+    def test_iter_resample_leading_output(self):
+        # Output samples before the first input sample are produced masked
+        # while later ones are held back until their inputs arrive.
+        array = np.ma.arange(12, dtype=np.float64)
+        for chunk_size in (1, 2, 5):
+            self.assert_resampled(array, chunk_size, 1, 1, offset=3)
+            self.assert_resampled(array, chunk_size, 2, 1, offset=1,
+                                  output_offset=-2)
+
+    def test_iter_resample_invalid_method(self):
+        self.assertRaises(ValueError, list,
+                          iter_resample([np.arange(3)], 1, 2, method='cubic'))
@@ -0,0 +1,431 @@
+import logging
+import multiprocessing
+import numpy as np
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from mock import patch
+
+from flightdatautilities.cache import (
+    CAPACITY,
+    EXPIRED,
+    EXPIRY,
+    IDENTITY,
+    MISSING,
+    Cache,
+    DiskCache,
+    SharedMemoryCache,
+    StatsLogger,
+    array_key,
+    cache_stats,
+    make_key,
+    memoize,
+    touch,
+)
+
+
+class TestMakeKey(unittest.TestCase):
+    def test_make_key(self):
+        self.assertEqual(make_key((1, 'a')), make_key((1, 'a')))
+        hash(make_key((1, 'a')))
+        self.assertEqual(make_key((1,), {'b': 2, 'a': 1}),
+                         make_key((1,), {'a': 1, 'b': 2}))
+        self.assertNotEqual(make_key((1,), {'a': 1}), make_key((1, 'a', 1)))
+
+    def test_make_key_typed(self):
+        keys = [make_key((1,)), make_key((1.0,)), make_key((True,)),
+                make_key((), {'a': 1}), make_key((), {'a': 1.0})]
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_make_key_unhashable(self):
+        key = make_key(([1, 2], {'a': 1}))
+        hash(key)
+        self.assertEqual(key, make_key(([1, 2], {'a': 1})))
+        self.assertNotEqual(key, make_key(([1, 3], {'a': 1})))
+
+
+class TestCache(unittest.TestCase):
+    def test_get_set(self):
+        cache = Cache()
+        self.assertIs(cache.get('a'), MISSING)
+        cache.set('a', 0)
+        self.assertEqual(cache.get('a'), 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIn('a', cache)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    @patch('flightdatautilities.cache._now')
+    def test_expiry(self, now):
+        now.return_value = 100
+        cache = Cache(timeout=10)
+        cache.set('a', 1)
+        now.return_value = 110
+        self.assertEqual(cache.get('a'), 1)
+        now.return_value = 111
+        self.assertNotIn('a', cache)
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = Cache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(len(cache), 2)
+
+
+class TestMemoize(unittest.TestCase):
+    def test_memoize(self):
+        calls = []
+
+        @memoize
+        def f(x, y=1):
+            calls.append((x, y))
+            return None
+
+        self.assertIsNone(f(1))
+        self.assertIsNone(f(1))
+        self.assertIsNone(f(1, y=1))
+        self.assertIsNone(f([1]))
+        self.assertIsNone(f([1]))
+        # Falsy results are cached too:
+        self.assertEqual(calls, [(1, 1), ([1], 1)])
+        self.assertEqual((f.cache.hits, f.cache.misses), (3, 2))
+        self.assertEqual(f.__name__, 'f')
+
+    def test_memoize_typed(self):
+
+        @memoize
+        def f(x):
+            return repr(x)
+
+        self.assertEqual([f(1), f(True), f(1.0)], ['1', 'True', '1.0'])
+
+    @patch('flightdatautilities.cache._now')
+    def test_memoize_options(self, now):
+        now.return_value = 0
+        calls = []
+
+        @memoize(timeout=5, maxsize=1)
+        def f(x):
+            calls.append(x)
+            return x
+
+        f(1)
+        f(1)
+        f(2)
+        f(1)
+        self.assertEqual(calls, [1, 2, 1])
+        now.return_value = 6
+        f(1)
+        self.assertEqual(calls, [1, 2, 1, 1])
+
+    def test_memoize_threads(self):
+        @memoize(maxsize=10)
+        def f(x):
+            return x * 2
+
+        def worker():
+            for i in range(1000):
+                self.assertEqual(f(i % 20), (i % 20) * 2)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(f.cache.hits + f.cache.misses, 4000)
+        self.assertLessEqual(len(f.cache), 10)
+
+
+class TestArrayKey(unittest.TestCase):
+    def test_digest(self):
+        array = np.arange(10, dtype=np.float64)
+        key = array_key(array)
+        hash(key)
+        self.assertEqual(key, array_key(array.copy()))
+        self.assertNotEqual(key, array_key(array.astype(np.float32)))
+        self.assertNotEqual(key, array_key(array.reshape(2, 5)))
+        self.assertEqual(array_key(array[::2]), array_key(array[::2].copy()))
+        other = array.copy()
+        other[3] = 0
+        self.assertNotEqual(key, array_key(other))
+
+    def test_digest_masked(self):
+        array = np.ma.arange(10)
+        key = array_key(array)
+        self.assertNotEqual(key, array_key(array.data))
+        array[3] = np.ma.masked
+        self.assertNotEqual(key, array_key(array))
+        self.assertRaises(ValueError, array_key, np.array([{}]))
+
+    def test_identity(self):
+        array = np.arange(10)
+        key = array_key(array, strategy=IDENTITY)
+        self.assertEqual(key, array_key(array, strategy=IDENTITY))
+        self.assertNotEqual(key, array_key(array.copy(), strategy=IDENTITY))
+        array[0] = 1
+        touch(array)
+        self.assertNotEqual(key, array_key(array, strategy=IDENTITY))
+        self.assertRaises(ValueError, array_key, array, strategy='other')
+
+
+class TestMemoizeArrays(unittest.TestCase):
+    def test_memoize_digest(self):
+        calls = []
+
+        @memoize
+        def f(array, scale=1):
+            calls.append(scale)
+            return array.sum() * scale
+
+        array = np.ma.arange(100)
+        with patch('flightdatautilities.cache.pickle.dumps') as dumps:
+            self.assertEqual(f(array), 4950)
+            self.assertEqual(f(array.copy()), 4950)
+            self.assertEqual(f(array, scale=2), 9900)
+            self.assertFalse(dumps.called)
+        self.assertEqual(calls, [1, 2])
+        array[0:10] = np.ma.masked
+        self.assertEqual(f(array), 4905)
+
+    def test_memoize_identity(self):
+        @memoize(arrays=IDENTITY)
+        def f(array):
+            return array.sum()
+
+        array = np.arange(100)
+        self.assertEqual(f(array), 4950)
+        array[:] = 0
+        self.assertEqual(f(array), 4950)
+        touch(array)
+        self.assertEqual(f(array), 0)
+        self.assertRaises(ValueError, memoize, arrays='other')
+
+
+class TestCacheStats(unittest.TestCase):
+    @patch('flightdatautilities.cache._now')
+    def test_info(self, now):
+        now.return_value = 0
+        cache = Cache(timeout=10, maxsize=2, namespace='test')
+        cache.get('a')
+        cache.set('a', np.zeros(100))
+        cache.get('a')
+        cache.set('b', 1)
+        cache.set('c', 2)
+        now.return_value = 20
+        cache.get('c')
+        info = cache.info()
+        self.assertEqual(info.namespace, 'test')
+        self.assertEqual((info.hits, info.misses), (1, 2))
+        self.assertAlmostEqual(info.hit_rate, 1 / 3.0)
+        self.assertEqual(info.size, 1)
+        self.assertEqual((info.maxsize, info.timeout), (2, 10))
+        self.assertEqual(info.evictions, {EXPIRED: 1, CAPACITY: 1})
+        self.assertGreater(info.memory, 0)
+        cache.clear()
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.hit_rate), (0, 0, 0))
+        self.assertEqual(info.evictions, {EXPIRED: 0, CAPACITY: 0})
+
+    def test_memoize_info(self):
+        @memoize
+        def f(x):
+            return x
+
+        f(1)
+        f(1)
+        self.assertEqual(f.cache_info().hits, 1)
+        self.assertIn(f.cache_info(), cache_stats())
+        f.cache_clear()
+        self.assertEqual(f.cache_info().size, 0)
+
+    def test_registry(self):
+        cache = Cache(namespace='registry test')
+        self.assertIn('registry test', [i.namespace for i in cache_stats()])
+        del cache
+        self.assertNotIn('registry test',
+                         [i.namespace for i in cache_stats()])
+
+    def test_stats_logger(self):
+        cache = Cache(namespace='logger test')
+        cache.set('a', 1)
+        with patch('flightdatautilities.cache.logger') as logger:
+            stats_logger = StatsLogger(interval=0.01, level=logging.DEBUG)
+            stats_logger.start()
+            while not logger.log.called:
+                stats_logger.join(0.01)
+            stats_logger.stop()
+        self.assertFalse(stats_logger.is_alive())
+        self.assertEqual(logger.log.call_args[0][0], logging.DEBUG)
+
+
+def _square(x):
+    return x ** 2
+
+
+def _memoized_square(path, x):
+    square = memoize(backend=lambda **kwargs: DiskCache(path=path, **kwargs))(
+        _square)
+    square(x)
+    return square.cache.hits
+
+
+class BackendTests(object):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_get_set(self):
+        cache = self.create(namespace='a')
+        self.assertIs(cache.get(('x', 1)), MISSING)
+        cache.set(('x', 1), {'value': None})
+        self.assertEqual(cache.get(('x', 1)), {'value': None})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(len(cache), 1)
+        # Other namespaces and instances sharing the store:
+        self.assertIs(self.create(namespace='b').get(('x', 1)), MISSING)
+        self.assertEqual(self.create(namespace='a').get(('x', 1)),
+                         {'value': None})
+        self.assertGreater(cache.info().memory, 0)
+        cache.delete(('x', 1))
+        self.assertNotIn(('x', 1), cache)
+        cache.set(('x', 2), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_expiry(self):
+        cache = self.create(timeout=10)
+        with patch('flightdatautilities.cache.time.time') as now:
+            now.return_value = 1000
+            cache.set('a', 1)
+            now.return_value = 1010
+            self.assertEqual(cache.get('a'), 1)
+            now.return_value = 1011
+            self.assertIs(cache.get('a'), MISSING)
+            cache.set('b', 1)
+        self.assertEqual(cache.info().evictions[EXPIRED], 1)
+        cache = self.create(timeout=None)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_memoize_backend(self):
+        @memoize(backend=lambda **kwargs: self.create(**kwargs))
+        def f(x):
+            return x * 2
+
+        self.assertEqual(f(np.arange(3)).tolist(), [0, 2, 4])
+        self.assertEqual(f(np.arange(3)).tolist(), [0, 2, 4])
+        self.assertEqual(f.cache.hits, 1)
+        self.assertTrue(f.cache.namespace.endswith('.f'))
+        self.assertRaises(ValueError, memoize(arrays=IDENTITY,
+                                              backend=f.cache), _square)
+
+    def test_memoize_namespace(self):
+        # Functions of the same name share a backend by their namespaces:
+        def factory(n, namespace=None):
+            @memoize(backend=lambda **kwargs: self.create(**kwargs),
+                     namespace=namespace)
+            def f(x):
+                return x * n
+            return f
+
+        f, g = factory(2), factory(3)
+        self.assertEqual(f.cache.namespace, g.cache.namespace)
+        f, g = factory(2, 'f'), factory(3, 'g')
+        self.assertEqual((f.cache.namespace, g.cache.namespace), ('f', 'g'))
+        self.assertEqual((f(1), g(1)), (2, 3))
+
+
+class TestSharedMemoryCache(BackendTests, unittest.TestCase):
+    def create(self, **kwargs):
+        return SharedMemoryCache(path=self.temp_dir, **kwargs)
+
+    def test_maxsize(self):
+        cache = self.create(maxsize=2)
+        for i in range(4):
+            cache.set(i, i)
+            os.utime(cache._entry_path(i), (1000 + i,) * 2)
+        cache.set(4, 4)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions[CAPACITY], 3)
+        self.assertIn(4, cache)
+        self.assertIn(3, cache)
+
+    def test_maxsize_interval(self):
+        # Entries are only listed once every maxsize / EVICTION_DIVISOR sets:
+        cache = self.create(maxsize=16)
+        with patch.object(cache, '_evict') as evict:
+            for i in range(16):
+                cache.set(i, i)
+            self.assertEqual(evict.call_count, 8)
+        for i in range(16, 18):
+            cache.set(i, i)
+        self.assertEqual(len(cache), 16)
+
+    def test_unreadable(self):
+        cache = self.create()
+        cache.set('a', 1)
+        cache.set('b', 2)
+        with open(cache._entry_path('a'), 'wb') as file_obj:
+            file_obj.write(b'\0' * 4)  # Truncated expiry.
+        with open(cache._entry_path('b'), 'r+b') as file_obj:
+            file_obj.seek(EXPIRY.size)
+            file_obj.write(b'stale')
+        for key in ('a', 'b'):
+            self.assertIs(cache.get(key), MISSING)
+            self.assertFalse(os.path.exists(cache._entry_path(key)))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+
+
+class TestDiskCache(BackendTests, unittest.TestCase):
+    def create(self, **kwargs):
+        return DiskCache(path=os.path.join(self.temp_dir, 'cache.sqlite'),
+                         **kwargs)
+
+    def test_maxsize(self):
+        cache = self.create(maxsize=2)
+        with patch('flightdatautilities.cache.time.time') as now:
+            for i in range(4):
+                now.return_value = 1000 + i
+                cache.set(i, i)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.evictions[CAPACITY], 2)
+            self.assertIn(2, cache)
+            self.assertIn(3, cache)
+        plan = cache._connection().execute(
+            'EXPLAIN QUERY PLAN SELECT key FROM cache WHERE namespace = ? '
+            'ORDER BY stored DESC', ('',)).fetchall()
+        self.assertIn('cache_stored', str(plan))
+
+    def test_unreadable(self):
+        cache = self.create()
+        cache.set('a', 1)
+        cache._connection().execute('UPDATE cache SET value = ?',
+                                    (sqlite3.Binary(b'stale'),))
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(len(cache), 0)
+
+    def test_processes(self):
+        path = os.path.join(self.temp_dir, 'cache.sqlite')
+        pool = multiprocessing.Pool(2)
+        try:
+            self.assertEqual(pool.apply(_memoized_square, (path, 3)), 0)
+            self.assertEqual(pool.apply(_memoized_square, (path, 3)), 1)
+        finally:
+            pool.close()
+            pool.join()
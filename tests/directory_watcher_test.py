@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+'''
+
+##############################################################################
+# Imports
+
+
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from flightdatautilities.directory_watcher import DirectoryWatcher, KnownFiles
+
+
+##############################################################################
+# Test Cases
+
+
+class TestKnownFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_add(self):
+        store_path = os.path.join(self.temp_dir, 'known_files.txt')
+        known_files = KnownFiles(store_path)
+        path = os.path.join(self.temp_dir, 'data.SAC')
+        self.assertTrue(known_files.add(path))
+        self.assertFalse(known_files.add(path))
+        self.assertFalse(known_files.add(
+            os.path.join(self.temp_dir, '.', 'data.SAC')))
+        self.assertIn(path, known_files)
+        self.assertEqual(len(known_files), 1)
+        # Known files are persisted:
+        known_files = KnownFiles(store_path)
+        self.assertIn(path, known_files)
+        self.assertFalse(known_files.add(path))
+
+    def test_add_names(self):
+        store_path = os.path.join(self.temp_dir, 'known_files.txt')
+        known_files = KnownFiles(store_path)
+        # Names which are not ASCII, including names which are not valid
+        # UTF-8:
+        paths = [os.path.join(self.temp_dir, 'caf\xc3\xa9.SAC'),
+                 os.path.join(self.temp_dir, 'invalid\xff.SAC'),
+                 os.path.join(self.temp_dir, u'unicode\xe9.SAC')]
+        for path in paths:
+            self.assertTrue(known_files.add(path))
+        known_files = KnownFiles(store_path)
+        self.assertEqual(len(known_files), 3)
+        for path in paths:
+            self.assertIn(path, known_files)
+            self.assertFalse(known_files.add(path))
+
+
+@unittest.skipIf(platform.system() != 'Linux', 'Requires Linux inotify.')
+class TestDirectoryWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, *names):
+        path = os.path.join(self.temp_dir, *names)
+        with open(path, 'w') as file_obj:
+            file_obj.write('content')
+        return path
+
+    def test_watch(self):
+        existing_path = self._write('existing.SAC')
+        self._write('ignored.txt')
+        known_files = KnownFiles()
+        watcher = DirectoryWatcher([self.temp_dir], [r'.*\.SAC$'],
+                                   settle_time=0.2, known_files=known_files)
+        created = []
+
+        def create():
+            time.sleep(0.1)
+            os.mkdir(os.path.join(self.temp_dir, 'subdir'))
+            time.sleep(0.1)
+            created.append(self._write('subdir', 'new.SAC'))
+            self._write('subdir', 'new.txt')
+
+        thread = threading.Thread(target=create)
+        thread.start()
+        paths = list(watcher.watch(timeout=1))
+        thread.join()
+        self.assertEqual(paths, [existing_path] + created)
+        # Nothing is reported twice:
+        self.assertEqual(list(watcher.watch(timeout=0.3)), [])
+
+    def test_watch_names(self):
+        store_path = os.path.join(self.temp_dir, 'known_files.txt')
+        watcher = DirectoryWatcher([self.temp_dir], [r'.*\.SAC$'],
+                                   settle_time=0.1,
+                                   known_files=KnownFiles(store_path))
+        created = []
+
+        def create():
+            time.sleep(0.1)
+            for name in ('caf\xc3\xa9.SAC', 'invalid\xff.SAC'):
+                created.append(self._write(name))
+
+        thread = threading.Thread(target=create)
+        thread.start()
+        paths = list(watcher.watch(timeout=0.5))
+        thread.join()
+        self.assertEqual(paths, sorted(created))
+        self.assertEqual(list(KnownFiles(store_path)), sorted(created))
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
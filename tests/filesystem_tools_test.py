@@ -2,10 +2,15 @@ import unittest
 
 
 import bz2
+import gzip
 import mock
+import numpy as np
 import os
 import platform
 import shutil
+import struct
+import tempfile
+import zipfile
 
 import flightdatautilities.filesystem_tools as fst
 
@@ -119,6 +124,339 @@ class TestFilesystemTools(unittest.TestCase):
         self.assertTrue(fst.is_file_bzipped(test_file_path))
 
 
+class TestMimeType(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, content):
+        file_path = os.path.join(self.temp_dir, name)
+        with open(file_path, 'wb') as file_obj:
+            file_obj.write(content)
+        return file_path
+
+    def test_sniff_mime_type(self):
+        bz2_path = os.path.join(self.temp_dir, 'data.bz2')
+        bz2_file = bz2.BZ2File(bz2_path, 'wb')
+        bz2_file.write('content')
+        bz2_file.close()
+        self.assertEqual(fst.sniff_mime_type(bz2_path), 'application/x-bzip2')
+        gzip_path = os.path.join(self.temp_dir, 'data.gz')
+        gzip_file = gzip.GzipFile(gzip_path, 'wb')
+        gzip_file.write('content')
+        gzip_file.close()
+        self.assertEqual(fst.sniff_mime_type(gzip_path), 'application/x-gzip')
+        sac_path = os.path.join(self.temp_dir, 'data.SAC')
+        archive = zipfile.ZipFile(sac_path, 'w')
+        archive.writestr('data', 'content')
+        archive.close()
+        self.assertEqual(fst.sniff_mime_type(sac_path), 'application/zip')
+        hdf_path = self._write('data.hdf5', fst.HDF5_SIGNATURE + '\x00' * 8)
+        self.assertEqual(fst.sniff_mime_type(hdf_path), 'application/x-hdf')
+        hdf_path = self._write('user_block.hdf5',
+                               '\x00' * 512 + fst.HDF5_SIGNATURE)
+        self.assertEqual(fst.sniff_mime_type(hdf_path), 'application/x-hdf')
+        blosc_path = self._write('data.blosc', struct.pack(
+            '<4B3I', 2, 1, 1, 8, 64, 64, 32) + '\x00' * 16)
+        self.assertEqual(fst.sniff_mime_type(blosc_path), fst.BLOSC_MIME_TYPE)
+        text_path = self._write('data.txt', 'Plain text.\n' * 10)
+        self.assertEqual(fst.sniff_mime_type(text_path), None)
+
+    def test_sniff_mime_type_byte_aligned(self):
+        for wps, pattern in ((256, (0x0247, 0x05B8, 0x0A47, 0x0DB8)),
+                             (2048, (0x0E24, 0x01DA, 0x0E25, 0x01DB))):
+            words = np.zeros(fst.MAGIC_READ_SIZE // 2, dtype=np.short)
+            for second in range(len(words) // wps):
+                words[second * wps + 3] = pattern[second % 4] | 0x7000
+            raw_path = self._write('data.raw', words.tostring())
+            self.assertEqual(fst.sniff_mime_type(raw_path),
+                             fst.BYTE_ALIGNED_MIME_TYPE)
+        # Too short to contain a frame at every supported wps:
+        raw_path = self._write('short.raw', words[:4096].tostring())
+        self.assertEqual(fst.sniff_mime_type(raw_path), None)
+        zeros_path = self._write('zeros.raw', '\x00' * 8192)
+        self.assertEqual(fst.sniff_mime_type(zeros_path), None)
+        # Sync words too near the end of the header to be a whole frame:
+        words = np.zeros(fst.MAGIC_READ_SIZE // 2, dtype=np.short)
+        words[13000] = 0x0247
+        words[15048] = 0x05B8
+        raw_path = self._write('partial.raw', words.tostring())
+        self.assertEqual(fst.sniff_mime_type(raw_path), None)
+        self.assertEqual(fst.mime_type(raw_path, sniff=True),
+                         fst.mime_type(raw_path))
+
+    def test_mime_types(self):
+        hdf_path = self._write('data.hdf5', fst.HDF5_SIGNATURE)
+        text_path = self._write('data.txt', 'Plain text.\n')
+        self.assertEqual(fst.mime_types([hdf_path, text_path], fallback=False),
+                         {hdf_path: 'application/x-hdf', text_path: None})
+        with mock.patch.object(fst, 'mime_type') as mime_type:
+            mime_type.return_value = 'text/plain'
+            self.assertEqual(fst.mime_types([hdf_path, text_path]),
+                             {hdf_path: 'application/x-hdf',
+                              text_path: 'text/plain'})
+            mime_type.assert_called_once_with(text_path, sniff=False)
+        # A missing file does not fail the other files:
+        missing_path = os.path.join(self.temp_dir, 'missing.hdf5')
+        self.assertEqual(fst.mime_types([missing_path, hdf_path],
+                                        fallback=False),
+                         {missing_path: None, hdf_path: 'application/x-hdf'})
+
+
+class TestScanFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_paths = []
+        self.dir_paths = []
+        for dir_names in (('a',), ('a', 'b'), ('a', 'b', 'c'), ('d',)):
+            dir_path = os.path.join(self.temp_dir, *dir_names)
+            os.mkdir(dir_path)
+            self.dir_paths.append(dir_path)
+            for name in ('data.hdf5', 'data.txt'):
+                file_path = os.path.join(dir_path, name)
+                open(file_path, 'w').close()
+                self.file_paths.append(file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_files(self):
+        for workers in (1, 4):
+            paths = [e.path for e in fst.scan_files(self.temp_dir,
+                                                    workers=workers)]
+            self.assertItemsEqual(paths, self.file_paths)
+            paths = [e.path for e in fst.scan_files(
+                self.temp_dir, regexes=[r'.*\.hdf5$'], workers=workers)]
+            self.assertItemsEqual(
+                paths, [p for p in self.file_paths if p.endswith('.hdf5')])
+
+    def test_scan_files_min_age(self):
+        old_path = self.file_paths[0]
+        os.utime(old_path, (0, 0))
+        paths = [e.path for e in fst.scan_files(self.temp_dir, min_age=60)]
+        self.assertEqual(paths, [old_path])
+
+    def test_scan_files_stop_early(self):
+        files = fst.scan_files(self.temp_dir)
+        next(files)
+        files.close()
+
+    def test_scan_subdirs(self):
+        for workers in (1, 4):
+            paths = [e.path for e in fst.scan_subdirs(self.temp_dir,
+                                                      workers=workers)]
+            self.assertItemsEqual(paths, self.dir_paths)
+
+    def test_scan_files_error(self):
+        # Unexpected errors in workers are raised rather than hanging:
+        with mock.patch.object(fst, '_scan_directory',
+                               side_effect=ValueError('scan failed')):
+            for workers in (1, 4):
+                self.assertRaises(ValueError, list,
+                                  fst.scan_files(self.temp_dir,
+                                                 workers=workers))
+
+    def test_dir_path(self):
+        self.assertEqual(fst.dir_path(self.temp_dir), sorted(self.file_paths))
+        self.assertEqual(fst.subdir_paths(self.temp_dir),
+                         sorted(self.dir_paths))
+
+
+class TestCopyFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content = os.urandom(100000)
+        self.orig_paths = []
+        for name in ('a.hdf5', 'b.hdf5', 'c.hdf5'):
+            orig_path = os.path.join(self.temp_dir, name)
+            with open(orig_path, 'wb') as file_obj:
+                file_obj.write(name + self.content)
+            self.orig_paths.append(orig_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _read(self, file_path):
+        with open(file_path, 'rb') as file_obj:
+            return file_obj.read()
+
+    def test_copy_file(self):
+        orig_path = self.orig_paths[0]
+        copy_path = fst.copy_file(orig_path)
+        self.assertEqual(copy_path, os.path.join(self.temp_dir, 'a_copy.hdf5'))
+        self.assertEqual(self._read(copy_path), self._read(orig_path))
+        # Existing copies are replaced.
+        with open(orig_path, 'wb') as file_obj:
+            file_obj.write('replaced')
+        self.assertEqual(fst.copy_file(orig_path), copy_path)
+        self.assertEqual(self._read(copy_path), 'replaced')
+        dest_dir = os.path.join(self.temp_dir, 'dest', 'dir')
+        copy_path = fst.copy_file(orig_path, dest_dir=dest_dir, postfix='')
+        self.assertEqual(copy_path, os.path.join(dest_dir, 'a.hdf5'))
+        self.assertEqual(self._read(copy_path), 'replaced')
+        # No temporary files are left behind.
+        self.assertEqual(os.listdir(dest_dir), ['a.hdf5'])
+
+    def test_copy_file_fallback(self):
+        orig_path = self.orig_paths[0]
+        unsupported = OSError(fst.errno.ENOSYS, 'Not supported')
+        with mock.patch.object(fst, 'fcntl', None), \
+                mock.patch.object(fst, '_copy_file_range',
+                                  side_effect=unsupported), \
+                mock.patch.object(fst, '_sendfile', side_effect=unsupported):
+            copy_path = fst.copy_file(orig_path)
+        self.assertEqual(self._read(copy_path), self._read(orig_path))
+
+    def test_copy_file_error(self):
+        error = OSError(fst.errno.ENOSPC, 'No space left on device')
+        with mock.patch.object(fst, '_copy_file_contents', side_effect=error):
+            self.assertRaises(OSError, fst.copy_file, self.orig_paths[0])
+        self.assertItemsEqual(os.listdir(self.temp_dir),
+                              ['a.hdf5', 'b.hdf5', 'c.hdf5'])
+
+    def test_copy_files(self):
+        dest_dir = os.path.join(self.temp_dir, 'dest')
+        copy_paths = fst.copy_files(self.orig_paths, dest_dir=dest_dir)
+        self.assertEqual(copy_paths, [os.path.join(dest_dir, name) for name in
+                                      ('a_copy.hdf5', 'b_copy.hdf5',
+                                       'c_copy.hdf5')])
+        for orig_path, copy_path in zip(self.orig_paths, copy_paths):
+            self.assertEqual(self._read(copy_path), self._read(orig_path))
+
+
+class TestZipCompressFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_paths = []
+        for index in range(5):
+            file_path = os.path.join(self.temp_dir, 'export%d.csv' % index)
+            with open(file_path, 'wb') as file_obj:
+                file_obj.write('%d,flight,data\n' % index * 10000)
+            self.file_paths.append(file_path)
+        self.bz2_path = os.path.join(self.temp_dir, 'export.bz2')
+        with open(self.bz2_path, 'wb') as file_obj:
+            file_obj.write(bz2.compress('flight data'))
+        self.file_paths.append(self.bz2_path)
+        self.archive_path = os.path.join(self.temp_dir, 'exports.zip')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _check_archive(self, compress_types):
+        archive = zipfile.ZipFile(self.archive_path)
+        self.assertEqual(archive.testzip(), None)
+        infos = archive.infolist()
+        self.assertEqual([i.filename for i in infos],
+                         [os.path.basename(p) for p in self.file_paths])
+        self.assertEqual([i.compress_type for i in infos], compress_types)
+        for info, file_path in zip(infos, self.file_paths):
+            with open(file_path, 'rb') as file_obj:
+                self.assertEqual(archive.read(info), file_obj.read())
+        archive.close()
+
+    def test_zip_compress_files(self):
+        deflated = [zipfile.ZIP_DEFLATED] * 5 + [zipfile.ZIP_STORED]
+        for workers in (1, 3):
+            self.assertEqual(
+                fst.zip_compress_files(self.file_paths, self.archive_path,
+                                       workers=workers),
+                self.archive_path)
+            self._check_archive(deflated)
+        fst.zip_compress_files(self.file_paths, self.archive_path, workers=3,
+                               store_compressed=False)
+        self._check_archive([zipfile.ZIP_DEFLATED] * 6)
+        fst.zip_compress_files(self.file_paths, self.archive_path,
+                               compression=zipfile.ZIP_STORED, workers=3)
+        self._check_archive([zipfile.ZIP_STORED] * 6)
+
+    def test_zip_compress_files_sniffing(self):
+        # Only the headers of members are examined:
+        with mock.patch.object(fst, 'sniff_mime_type') as sniff_mime_type:
+            fst.zip_compress_files(self.file_paths, self.archive_path)
+            self.assertFalse(sniff_mime_type.called)
+        self._check_archive([zipfile.ZIP_DEFLATED] * 5 + [zipfile.ZIP_STORED])
+        self.assertFalse(fst._is_compressed(self.file_paths[0]))
+        self.assertTrue(fst._is_compressed(self.bz2_path))
+
+    def test_zip_compress_files_serial_fallback(self):
+        # Without the ZipFile internals, members are deflated serially:
+        with mock.patch.object(fst, 'ZIPFILE_INTERNALS', ('_missing',)), \
+                mock.patch.object(fst, '_write_deflated_member') as write:
+            fst.zip_compress_files(self.file_paths, self.archive_path,
+                                   workers=3)
+            self.assertFalse(write.called)
+        self._check_archive([zipfile.ZIP_DEFLATED] * 5 + [zipfile.ZIP_STORED])
+
+    def test_zip_compress_files_deflate_ahead(self):
+        # Members are only deflated a few at a time ahead of the writer:
+        file_paths = self.file_paths[:1] * 20
+        deflate_member = fst._deflate_member
+        write_deflated_member = fst._write_deflated_member
+        deflated = []
+        written = []
+
+        def deflate(file_path):
+            deflated.append(file_path)
+            return deflate_member(file_path)
+
+        def write(archive, zinfo, member):
+            written.append(len(deflated))
+            write_deflated_member(archive, zinfo, member)
+
+        with mock.patch.object(fst, '_deflate_member', deflate), \
+                mock.patch.object(fst, '_write_deflated_member', write):
+            fst.zip_compress_files(file_paths, self.archive_path, workers=2,
+                                   arcnames=map(str, range(20)))
+        self.assertEqual(len(written), 20)
+        for index, count in enumerate(written):
+            self.assertLessEqual(count, index + 2 * fst.ZIP_DEFLATE_AHEAD)
+        archive = zipfile.ZipFile(self.archive_path)
+        self.assertEqual(archive.testzip(), None)
+        self.assertEqual(len(archive.namelist()), 20)
+        archive.close()
+
+    def test_write_deflated_member(self):
+        # Mix members written by ZipFile and deflated members, including an
+        # empty one, and append to the archive once closed:
+        empty_path = os.path.join(self.temp_dir, 'empty.csv')
+        open(empty_path, 'wb').close()
+        archive = zipfile.ZipFile(self.archive_path, 'w',
+                                  zipfile.ZIP_DEFLATED)
+        self.assertTrue(fst._parallel_deflate_supported(archive))
+        archive.write(self.file_paths[0], 'a.csv')
+        for file_path, arcname in ((self.file_paths[1], 'b.csv'),
+                                   (empty_path, 'empty.csv')):
+            zinfo = fst._zip_info(file_path, arcname, zipfile.ZIP_DEFLATED)
+            fst._write_deflated_member(archive, zinfo,
+                                       fst._deflate_member(file_path))
+        archive.close()
+        archive = zipfile.ZipFile(self.archive_path, 'a')
+        archive.write(self.file_paths[2], 'c.csv')
+        archive.close()
+        archive = zipfile.ZipFile(self.archive_path)
+        self.assertEqual(archive.testzip(), None)
+        self.assertEqual(archive.namelist(),
+                         ['a.csv', 'b.csv', 'empty.csv', 'c.csv'])
+        for arcname, file_path in (('a.csv', self.file_paths[0]),
+                                   ('b.csv', self.file_paths[1]),
+                                   ('empty.csv', empty_path),
+                                   ('c.csv', self.file_paths[2])):
+            with open(file_path, 'rb') as file_obj:
+                self.assertEqual(archive.read(arcname), file_obj.read())
+        archive.close()
+
+    def test_zip_compress_files_arcnames(self):
+        arcnames = ['flights/%s' % os.path.basename(p)
+                    for p in self.file_paths]
+        fst.zip_compress_files(self.file_paths, self.archive_path,
+                               arcnames=arcnames, workers=2)
+        archive = zipfile.ZipFile(self.archive_path)
+        self.assertEqual(archive.namelist(), arcnames)
+        archive.close()
+
+
 if __name__ == '__main__':
     TestFilesystemTools('test_remove_all_with_ignore').run()
     print "Finished all tests"
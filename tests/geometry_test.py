@@ -9,6 +9,7 @@
 
 
 import logging
+import numpy as np
 import unittest
 
 from flightdatautilities import geometry
@@ -62,6 +63,15 @@ class TestMidpoint(unittest.TestCase):
             self.assertAlmostEqual(midpoint[0], expected[0])
             self.assertAlmostEqual(midpoint[1], expected[1])
 
+    def test_midpoint_array(self):
+        '''
+        '''
+        arguments = np.array([a + b for a, b in self.arguments]).T
+        lat, lon = geometry.midpoint_array(*arguments)
+        expected_lat, expected_lon = np.array(self.expected).T
+        np.testing.assert_array_almost_equal(lat, expected_lat)
+        np.testing.assert_array_almost_equal(lon, expected_lon)
+
 
 class TestCrossTrackDistance(unittest.TestCase):
     '''
@@ -110,6 +120,13 @@ class TestCrossTrackDistance(unittest.TestCase):
             dxt = geometry.cross_track_distance(*(a + b + c))
             self.assertAlmostEqual(dxt, expected)
 
+    def test_cross_track_distance_array(self):
+        '''
+        '''
+        arguments = np.array([a + b + c for a, b, c in self.arguments]).T
+        dxt = geometry.cross_track_distance_array(*arguments)
+        np.testing.assert_array_almost_equal(dxt, self.expected)
+
 
 class TestAlongTrackDistance(unittest.TestCase):
     '''
@@ -158,6 +175,13 @@ class TestAlongTrackDistance(unittest.TestCase):
             dat = geometry.along_track_distance(*(a + b + c))
             self.assertAlmostEqual(dat, expected)
 
+    def test_along_track_distance_array(self):
+        '''
+        '''
+        arguments = np.array([a + b + c for a, b, c in self.arguments]).T
+        dat = geometry.along_track_distance_array(*arguments)
+        np.testing.assert_array_almost_equal(dat, self.expected)
+
 
 class TestGreatCircleDistanceHaversine(unittest.TestCase):
     '''
@@ -190,6 +214,25 @@ class TestGreatCircleDistanceHaversine(unittest.TestCase):
             distance = geometry.great_circle_distance__haversine(*(a + b))
             self.assertAlmostEqual(distance, expected)
 
+    def test_great_circle_distance__haversine_array(self):
+        '''
+        '''
+        arguments = np.array([a + b for a, b in self.arguments]).T
+        distance = geometry.great_circle_distance__haversine_array(*arguments)
+        np.testing.assert_array_almost_equal(distance, self.expected)
+
+    def test_great_circle_distance__haversine_array_broadcast(self):
+        '''
+        Distances from one point to many, keeping the mask of the inputs.
+        '''
+        lat = np.ma.array([55.95, 51.47, 0], mask=[False, False, True])
+        lon = np.ma.array([-3.3725, -0.4613, 0])
+        distance = geometry.great_circle_distance__haversine_array(
+            51.47, -0.4613, lat, lon)
+        self.assertAlmostEqual(distance[0], self.expected[3])
+        self.assertEqual(distance[1], 0)
+        self.assertEqual(distance.mask.tolist(), [False, False, True])
+
 
 class TestInitialBearing(unittest.TestCase):
     '''
@@ -222,6 +265,322 @@ class TestInitialBearing(unittest.TestCase):
             bearing = geometry.initial_bearing(*(a + b))
             self.assertAlmostEqual(bearing, expected)
 
+    def test_initial_bearing_array(self):
+        '''
+        '''
+        arguments = np.array([a + b for a, b in self.arguments]).T
+        bearing = geometry.initial_bearing_array(*arguments)
+        np.testing.assert_array_almost_equal(bearing, self.expected)
+        self.assertFalse(np.ma.isMaskedArray(bearing))
+
+
+class TestSpatialIndex(unittest.TestCase):
+    '''
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+        self.lats = np.degrees(np.arcsin(random.uniform(-1, 1, 500)))
+        self.lons = random.uniform(-180, 180, 500)
+        self.index = geometry.SpatialIndex(self.lats, self.lons)
+
+    def brute_force(self, lat, lon):
+        return geometry.great_circle_distance__haversine_array(
+            lat, lon, self.lats, self.lons)
+
+    def test_nearest(self):
+        '''
+        '''
+        self.assertEqual(len(self.index), 500)
+        distances, indices = self.index.nearest(51.47, -0.4613, k=3)
+        expected = self.brute_force(51.47, -0.4613)
+        self.assertEqual(indices.tolist(), np.argsort(expected)[:3].tolist())
+        np.testing.assert_array_almost_equal(distances,
+                                             np.sort(expected)[:3])
+        distances, indices = self.index.nearest(self.lats[7], self.lons[7])
+        self.assertEqual(indices.tolist(), [7])
+        self.assertAlmostEqual(distances[0], 0)
+
+    def test_nearest_batch(self):
+        '''
+        '''
+        lats = np.array([51.47, 55.95, -33.9])
+        lons = np.array([-0.4613, -3.3725, 151.2])
+        distances, indices = self.index.nearest(lats, lons, k=2)
+        self.assertEqual(indices.shape, (3, 2))
+        for lat, lon, row in zip(lats, lons, indices):
+            expected = self.brute_force(lat, lon)
+            self.assertEqual(row.tolist(), np.argsort(expected)[:2].tolist())
+        distances, indices = self.index.nearest(lats, lons, k=1000)
+        self.assertEqual(indices.shape, (3, 500))
+
+    def test_within(self):
+        '''
+        '''
+        expected = self.brute_force(51.47, -0.4613)
+        indices = self.index.within(51.47, -0.4613, 2000)
+        self.assertEqual(indices.tolist(),
+                         [i for i in np.argsort(expected, kind='mergesort')
+                          if expected[i] <= 2000])
+        self.assertEqual(len(self.index.within(51.47, -0.4613, 30000)), 500)
+        results = self.index.within([51.47, 0], [-0.4613, 0], 1500)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].tolist(),
+                         self.index.within(51.47, -0.4613, 1500).tolist())
+
+    def test_mismatched_points(self):
+        '''
+        '''
+        self.assertRaises(ValueError, geometry.SpatialIndex, [0, 1], [0])
+
+
+class TestTrackDistance(unittest.TestCase):
+    '''
+    '''
+
+    def test_track_distance(self):
+        '''
+        '''
+        lat = np.array([51.47, 53.71879636048774, 55.95])
+        lon = np.array([-0.4613, -1.8393457044657056, -3.3725])
+        distance = geometry.track_distance(lat, lon)
+        np.testing.assert_array_almost_equal(
+            distance, [0, 267.10136270860215, 534.2027254172123])
+
+    def test_track_distance_masked(self):
+        '''
+        Distance across masked samples is measured between the valid
+        samples either side.
+        '''
+        lat = np.ma.array([0, 51.47, 10, 55.95], mask=[1, 0, 0, 0])
+        lon = np.ma.array([0, -0.4613, 10, -3.3725], mask=[0, 0, 1, 0])
+        distance = geometry.track_distance(lat, lon)
+        self.assertEqual(distance.mask.tolist(), [True, False, True, False])
+        self.assertEqual(distance[1], 0)
+        self.assertAlmostEqual(distance[3], 534.2027254172123)
+        self.assertTrue(geometry.track_distance(
+            np.ma.masked_all(3), np.zeros(3)).mask.all())
+
+
+class TestSegmentBearings(unittest.TestCase):
+    '''
+    '''
+
+    def test_segment_bearings(self):
+        '''
+        '''
+        lat = np.ma.array([51.47, 0, 55.95, 51.47], mask=[0, 1, 0, 0])
+        lon = np.ma.array([-0.4613, 0, -3.3725, -0.4613])
+        bearings = geometry.segment_bearings(lat, lon)
+        self.assertEqual(bearings.mask.tolist(), [False, True, False, True])
+        self.assertAlmostEqual(bearings[0], 340.1279082634598)
+        self.assertAlmostEqual(bearings[2], 157.77941819114176)
+
+
+class TestTrackProfile(unittest.TestCase):
+    '''
+    '''
+
+    def test_track_profile(self):
+        '''
+        '''
+        path = TestAlongTrackDistance.arguments[7][:2]
+        path = path[0] + path[1]
+        lat = np.ma.array([53.71879636048774, 52.71879636048774,
+                           54.71879636048774, 0])
+        lon = np.ma.array([-1.8393457044657056, -0.8393457044657056,
+                           -2.8393457044657056, 0])
+        lat[3] = np.ma.masked
+        along, cross = geometry.track_profile(lat, lon, *path)
+        np.testing.assert_array_almost_equal(
+            along[:3], [267.10136270860215, 139.4652872386661,
+                        394.4816889981521])
+        np.testing.assert_array_almost_equal(
+            cross[:3], [0, 23.299595295998408, -20.043304061868042])
+        self.assertEqual(along.mask.tolist(), [False] * 3 + [True])
+
+    def test_track_profile_behind(self):
+        '''
+        Along-track distances are negative behind the start of the path.
+        '''
+        along, cross = geometry.track_profile(
+            np.array([-1.0, 1.0]), np.array([0.0, 0.0]), 0, 0, 1, 0)
+        self.assertAlmostEqual(along[0], -along[1])
+        self.assertLess(along[0], 0)
+        np.testing.assert_array_almost_equal(cross, [0, 0])
+
+
+class TestVincenty(unittest.TestCase):
+    '''
+    Vincenty's example of Flinders Peak to Buninyong.
+    '''
+
+    flinders_peak = (-37.95103341666667, 144.42486788888889)
+    buninyong = (-37.65282113888889, 143.92649552777777)
+    distance = 54.972271
+    initial_bearing = 306.8681583333333
+    final_bearing = 307.1736305555556
+
+    def test_vincenty_inverse_array(self):
+        '''
+        '''
+        distance, initial, final = geometry.vincenty_inverse_array(
+            *(self.flinders_peak + self.buninyong))
+        self.assertAlmostEqual(distance, self.distance, places=6)
+        self.assertAlmostEqual(initial, self.initial_bearing, places=5)
+        self.assertAlmostEqual(final, self.final_bearing, places=5)
+
+    def test_vincenty_inverse_array_masked(self):
+        '''
+        Masked inputs, coincident and nearly antipodal points.
+        '''
+        lat = np.ma.array([self.buninyong[0], 0, 0, 0.5],
+                          mask=[False, True, False, False])
+        lon = np.ma.array([self.buninyong[1], 0, 0, 179.7])
+        distance, initial, final = geometry.vincenty_inverse_array(
+            self.flinders_peak[0] * np.array([1, 1, 0, 0]),
+            self.flinders_peak[1] * np.array([1, 1, 0, 0]), lat, lon)
+        self.assertAlmostEqual(distance[0], self.distance, places=6)
+        self.assertEqual(distance[2], 0)
+        self.assertEqual(distance.mask.tolist(), [False, True, False, True])
+
+    def test_vincenty_direct_array(self):
+        '''
+        '''
+        lat, lon, final = geometry.vincenty_direct_array(
+            self.flinders_peak[0], self.flinders_peak[1],
+            [self.initial_bearing, 0], [self.distance, 0])
+        self.assertAlmostEqual(lat[0], self.buninyong[0], places=7)
+        self.assertAlmostEqual(lon[0], self.buninyong[1], places=7)
+        self.assertAlmostEqual(final[0], self.final_bearing, places=5)
+        self.assertAlmostEqual(lat[1], self.flinders_peak[0])
+        self.assertAlmostEqual(lon[1], self.flinders_peak[1])
+
+    def test_vincenty_reference(self):
+        '''
+        '''
+        reference = geometry.VincentyReference(*self.flinders_peak)
+        lat = np.array([self.buninyong[0], self.flinders_peak[0], 51.47])
+        lon = np.array([self.buninyong[1], self.flinders_peak[1], -0.4613])
+        expected = geometry.vincenty_inverse_array(
+            self.flinders_peak[0], self.flinders_peak[1], lat, lon)
+        for result, expected in zip(reference.inverse(lat, lon), expected):
+            np.testing.assert_array_almost_equal(result, expected)
+        lat, lon, final = reference.direct(self.initial_bearing,
+                                           self.distance)
+        self.assertAlmostEqual(lat, self.buninyong[0], places=7)
+        self.assertAlmostEqual(lon, self.buninyong[1], places=7)
+
+
+class TestFenceCrossings(unittest.TestCase):
+    '''
+    '''
+
+    def test_fence_crossings(self):
+        '''
+        '''
+        entries, exits = geometry.fence_crossings(
+            [False, True, True, False, False, True])
+        self.assertEqual(entries.tolist(), [1, 5])
+        self.assertEqual(exits.tolist(), [3])
+        entries, exits = geometry.fence_crossings([True, True, False])
+        self.assertEqual(entries.tolist(), [0])
+        self.assertEqual(exits.tolist(), [2])
+        entries, exits = geometry.fence_crossings([])
+        self.assertEqual((entries.tolist(), exits.tolist()), ([], []))
+
+    def test_fence_crossings_masked(self):
+        '''
+        Gaps in the track do not create crossings.
+        '''
+        inside = np.ma.array([False, True, True, False, True, True],
+                             mask=[0, 0, 0, 1, 0, 0])
+        entries, exits = geometry.fence_crossings(inside)
+        self.assertEqual((entries.tolist(), exits.tolist()), ([1], []))
+        # Crossings during a gap are at the first sample after it:
+        inside = np.ma.array([True, False, False, False, True],
+                             mask=[1, 0, 1, 1, 0])
+        entries, exits = geometry.fence_crossings(inside)
+        self.assertEqual((entries.tolist(), exits.tolist()), ([4], []))
+        inside = np.ma.array([True, True, False], mask=[1, 1, 1])
+        entries, exits = geometry.fence_crossings(inside)
+        self.assertEqual((entries.tolist(), exits.tolist()), ([], []))
+
+
+class TestPolygon(unittest.TestCase):
+    '''
+    '''
+
+    def test_contains(self):
+        '''
+        A concave polygon around London Heathrow.
+        '''
+        polygon = geometry.Polygon([51.4, 51.4, 51.5, 51.5, 51.45, 51.45],
+                                   [-0.6, -0.3, -0.3, -0.45, -0.45, -0.6])
+        lat = np.ma.array([51.47, 51.42, 51.48, 51.42, 51.6, 51.42],
+                          mask=[0, 0, 0, 0, 0, 1])
+        lon = np.ma.array([-0.4, -0.5, -0.5, -0.7, -0.4, -0.4])
+        inside = polygon.contains(lat, lon)
+        self.assertEqual(inside.tolist(),
+                         [True, True, False, False, False, None])
+        self.assertEqual(inside.data.tolist(),
+                         [True, True, False, False, False, False])
+        inside = polygon.contains(lat.data, lon.data)
+        self.assertFalse(np.ma.isMaskedArray(inside))
+        self.assertIs(polygon.contains(51.47, -0.4), True)
+        self.assertIs(polygon.contains(51.6, -0.4), False)
+
+    def test_antimeridian(self):
+        '''
+        '''
+        polygon = geometry.Polygon([-1, -1, 1, 1], [179, -179, -179, 179])
+        inside = polygon.contains([0, 0, 0, 0], [179.5, -179.5, 180, 0])
+        self.assertEqual(inside.tolist(), [True, True, True, False])
+
+    def test_crossings(self):
+        '''
+        '''
+        polygon = geometry.Polygon([0, 0, 1, 1], [0, 1, 1, 0])
+        lon = np.linspace(-1, 2, 7)
+        inside, entries, exits = polygon.crossings(np.full(7, 0.5), lon)
+        self.assertEqual(inside.tolist(),
+                         [False, False, True, True, False, False, False])
+        self.assertEqual((entries.tolist(), exits.tolist()), ([2], [4]))
+        # A gap inside the polygon:
+        lat = np.ma.array(np.full(7, 0.5), mask=[0, 0, 0, 1, 0, 0, 0])
+        lon = np.linspace(-1, 2, 7) * 0.5 + 0.25
+        inside, entries, exits = polygon.crossings(lat, lon)
+        self.assertEqual(inside.tolist(),
+                         [False, True, True, None, True, False, False])
+        self.assertEqual((entries.tolist(), exits.tolist()), ([1], [5]))
+
+    def test_invalid(self):
+        '''
+        '''
+        self.assertRaises(ValueError, geometry.Polygon, [0, 1], [0, 1])
+
+
+class TestCircle(unittest.TestCase):
+    '''
+    '''
+
+    def test_contains(self):
+        '''
+        '''
+        circle = geometry.Circle(51.47, -0.4613, 535)
+        inside = circle.contains([55.95, 51.47, 33.9425, 56.0],
+                                 [-3.3725, -0.4613, -118.408056, -3.5])
+        self.assertEqual(inside.tolist(), [True, True, False, False])
+        self.assertIs(circle.contains(55.95, -3.3725), True)
+
+    def test_pole(self):
+        '''
+        Circles containing a pole span all longitudes.
+        '''
+        circle = geometry.Circle(89, 0, 300)
+        inside = circle.contains([89.5, 89.5, 85], [180, 90, 0])
+        self.assertEqual(inside.tolist(), [True, True, False])
+
 
 ##############################################################################
 # vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
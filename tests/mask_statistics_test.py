@@ -0,0 +1,70 @@
+import numpy as np
+import unittest
+
+from flightdatautilities.mask_statistics import (
+    mask_runs,
+    mask_statistics,
+    masked_count,
+)
+
+
+class TestMaskedCount(unittest.TestCase):
+    def test_masked_count(self):
+        self.assertEqual(masked_count(np.ma.nomask), 0)
+        self.assertEqual(masked_count(True), 1)
+        self.assertEqual(masked_count(np.bool_(False)), 0)
+        self.assertEqual(masked_count(np.array([1, 0, 1, 1], dtype=bool)), 3)
+
+
+class TestMaskRuns(unittest.TestCase):
+    def test_mask_runs(self):
+        mask = np.array([0, 0, 1, 1, 1, 0, 1, 0, 0, 0], dtype=bool)
+        masked_runs, unmasked_runs = mask_runs(mask)
+        self.assertEqual(masked_runs.tolist(), [3, 1])
+        self.assertEqual(unmasked_runs.tolist(), [2, 1, 3])
+        masked_runs, unmasked_runs = mask_runs(~mask)
+        self.assertEqual(masked_runs.tolist(), [2, 1, 3])
+        self.assertEqual(unmasked_runs.tolist(), [3, 1])
+
+    def test_mask_runs_uniform(self):
+        masked_runs, unmasked_runs = mask_runs(np.ones(5, dtype=bool))
+        self.assertEqual(masked_runs.tolist(), [5])
+        self.assertEqual(unmasked_runs.tolist(), [])
+        masked_runs, unmasked_runs = mask_runs(np.zeros(0, dtype=bool))
+        self.assertEqual(masked_runs.tolist(), [])
+        self.assertEqual(unmasked_runs.tolist(), [])
+
+    def test_mask_runs_scalar(self):
+        masked_runs, unmasked_runs = mask_runs(np.ma.nomask)
+        self.assertEqual(masked_runs.tolist(), [])
+        self.assertEqual(unmasked_runs.tolist(), [1])
+        masked_runs, unmasked_runs = mask_runs(True)
+        self.assertEqual(masked_runs.tolist(), [1])
+        self.assertEqual(unmasked_runs.tolist(), [])
+
+
+class TestMaskStatistics(unittest.TestCase):
+    def test_mask_statistics(self):
+        array = np.ma.arange(10)
+        array[3:5] = np.ma.masked
+        statistics = mask_statistics(np.ma.getmaskarray(array))
+        self.assertEqual(statistics.size, 10)
+        self.assertEqual(statistics.masked, 2)
+        self.assertEqual(statistics.ratio, 0.2)
+        self.assertEqual(statistics.masked_runs.tolist(), [2])
+        self.assertEqual(statistics.unmasked_runs.tolist(), [3, 5])
+
+    def test_mask_statistics_scalar(self):
+        statistics = mask_statistics(np.ma.nomask, size=4)
+        self.assertEqual(statistics.size, 4)
+        self.assertEqual(statistics.masked, 0)
+        self.assertEqual(statistics.ratio, 0)
+        self.assertEqual(statistics.unmasked_runs.tolist(), [4])
+        statistics = mask_statistics(True)
+        self.assertEqual(statistics.size, 1)
+        self.assertEqual(statistics.ratio, 1)
+
+    def test_mask_statistics_empty(self):
+        statistics = mask_statistics(np.zeros(0, dtype=bool))
+        self.assertEqual(statistics.size, 0)
+        self.assertEqual(statistics.ratio, 1)
@@ -0,0 +1,63 @@
+import numpy as np
+import unittest
+
+from flightdatautilities.packed_mask import PackedMask
+
+
+class TestPackedMask(unittest.TestCase):
+    def setUp(self):
+        self.mask_a = np.array([0, 1, 1, 0, 0, 0, 1, 0, 1, 1, 0], dtype=bool)
+        self.mask_b = np.array([1, 1, 0, 0, 0, 1, 0, 0, 0, 1, 1], dtype=bool)
+
+    def test_round_trip(self):
+        packed = PackedMask.from_mask(self.mask_a)
+        self.assertEqual(len(packed), 11)
+        self.assertEqual(packed.nbytes, 2)
+        self.assertEqual(packed.to_mask().tolist(), self.mask_a.tolist())
+        self.assertEqual(packed.count(), 5)
+        self.assertEqual(packed.to_mask().dtype, np.bool_)
+
+    def test_from_scalar_mask(self):
+        self.assertRaises(ValueError, PackedMask.from_mask, np.ma.nomask)
+        packed = PackedMask.from_mask(np.ma.nomask, size=10)
+        self.assertFalse(packed.any())
+        self.assertEqual(packed.to_mask().tolist(), [False] * 10)
+        packed = PackedMask.from_mask(True, size=10)
+        self.assertTrue(packed.all())
+        self.assertEqual(packed.count(), 10)
+
+    def test_operators(self):
+        a = PackedMask.from_mask(self.mask_a)
+        b = PackedMask.from_mask(self.mask_b)
+        self.assertEqual((a | b).to_mask().tolist(),
+                         (self.mask_a | self.mask_b).tolist())
+        self.assertEqual((a & b).to_mask().tolist(),
+                         (self.mask_a & self.mask_b).tolist())
+        self.assertEqual((a ^ b).to_mask().tolist(),
+                         (self.mask_a ^ self.mask_b).tolist())
+        self.assertEqual((~a).to_mask().tolist(), (~self.mask_a).tolist())
+        # Padding bits stay clear when inverting.
+        self.assertEqual((~a).count(), 6)
+        self.assertEqual(~~a, a)
+
+    def test_inplace_operators(self):
+        a = PackedMask.from_mask(self.mask_a)
+        bits = a.bits
+        a |= PackedMask.from_mask(self.mask_b)
+        self.assertIs(a.bits, bits)
+        self.assertEqual(a.to_mask().tolist(),
+                         (self.mask_a | self.mask_b).tolist())
+        a &= PackedMask.from_mask(self.mask_b)
+        self.assertEqual(a.to_mask().tolist(), self.mask_b.tolist())
+
+    def test_size_mismatch(self):
+        a = PackedMask.from_mask(self.mask_a)
+        b = PackedMask.from_mask(self.mask_b[:-1])
+        self.assertRaises(ValueError, a.__or__, b)
+        self.assertRaises(ValueError, PackedMask, a.bits, 20)
+
+    def test_masked_array(self):
+        array = np.ma.arange(11)
+        array.mask = (PackedMask.from_mask(self.mask_a) |
+                      PackedMask.from_mask(self.mask_b)).to_mask()
+        self.assertEqual(array.count(), 3)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+
+'''
+'''
+
+##############################################################################
+# Imports
+
+
+import numpy as np
+import unittest
+
+from collections import OrderedDict
+
+from flightdatautilities.resample import (
+    AlignedFrame,
+    align_frame,
+    interpolate,
+    resample,
+    resample_length,
+)
+
+
+##############################################################################
+# Test Cases
+
+
+class TestResampleLength(unittest.TestCase):
+
+    def test_resample_length(self):
+        self.assertEqual(resample_length(10, 1, 4), 40)
+        self.assertEqual(resample_length(40, 4, 1), 10)
+        self.assertEqual(resample_length(10, 1, 0.25), 2)
+        self.assertEqual(resample_length(9, 3, 1 / 3.0), 1)
+        self.assertEqual(resample_length(30, 1, 2 / 3.0), 20)
+
+
+class TestResample(unittest.TestCase):
+
+    def test_upsample(self):
+        array = np.ma.arange(4)
+        self.assertEqual(resample(array, 1, 2).tolist(),
+                         [0, 0.5, 1, 1.5, 2, 2.5, 3, None])
+        self.assertEqual(resample(array, 1, 2, method='nearest').tolist(),
+                         [0, 1, 1, 2, 2, 3, 3, None])
+        self.assertEqual(resample(array, 1, 2, method='nearest').dtype,
+                         array.dtype)
+
+    def test_downsample(self):
+        array = np.ma.arange(8)
+        self.assertEqual(resample(array, 2, 1).tolist(), [0, 2, 4, 6])
+        self.assertEqual(resample(array, 4, 1).tolist(), [0, 4])
+        self.assertEqual(resample(array, 4, 1, output_offset=0.5).tolist(),
+                         [2, 6])
+
+    def test_fractional(self):
+        array = np.ma.arange(6, dtype=np.float64)
+        self.assertEqual(resample(array, 1, 2 / 3.0).tolist(),
+                         [0, 1.5, 3, 4.5])
+        self.assertEqual(resample(array, 3, 1 / 3.0).tolist(), [])
+        array = np.ma.arange(9, dtype=np.float64)
+        self.assertEqual(resample(array, 3, 1 / 3.0).tolist(), [0])
+
+    def test_offsets(self):
+        array = np.ma.arange(4, dtype=np.float64)
+        self.assertEqual(resample(array, 1, 1, offset=0.5).tolist(),
+                         [None, 0.5, 1.5, 2.5])
+        self.assertEqual(resample(array, 1, 1, output_offset=0.25).tolist(),
+                         [0.25, 1.25, 2.25, None])
+        self.assertEqual(resample(array, 1, 2, offset=0.5,
+                                  output_offset=0.5).tolist(),
+                         [0, 0.5, 1, 1.5, 2, 2.5, 3, None])
+
+    def test_masked(self):
+        array = np.ma.array([0, 1, 2, 3, 4], mask=[0, 0, 1, 0, 0])
+        self.assertEqual(resample(array, 1, 2).tolist(),
+                         [0, 0.5, 1, None, None, None, 3, 3.5, 4, None])
+        self.assertEqual(resample(array, 1, 2, method='nearest').tolist(),
+                         [0, 1, 1, None, None, 3, 3, 4, 4, None])
+        self.assertEqual(resample(np.arange(3), 1, 2).tolist(),
+                         [0, 0.5, 1, 1.5, 2, None])
+
+    def test_out(self):
+        array = np.ma.array([0, 1, 2, 3], mask=[0, 0, 1, 0])
+        out = np.ma.zeros(8)
+        self.assertTrue(resample(array, 1, 2, out=out) is out)
+        self.assertEqual(out.tolist(),
+                         [0, 0.5, 1, None, None, None, 3, None])
+        # A shorter buffer only takes the first samples.
+        out = np.zeros(3)
+        result = resample(array, 1, 2, out=out)
+        self.assertTrue(result.data is out or result.data.base is out)
+        self.assertEqual(result.tolist(), [0, 0.5, 1])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, resample, np.arange(3), 1, 2,
+                          method='cubic')
+        self.assertEqual(resample(np.ma.array([]), 1, 2).tolist(), [])
+
+
+class TestInterpolate(unittest.TestCase):
+
+    def test_interpolate(self):
+        data = np.array([0, 10, 20, 30], dtype=np.float64)
+        mask = np.array([False, False, True, False])
+        positions = np.array([-0.5, 0, 0.5, 1.25, 2, 3, 3.5])
+        out_data = np.zeros(len(positions))
+        out_mask = np.zeros(len(positions), dtype=np.bool_)
+        interpolate(data, None, positions, 'linear', out_data, out_mask)
+        self.assertEqual(out_data[1:-1].tolist(), [0, 5, 12.5, 20, 30])
+        self.assertEqual(out_mask.tolist(),
+                         [True, False, False, False, False, False, True])
+        interpolate(data, mask, positions, 'linear', out_data, out_mask)
+        self.assertEqual(out_mask.tolist(),
+                         [True, False, False, True, True, False, True])
+        interpolate(data, mask, positions, 'nearest', out_data, out_mask)
+        self.assertEqual(out_data[1:3].tolist(), [0, 10])
+        self.assertEqual(out_mask.tolist(),
+                         [False, False, False, False, True, False, True])
+        interpolate(data[:0], None, positions, 'linear', out_data, out_mask)
+        self.assertTrue(out_mask.all())
+
+
+class TestAlignFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.parameters = OrderedDict([
+            ('Altitude', (np.ma.arange(4, dtype=np.float64), 1, 0)),
+            ('Pitch', (np.ma.array(np.arange(16), mask=[0] * 5 + [1] +
+                                   [0] * 10), 4, 0.125)),
+            ('Gear Down', (np.arange(8), 2, 0.25)),
+        ])
+
+    def test_align_frame(self):
+        frame = align_frame(self.parameters, 2, methods={'Gear Down':
+                                                         'nearest'})
+        self.assertTrue(isinstance(frame, AlignedFrame))
+        self.assertEqual(list(frame), ['Altitude', 'Pitch', 'Gear Down'])
+        self.assertEqual(len(frame), 8)
+        self.assertEqual(frame.data.shape, (8, 3))
+        self.assertEqual(frame.mask.shape, (8, 3))
+        self.assertTrue(frame.data.flags.f_contiguous)
+        for name, (array, frequency, offset) in self.parameters.items():
+            method = 'nearest' if name == 'Gear Down' else 'linear'
+            self.assertEqual(frame[name].tolist(),
+                             resample(array, frequency, 2, offset=offset,
+                                      method=method).tolist())
+        self.assertEqual(frame['Pitch'].tolist(),
+                         [None, 1.5, 3.5, None, 7.5, 9.5, 11.5, 13.5])
+
+    def test_views(self):
+        frame = align_frame(self.parameters, 1, offset=0.5, length=3)
+        self.assertEqual(len(frame), 3)
+        array = frame['Altitude']
+        self.assertEqual(array.tolist(), [0.5, 1.5, 2.5])
+        data, mask = frame.column('Altitude')
+        data[0] = 10
+        mask[1] = True
+        self.assertEqual(array.tolist(), [10, None, 2.5])
+        self.assertEqual(frame.data[:, 0].tolist(), [10, 1.5, 2.5])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, align_frame, self.parameters, 1,
+                          method='cubic')
+        frame = align_frame({}, 1)
+        self.assertEqual(frame.data.shape, (0, 0))
+
+
+##############################################################################
+# vim:et:ft=python:nowrap:sts=4:sw=4:ts=4
@@ -8,6 +8,8 @@
 # Imports
 
 
+import math
+import numpy as np
 import unittest
 
 from decimal import Decimal
@@ -45,15 +47,174 @@ class TestUnitsModule(unittest.TestCase):
                 self.assertIn(k, values)
                 self.assertLessEqual(set(v.keys()), values)
 
-    @unittest.skip('Test not implemented.')
     def test__normalise(self):
 
-        pass
+        self.assertEqual(normalise(FT), FT)
+        self.assertEqual(normalise('feet'), FT)
+        # Variants of units and corrections by case and whitespace:
+        self.assertEqual(normalise('FEET'), FT)
+        self.assertEqual(normalise(' Deg/Sec '), DEGREE_S)
+        self.assertEqual(normalise('% n 1'), PERCENT)
+        self.assertEqual(normalise('KG'), KG)
+        # Ambiguous variants are only normalised when matched exactly:
+        self.assertEqual(normalise('m'), METER)
+        self.assertEqual(normalise('M'), MACH)
+        self.assertEqual(normalise('unknown'), 'unknown')
+        self.assertEqual(normalise(None), None)
+        self.assertEqual(normalise([FT]), [FT])
+        for unit, normalised in UNIT_CORRECTIONS.iteritems():
+            self.assertEqual(normalise(unit), normalised)
+
+    def test__normalise__cache_bounded(self):
+
+        from flightdatautilities import units
+        for index in range(NORMALISE_CACHE_SIZE + 10):
+            self.assertEqual(normalise('unknown %d' % index),
+                             'unknown %d' % index)
+            self.assertLessEqual(len(units._normalised),
+                                 NORMALISE_CACHE_SIZE)
+        self.assertTrue('unknown %d' % NORMALISE_CACHE_SIZE in
+                        units._normalised)
+        self.assertEqual(normalise('FEET'), FT)
+        # Well known units and corrections are never cached:
+        self.assertEqual(normalise(FT), FT)
+        self.assertEqual(normalise('feet'), FT)
+        self.assertFalse(FT in units._normalised)
+        self.assertFalse('feet' in units._normalised)
+
+    def test__conversion__cache_bounded(self):
+
+        from flightdatautilities import units
+        for index in range(CONVERSION_CACHE_SIZE + 10):
+            unit = ' ft ' + ' ' * index
+            self.assertEqual(conversion(unit, METER),
+                             conversion(FT, METER))
+            self.assertLessEqual(len(units._conversions),
+                                 CONVERSION_CACHE_SIZE)
+
+    def test__unknown_units(self):
+
+        units = ['feet', 'FEET', 'unknown', 'kt', 'Unknown', None]
+        self.assertEqual(unknown_units(units), set(['unknown', 'Unknown',
+                                                    None]))
+        self.assertEqual(unknown_units([]), set())
 
-    @unittest.skip('Test not implemented.')
     def test__function(self):
 
-        pass
+        self.assertAlmostEqual(function('feet', METER)(10), 3.048)
+        self.assertEqual(function(FT, FT)(10), 10)
+        self.assertIs(function(FT, FT), function(KG, KG))
+        self.assertIsNone(function(FT, 'unknown'))
+        self.assertIsNone(function('unknown', FT))
+
+    def test__conversion(self):
+
+        self.assertEqual(conversion(FT, METER), (0.3048, 0))
+        self.assertIs(conversion(FT, METER), conversion(FT, METER))
+        scale, offset = conversion(CELSIUS, FAHRENHEIT)
+        self.assertAlmostEqual(scale, 1.8)
+        self.assertAlmostEqual(offset, 32)
+        scale, offset = conversion(DEGREE, RADIAN)
+        self.assertEqual(scale, math.radians(1))
+        self.assertEqual(offset, 0)
+        self.assertRaises(ValueError, conversion, 'unknown', FT)
+        self.assertRaises(ValueError, conversion, FT, 'unknown')
+        array = np.arange(3.0)
+        self.assertEqual(conversion(CELSIUS, KELVIN)(array).tolist(),
+                         [273.15, 274.15, 275.15])
+
+    def test__conversion__derived(self):
+
+        # Every conversion which is not defined directly, to 6 significant
+        # figures from independent sources:
+        data = {
+            (FPS, KT): 0.592484,
+            (FPS, MPH): 0.681818,
+            (KT, FPS): 1.68781,
+            (MPH, FPS): 1.46667,
+            (LB, SLUG): 0.0310810,
+            (SLUG, KG): 14.5939,
+            (SLUG, LB): 32.1740,
+            (SLUG, TONNE): 0.0145939,
+            (TONNE, SLUG): 68.5218,
+        }
+        from flightdatautilities import units
+        table = units._conversion_table()
+        derived = set()
+        for unit, outputs in table.iteritems():
+            for output in outputs:
+                if output not in CONVERSION_MULTIPLIERS.get(unit, {}) and \
+                        output not in CONVERSION_FUNCTIONS.get(unit, {}):
+                    derived.add((unit, output))
+        self.assertItemsEqual(derived, data.keys())
+        # Direct conversions must agree with those via other units:
+        c = units.Conversion
+        graph = {FT: {METER: c(0.3048, 0)}, METER: {KM: c(0.001, 0)},
+                 KM: {}}
+        table = {FT: {METER: c(0.3048, 0), KM: c(0.0003048, 0)},
+                 METER: {KM: c(0.001, 0)}}
+        units._check_conversions(table, graph)
+        table[FT][KM] = c(0.0003, 0)
+        graph[FT][KM] = table[FT][KM]
+        self.assertRaises(ValueError, units._check_conversions, table, graph)
+        for (unit, output), expected in data.iteritems():
+            self.assertAlmostEqual(convert(1, unit, output) / expected, 1,
+                                   places=5, msg='%s --> %s' % (unit, output))
+        # Direct conversions take precedence over derived ones:
+        self.assertEqual(conversion(FT, METER), (0.3048, 0))
+        # Conversions within a category are symmetric and transitive:
+        for category, units in UNIT_CATEGORIES.iteritems():
+            if category in UNDERIVED_CATEGORIES:
+                continue
+            for a in units:
+                for b in units:
+                    if not function(a, b):
+                        continue
+                    self.assertTrue(function(b, a), '%s --> %s' % (b, a))
+                    for c in units:
+                        if function(b, c):
+                            self.assertTrue(function(a, c),
+                                            '%s --> %s' % (a, c))
+            # Round trips return the original value:
+            for a in units:
+                for b in units:
+                    if function(a, b):
+                        value = convert(convert(10, a, b), b, a)
+                        self.assertAlmostEqual(value, 10, delta=0.001,
+                                               msg='%s <-> %s' % (a, b))
+        # No conversions between categories or between unrelated units:
+        self.assertRaises(ValueError, conversion, FT, KG)
+        self.assertRaises(ValueError, conversion, GS_DDM, LOC_DDM)
+
+    def test__convert_array(self):
+
+        array = np.ma.array([0, 10, 20], mask=[False, True, False])
+        result = convert_array(array, 'feet', METER)
+        self.assertEqual(result.dtype, np.float64)
+        np.testing.assert_array_almost_equal(result.data, [0, 3.048, 6.096])
+        self.assertEqual(result.mask.tolist(), [False, True, False])
+        self.assertIsNot(result.mask, array.mask)
+        self.assertEqual(array.data.tolist(), [0, 10, 20])
+        # Temperatures in place, across multiple blocks:
+        array = np.ma.zeros(CONVERT_BLOCK_SIZE * 2 + 1)
+        array[5] = np.ma.masked
+        data = array.data
+        result = convert_array(array, CELSIUS, FAHRENHEIT, out=array)
+        self.assertIs(result, array)
+        self.assertTrue(np.may_share_memory(result.data, data))
+        self.assertTrue((array.data == 32).all())
+        self.assertEqual(array.mask.sum(), 1)
+        # Into an output buffer, including non-contiguous arrays:
+        out = np.empty(3, dtype=np.float32)
+        result = convert_array(np.arange(6.0)[::2], KT, KT, out=out)
+        self.assertIs(result, out)
+        self.assertEqual(out.tolist(), [0, 2, 4])
+        convert_array(np.arange(6.0)[::2], DEGREE, RADIAN, out=out)
+        np.testing.assert_array_almost_equal(out, np.radians([0, 2, 4]))
+        self.assertRaises(TypeError, convert_array, np.arange(3.0), FT,
+                          METER, out=np.empty(3, dtype=int))
+        self.assertRaises(ValueError, convert_array, np.arange(3.0), FT,
+                          'unknown')
 
     @unittest.skip('Test not implemented.')
     def test__multiplier(self):
@@ -135,8 +296,8 @@ class TestUnitsModule(unittest.TestCase):
             (1, MPH, FPM): 88.0002,
             (1, FPM, KT): 0.0098747300,
             (1, FPM, MPH): 0.0113636364,
-            (1, FPM, FPS): 60.0,
-            (1, FPS, FPM): 0.016666666666666666,
+            (1, FPM, FPS): 0.016666666666666666,
+            (1, FPS, FPM): 60.0,
             # Temperature:
             (0, CELSIUS, FAHRENHEIT): 32,
             (0, CELSIUS, KELVIN): 273.15,